@@ -0,0 +1,49 @@
+import threading
+from types import MappingProxyType
+
+from AI.agents.tool_executor import ToolExecutor
+from AI.utils.intent_engine import get_intent_engine
+
+
+class AgentDefinition:
+    """Read-only parts of an agent shared by every conversation in the process.
+
+    Holds the tools, system prompt, canned replies and compiled intent
+    engine, so an agent instance only adds its LLM and memory store and
+    per-conversation state lives in the memory store. Attributes cannot
+    be reassigned after construction; tools must be stateless.
+    """
+
+    __slots__ = ('role', 'system_prompt', 'tools', 'tools_by_name', 'responses', 'intent_engine', 'executor')
+
+    def __init__(self, role, system_prompt, tools, responses):
+        tools = tuple(tools)
+        for name, value in (
+            ('role', role),
+            ('system_prompt', system_prompt),
+            ('tools', tools),
+            ('tools_by_name', MappingProxyType({tool.name: tool for tool in tools})),
+            ('responses', MappingProxyType(dict(responses))),
+            ('intent_engine', get_intent_engine(role)),
+            ('executor', ToolExecutor(tools)),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"AgentDefinition is read-only; cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"AgentDefinition is read-only; cannot delete {name}")
+
+
+_definitions = {}
+_definitions_lock = threading.Lock()
+
+
+def get_agent_definition(role, build):
+    """Return the process-wide definition for a role, calling build() on first use"""
+    with _definitions_lock:
+        definition = _definitions.get(role)
+        if definition is None:
+            definition = _definitions[role] = build()
+        return definition
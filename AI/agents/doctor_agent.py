@@ -1,7 +1,6 @@
 from langchain.agents import Agent
 from langchain.prompts import PromptTemplate
 from langchain.tools import Tool
-from langchain.memory import ConversationBufferMemory
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 import json
 import sys
@@ -11,23 +10,71 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 # Import project-specific modules
+from AI.agents.definition import AgentDefinition, get_agent_definition
 from AI.tools.doctor_tools import (
     GetDoctorScheduleTool,
     UpdateAvailabilityTool,
     GetPatientHistoryTool,
     AddAppointmentNotesTool
 )
+from AI.utils.conversation_memory import ConversationMemoryStore
+
+# Shared by every conversation; registered with the LLM as a cached prompt prefix
+SYSTEM_PROMPT = """You are an AI assistant for doctors.
+You help doctors manage their schedules, view patient information, and add notes to appointments.
+Be professional, concise, and respect medical ethics and privacy guidelines.
+
+For schedule management:
+1. Show upcoming appointments clearly organized by day/time
+2. Help update availability windows
+3. Provide relevant patient information for each appointment
+
+For patient information:
+1. Summarize relevant medical history
+2. Highlight recent symptoms and concerns
+3. Note any recurring issues or patterns
+
+For appointment notes:
+1. Help structure notes in a standard medical format
+2. Suggest relevant follow-up actions when appropriate
+3. Flag any potential concerns based on patient history"""
+
+# Canned replies used until the LangChain agent is wired in
+INTENT_RESPONSES = {
+    "VIEW_SCHEDULE": "Here is your schedule for today: [Schedule would be displayed here]",
+    "UPDATE_AVAILABILITY": "I'll help you update your availability. What days and times would you like to set as available?",
+    "VIEW_PATIENT_HISTORY": "Here is the patient history for your next appointment: [Patient history would be displayed here]",
+    "GENERAL_INQUIRY": "How can I assist you with your schedule or patient information today?",
+}
 
 class DoctorAgent:
     """AI agent that helps doctors manage their schedule and patient interactions"""
     
-    def __init__(self, llm):
+    __slots__ = ("llm", "memory", "definition")
+    
+    def __init__(self, llm, memory_store=None):
         self.llm = llm
-        self.memory = ConversationBufferMemory()
-        self.tools = self._setup_tools()
-        self.agent = self._create_agent()
+        # Tools, prompt and intent engine are built once per process and shared by every agent
+        self.definition = get_agent_definition("doctor", self._create_definition)
+        # Bounded per-conversation memory; pass a store with loader/saver to persist it
+        self.memory = memory_store or ConversationMemoryStore()
+        if hasattr(llm, "register_prefix"):
+            llm.register_prefix(self.definition.system_prompt)
+    
+    @property
+    def tools(self):
+        return self.definition.tools
     
-    def _setup_tools(self):
+    @property
+    def executor(self):
+        return self.definition.executor
+    
+    @property
+    def intent_engine(self):
+        return self.definition.intent_engine
+    
+    @staticmethod
+    def _setup_tools():
         """Set up the tools available to the agent"""
         # In a real implementation, these tools would be initialized with database access
         # Here we're just showing the structure
@@ -38,72 +85,43 @@ class DoctorAgent:
             AddAppointmentNotesTool(),
         ]
     
-    def _create_agent(self):
-        """Create the LangChain agent with the necessary configuration"""
-        # System message that defines the agent's behavior
-        system_message = SystemMessage(content="""You are an AI assistant for doctors. 
-        You help doctors manage their schedules, view patient information, and add notes to appointments. 
-        Be professional, concise, and respect medical ethics and privacy guidelines.
-        
-        For schedule management:
-        1. Show upcoming appointments clearly organized by day/time
-        2. Help update availability windows
-        3. Provide relevant patient information for each appointment
-        
-        For patient information:
-        1. Summarize relevant medical history
-        2. Highlight recent symptoms and concerns
-        3. Note any recurring issues or patterns
-        
-        For appointment notes:
-        1. Help structure notes in a standard medical format
-        2. Suggest relevant follow-up actions when appropriate
-        3. Flag any potential concerns based on patient history""")
-        
-        # TODO: In a real implementation, this would be a LangChain agent with tools
-        # For now, we'll use a placeholder that will be replaced later
-        agent = "placeholder"
-        
-        return agent
+    @classmethod
+    def _create_definition(cls):
+        """Build the shared agent definition; called once per process"""
+        # TODO: In a real implementation, the LangChain agent built from these would live here too
+        return AgentDefinition("doctor", SYSTEM_PROMPT, cls._setup_tools(), INTENT_RESPONSES)
     
     def process_request(self, doctor_id, request_text):
         """Process a request from a doctor"""
-        # TODO: In a real implementation, this would use the LangChain agent
-        # For now, we'll use a simple conditional response
+        # TODO: In a real implementation, this would use the LangChain agent, running
+        # each step's tool calls through run_tools() so they execute concurrently
+        # For now, we'll use a simple conditional response and call no tools
         
         # Classify intent (in a real implementation, this would be done by the LLM)
         intent = self._classify_intent(request_text)
+        responses = self.definition.responses
+        reply = responses.get(intent, responses["GENERAL_INQUIRY"])
         
-        if "appointments" in request_text.lower() and any(word in request_text.lower() for word in ["today", "tomorrow", "schedule"]):
-            return "Here is your schedule for today: [Schedule would be displayed here]"
-        
-        elif "availability" in request_text.lower() and "update" in request_text.lower():
-            return "I'll help you update your availability. What days and times would you like to set as available?"
-        
-        elif "patient" in request_text.lower() and "history" in request_text.lower():
-            return "Here is the patient history for your next appointment: [Patient history would be displayed here]"
-        
-        else:
-            return "How can I assist you with your schedule or patient information today?"
+        memory = self.memory.get(doctor_id)
+        self._remember(doctor_id, memory, request_text, reply)
+        return reply
+    
+    def run_tools(self, calls):
+        """Run the independent tool calls of a turn concurrently; see ToolExecutor"""
+        return self.executor.run(calls)
+    
+    async def arun_tools(self, calls):
+        """Run the independent tool calls of a turn concurrently from async code"""
+        return await self.executor.arun(calls)
+    
+    def _remember(self, doctor_id, memory, request_text, reply):
+        """Record a turn in the doctor's conversation memory"""
+        memory.add_turn("Doctor", request_text)
+        memory.add_turn("Assistant", reply)
+        self.memory.save(doctor_id, memory)
     
     def _classify_intent(self, request_text):
         """Classify the intent of the doctor's request"""
         # In a real implementation, this would use the LLM to classify intent
-        # For now, we'll use a simple keyword-based approach
-        
-        request_lower = request_text.lower()
-        
-        if any(word in request_lower for word in ["schedule", "appointments", "calendar"]):
-            return "VIEW_SCHEDULE"
-        
-        elif any(word in request_lower for word in ["availability", "available", "times"]):
-            return "UPDATE_AVAILABILITY"
-        
-        elif any(word in request_lower for word in ["patient", "history", "record"]):
-            return "VIEW_PATIENT_HISTORY"
-        
-        elif any(word in request_lower for word in ["notes", "add notes", "update notes"]):
-            return "ADD_NOTES"
-        
-        else:
-            return "GENERAL_INQUIRY"
+        # For now, we'll use the shared compiled keyword engine
+        return self.intent_engine.top_intent(request_text)
@@ -1,7 +1,6 @@
 from langchain.agents import Agent
 from langchain.prompts import PromptTemplate
 from langchain.tools import Tool
-from langchain.memory import ConversationBufferMemory
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 import json
 import sys
@@ -11,6 +10,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 # Import project-specific modules
+from AI.agents.definition import AgentDefinition, get_agent_definition
 from AI.tools.appointment_tools import (
     FindDoctorsTool,
     BookAppointmentTool,
@@ -23,17 +23,68 @@ from AI.tools.patient_tools import (
     GetPatientProfileTool,
     UpdatePatientProfileTool
 )
+from AI.utils.conversation_memory import ConversationMemoryStore, count_tokens
+from AI.utils.metrics import registry
+
+prompt_tokens = registry.histogram("agent.prompt_tokens", buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192))
+
+# Shared by every conversation; registered with the LLM as a cached prompt prefix
+SYSTEM_PROMPT = """You are a helpful medical assistant on WhatsApp.
+You help patients book appointments with doctors, reschedule or cancel appointments,
+and answer basic medical questions. Always be empathetic and professional.
+
+When discussing symptoms:
+1. Ask clarifying questions to understand the severity
+2. Never diagnose conditions - your role is to connect patients with doctors
+3. Express appropriate concern for serious symptoms
+4. Gather relevant information about duration, intensity, and context
+
+For appointment booking:
+1. Confirm patient identity
+2. Collect symptoms and reason for visit
+3. Help find appropriate specialists
+4. Offer available time slots
+5. Confirm appointment details before booking
+
+Always prioritize patient privacy and comply with healthcare regulations."""
+
+# Canned replies used until the LangChain agent is wired in
+INTENT_RESPONSES = {
+    "NEW_APPOINTMENT": "I'd be happy to help you book an appointment. What symptoms are you experiencing?",
+    "RESCHEDULE": "I can help you reschedule your appointment. Which appointment would you like to change?",
+    "CANCEL_APPOINTMENT": "I can help you cancel your appointment. Which appointment would you like to cancel?",
+    "DESCRIBE_SYMPTOMS": "I understand you're not feeling well. Could you tell me more about your symptoms and how long you've been experiencing them?",
+    "GENERAL_INQUIRY": "Thank you for your message. How can I assist you with your healthcare needs today?",
+}
 
 class PatientAgent:
     """AI agent that handles patient interactions via WhatsApp"""
     
-    def __init__(self, llm):
+    __slots__ = ("llm", "memory", "definition")
+    
+    def __init__(self, llm, memory_store=None):
         self.llm = llm
-        self.memory = ConversationBufferMemory()
-        self.tools = self._setup_tools()
-        self.agent = self._create_agent()
+        # Tools, prompt and intent engine are built once per process and shared by every agent
+        self.definition = get_agent_definition("patient", self._create_definition)
+        # Bounded per-conversation memory; pass a store with loader/saver to persist it
+        self.memory = memory_store or ConversationMemoryStore()
+        if hasattr(llm, "register_prefix"):
+            llm.register_prefix(self.definition.system_prompt)
+    
+    @property
+    def tools(self):
+        return self.definition.tools
+    
+    @property
+    def executor(self):
+        return self.definition.executor
+    
+    @property
+    def intent_engine(self):
+        return self.definition.intent_engine
         
-    def _setup_tools(self):
+    @staticmethod
+    def _setup_tools():
         """Set up the tools available to the agent"""
         # In a real implementation, these tools would be initialized with database access
         # Here we're just showing the structure
@@ -48,75 +99,71 @@ class PatientAgent:
             GetPatientAppointmentsTool(),
         ]
     
-    def _create_agent(self):
-        """Create the LangChain agent with the necessary configuration"""
-        # System message that defines the agent's behavior
-        system_message = SystemMessage(content="""You are a helpful medical assistant on WhatsApp. 
-        You help patients book appointments with doctors, reschedule or cancel appointments, 
-        and answer basic medical questions. Always be empathetic and professional.
-        
-        When discussing symptoms:
-        1. Ask clarifying questions to understand the severity
-        2. Never diagnose conditions - your role is to connect patients with doctors
-        3. Express appropriate concern for serious symptoms
-        4. Gather relevant information about duration, intensity, and context
-        
-        For appointment booking:
-        1. Confirm patient identity
-        2. Collect symptoms and reason for visit
-        3. Help find appropriate specialists
-        4. Offer available time slots
-        5. Confirm appointment details before booking
-        
-        Always prioritize patient privacy and comply with healthcare regulations.""")
-        
-        # TODO: In a real implementation, this would be a LangChain agent with tools
-        # For now, we'll use a placeholder that will be replaced later
-        agent = "placeholder"
-        
-        return agent
+    @classmethod
+    def _create_definition(cls):
+        """Build the shared agent definition; called once per process"""
+        # TODO: In a real implementation, the LangChain agent built from these would live here too
+        return AgentDefinition("patient", SYSTEM_PROMPT, cls._setup_tools(), INTENT_RESPONSES)
     
-    def process_message(self, patient_id, message_text):
-        """Process an incoming message from a patient"""
-        # TODO: In a real implementation, this would use the LangChain agent
-        # For now, we'll use a simple conditional response
+    def process_message(self, patient_id, message_text, conversation_id=None):
+        """Process an incoming message from a patient.
+        
+        Memory is kept per conversation when conversation_id is given,
+        otherwise per patient.
+        """
+        # TODO: In a real implementation, this would use the LangChain agent, running
+        # each step's tool calls through run_tools() so they execute concurrently
+        # For now, we'll use a simple conditional response and call no tools
         
         # Classify intent (in a real implementation, this would be done by the LLM)
         intent = self._classify_intent(message_text)
+        responses = self.definition.responses
+        reply = responses.get(intent, responses["GENERAL_INQUIRY"])
         
-        if "appointment" in message_text.lower() and "book" in message_text.lower():
-            return "I'd be happy to help you book an appointment. What symptoms are you experiencing?"
-        
-        elif "reschedule" in message_text.lower():
-            return "I can help you reschedule your appointment. Which appointment would you like to change?"
-        
-        elif "cancel" in message_text.lower():
-            return "I can help you cancel your appointment. Which appointment would you like to cancel?"
-        
-        elif any(symptom in message_text.lower() for symptom in ["pain", "fever", "headache", "cough"]):
-            return "I understand you're not feeling well. Could you tell me more about your symptoms and how long you've been experiencing them?"
-        
-        else:
-            return "Thank you for your message. How can I assist you with your healthcare needs today?"
+        key = patient_id if conversation_id is None else conversation_id
+        memory = self.memory.get(key)
+        self._remember(key, memory, message_text, reply)
+        return reply
+    
+    def stream_message(self, patient_id, message_text, conversation_id=None):
+        """Stream the reply to a patient message token by token"""
+        # TODO: In a real implementation, this would stream the LangChain agent's final answer
+        key = patient_id if conversation_id is None else conversation_id
+        memory = self.memory.get(key)
+        prompt = self._build_prompt(memory, message_text)
+        # The intent decides whether the reply may come from, and go to, the response cache
+        intent = self._classify_intent(message_text)
+        tokens = []
+        for token in self.llm.stream(prompt, intent=intent):
+            tokens.append(token)
+            yield token
+        self._remember(key, memory, message_text, "".join(tokens))
+    
+    def _build_prompt(self, memory, message_text):
+        """Combine the system prompt and bounded conversation memory with the new message"""
+        context = memory.prompt_context()
+        turn = f"{context}\nPatient: {message_text}\nAssistant:" if context else f"Patient: {message_text}\nAssistant:"
+        # The system prompt stays the exact leading text so the LLM reuses its cached prefix state
+        prompt = f"{self.definition.system_prompt}\n\n{turn}"
+        prompt_tokens.observe(count_tokens(prompt))
+        return prompt
+    
+    def run_tools(self, calls):
+        """Run the independent tool calls of a turn concurrently; see ToolExecutor"""
+        return self.executor.run(calls)
+    
+    async def arun_tools(self, calls):
+        """Run the independent tool calls of a turn concurrently from async code"""
+        return await self.executor.arun(calls)
+    
+    def _remember(self, key, memory, message_text, reply):
+        """Record a turn in the patient's conversation memory"""
+        memory.add_turn("Patient", message_text)
+        memory.add_turn("Assistant", reply)
+        self.memory.save(key, memory)
     
     def _classify_intent(self, message_text):
         """Classify the intent of the patient's message"""
         # In a real implementation, this would use the LLM to classify intent
-        # For now, we'll use a simple keyword-based approach
-        
-        message_lower = message_text.lower()
-        
-        if any(word in message_lower for word in ["book", "schedule", "appointment", "see doctor"]):
-            return "NEW_APPOINTMENT"
-        
-        elif any(word in message_lower for word in ["reschedule", "change appointment", "different time"]):
-            return "RESCHEDULE"
-        
-        elif any(word in message_lower for word in ["cancel", "delete appointment"]):
-            return "CANCEL_APPOINTMENT"
-        
-        elif any(word in message_lower for word in ["symptoms", "pain", "feeling", "sick"]):
-            return "DESCRIBE_SYMPTOMS"
-        
-        else:
-            return "GENERAL_INQUIRY"
+        # For now, we'll use the shared compiled keyword engine
+        return self.intent_engine.top_intent(message_text)
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import time
+from collections import namedtuple
+
+from AI.utils.metrics import registry
+
+# A tool invocation requested by the agent; timeout overrides the executor's for this call
+ToolCall = namedtuple("ToolCall", ["name", "args", "timeout"], defaults=(None, None))
+ToolResult = namedtuple("ToolResult", ["name", "output", "error", "seconds", "timed_out"])
+
+tool_seconds = registry.histogram("agent.tool_seconds")
+turn_seconds = registry.histogram("agent.tool_turn_seconds")
+tool_timeouts = registry.counter("agent.tool_timeouts")
+tool_errors = registry.counter("agent.tool_errors")
+
+# Tools that write. A timeout cannot stop their provider call, which goes on to commit on its
+# worker thread, so reporting one as failed could make the agent retry a booking that was made.
+# They run to completion; only the read-only tools (find_doctors, get_patient_appointments,
+# get_doctor_schedule, get_patient_history, get_patient_profile, extract_symptoms) time out.
+WRITE_TOOLS = frozenset({
+    "book_appointment",
+    "reschedule_appointment",
+    "cancel_appointment",
+    "update_patient_profile",
+    "update_availability",
+    "add_appointment_notes",
+})
+
+
+class ToolExecutor:
+    """Runs the independent tool calls of one agent turn concurrently.
+
+    Each call goes through the tool's _arun, so the turn takes about as long
+    as its slowest tool rather than the sum of all of them. A read-only call
+    that overruns its timeout is cancelled and reported as an error result,
+    as is a call that raises; the other calls are unaffected. Calls to
+    WRITE_TOOLS are never timed out. Cancelling the turn cancels every call
+    still running.
+    """
+
+    def __init__(self, tools, timeout=None, timeouts=None):
+        self.tools = {tool.name: tool for tool in tools}
+        self.timeout = timeout if timeout is not None else float(os.getenv("AGENT_TOOL_TIMEOUT_SECONDS", "10"))
+        # Per-tool overrides by tool name, e.g. {"book_appointment": 20}
+        self.timeouts = dict(timeouts or {})
+
+    async def arun(self, calls):
+        """Run the calls concurrently and return their results in call order"""
+        calls = [call if isinstance(call, ToolCall) else ToolCall(*call) for call in calls]
+        start = time.perf_counter()
+        try:
+            return list(await asyncio.gather(*(self._run_one(call) for call in calls)))
+        finally:
+            turn_seconds.observe(time.perf_counter() - start)
+
+    def run(self, calls):
+        """Blocking wrapper around arun() for agents called from sync code"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.arun(calls))
+        raise RuntimeError("ToolExecutor.run() called from a running event loop; await arun() instead")
+
+    def _timeout_for(self, call):
+        if call.name in WRITE_TOOLS:
+            return None
+        if call.timeout is not None:
+            return call.timeout
+        return self.timeouts.get(call.name, self.timeout)
+
+    async def _run_one(self, call):
+        tool = self.tools.get(call.name)
+        if tool is None:
+            tool_errors.inc()
+            return ToolResult(call.name, None, f"Unknown tool: {call.name}", 0.0, False)
+        timeout = self._timeout_for(call)
+        start = time.perf_counter()
+        try:
+            output = await asyncio.wait_for(tool._arun(**(call.args or {})), timeout or None)
+        except asyncio.TimeoutError:
+            # A provider call already on a worker thread finishes there; its result is discarded
+            tool_timeouts.inc()
+            return ToolResult(call.name, None, f"Timed out after {timeout}s", time.perf_counter() - start, True)
+        except Exception as exc:
+            tool_errors.inc()
+            return ToolResult(call.name, None, str(exc) or type(exc).__name__, time.perf_counter() - start, False)
+        seconds = time.perf_counter() - start
+        tool_seconds.observe(seconds)
+        return ToolResult(call.name, output, None, seconds, False)
+
+
+def results_as_json(results):
+    """Decode tool outputs for the prompt, keeping errors alongside the successful calls"""
+    decoded = []
+    for result in results:
+        if result.error is not None:
+            decoded.append({"tool": result.name, "error": result.error})
+            continue
+        try:
+            output = json.loads(result.output)
+        except (TypeError, ValueError):
+            output = result.output
+        decoded.append({"tool": result.name, "output": output})
+    return decoded
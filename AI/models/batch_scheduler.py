@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from AI.utils.metrics import registry
+
+batch_size_histogram = registry.histogram('llm.batch_size', buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+queue_wait_histogram = registry.histogram('llm.batch_queue_wait_seconds')
+batch_latency_histogram = registry.histogram('llm.batch_seconds')
+
+
+class _Request:
+    __slots__ = ('prompt', 'params', 'future', 'enqueued_at')
+    
+    def __init__(self, prompt, params):
+        self.prompt = prompt
+        self.params = params
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class BatchScheduler:
+    """Collects concurrent generation requests into micro-batches.
+    
+    A batch is closed when it reaches max_batch_size or when the oldest
+    request has waited window_ms, whichever comes first. Requests with
+    different generation parameters never share a batch.
+    """
+    
+    def __init__(self, run_batch, window_ms=5.0, max_batch_size=16):
+        self.run_batch = run_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='llm-batch-scheduler', daemon=True)
+        self._thread.start()
+    
+    def submit(self, prompt, max_tokens=100, temperature=0.7):
+        """Queue a prompt and return a Future that resolves to its completion"""
+        request = _Request(prompt, (max_tokens, temperature))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("BatchScheduler is closed")
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future
+    
+    def close(self):
+        """Finish queued requests and stop the scheduler thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+    
+    def _next_batch(self):
+        with self._condition:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._condition.wait()
+    
+            # Hold the batch open until it is full or the oldest request's window expires
+            deadline = self._pending[0].enqueued_at + self.window
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+    
+            params = self._pending[0].params
+            batch, skipped = [], deque()
+            while self._pending and len(batch) < self.max_batch_size:
+                request = self._pending.popleft()
+                (batch if request.params == params else skipped).append(request)
+            self._pending.extendleft(reversed(skipped))
+            return batch
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+    
+            started = time.monotonic()
+            batch_size_histogram.observe(len(batch))
+            for request in batch:
+                queue_wait_histogram.observe(started - request.enqueued_at)
+    
+            max_tokens, temperature = batch[0].params
+            try:
+                results = list(self.run_batch([request.prompt for request in batch], max_tokens, temperature))
+                if len(results) != len(batch):
+                    # Which prompt each result answers is unknown, so none of them can be trusted
+                    raise RuntimeError(f'Backend returned {len(results)} results for a batch of {len(batch)}')
+            except Exception as exc:
+                for request in batch:
+                    request.future.set_exception(exc)
+            else:
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            batch_latency_histogram.observe(time.monotonic() - started)
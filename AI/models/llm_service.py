@@ -1,49 +1,257 @@
+import hashlib
 import os
 import sys
+import threading
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from AI.models.batch_scheduler import BatchScheduler
+from AI.models.mock_backend import MockLLMBackend
+from AI.models.response_cache import ResponseCache, make_key
+from AI.models.weights import memory_usage
+from AI.utils.lru import SizedLRUCache
+from AI.utils.metrics import registry
+
+cold_start_gauge = registry.gauge('llm.cold_start_seconds')
+rss_gauge = registry.gauge('process.rss_bytes')
+pss_gauge = registry.gauge('process.pss_bytes')
+ttft_histogram = registry.histogram('llm.ttft_seconds')
+prefix_hits = registry.counter('llm.prefix_matches')
+
+# Process-wide services keyed by model path, see get_llm_service()
+_services = {}
+_services_lock = threading.Lock()
 
 class LLMService:
     """Service for interacting with the Llama LLM"""
     
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, backend=None, batch_window_ms=None, max_batch_size=None, cache=None,
+                 prefix_cache_max_bytes=None):
         # In a real implementation, this would load the Llama model
         self.model_path = model_path or os.getenv('LLAMA_MODEL_PATH', 'models/llama-2-7b')
+        self.backend = backend or MockLLMBackend()
         self.model = None
         self.tokenizer = None
         self.initialized = False
+        self.load_seconds = None
+        self._init_lock = threading.Lock()
+    
+        # Micro-batching of concurrent generate() calls; a window of 0 disables it
+        if batch_window_ms is None:
+            batch_window_ms = float(os.getenv('LLM_BATCH_WINDOW_MS', '0'))
+        if max_batch_size is None:
+            max_batch_size = int(os.getenv('LLM_MAX_BATCH_SIZE', '16'))
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_size = max_batch_size
+        self.scheduler = None
+        if batch_window_ms > 0:
+            self.scheduler = BatchScheduler(self._run_batch, batch_window_ms, max_batch_size)
+        
+        # Response cache for near-identical prompts; disabled unless LLM_CACHE_MAX_BYTES is set
+        self.cache = cache if cache is not None else ResponseCache.from_env()
+        
+        # Backend state for registered static prompt prefixes (e.g. agent system prompts),
+        # keyed by prefix hash, so each request only processes the text after its prefix
+        if prefix_cache_max_bytes is None:
+            prefix_cache_max_bytes = int(os.getenv('LLM_PREFIX_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+        self.prefix_cache = None
+        if prefix_cache_max_bytes > 0 and hasattr(self.backend, 'prefill'):
+            self.prefix_cache = SizedLRUCache(
+                prefix_cache_max_bytes, name='llm.prefix_cache', sizeof=lambda state: state.nbytes
+            )
+        self._prefixes = ()  # (text, hash) pairs, longest first
+        self._prefix_lock = threading.Lock()
     
     def initialize(self):
-        """Initialize the LLM (mock implementation)"""
-        # In a real implementation, this would load the model and tokenizer
-        print(f"Initializing LLM with model path: {self.model_path}")
-        self.initialized = True
+        """Load the model weights (once, even with concurrent callers)"""
+        with self._init_lock:
+            if self.initialized:
+                return True
+            print(f"Initializing LLM with model path: {self.model_path}")
+            started = time.perf_counter()
+            # Weights are memory-mapped read-only so forked workers share their pages
+            use_mmap = os.getenv('LLM_MMAP_WEIGHTS', 'True') == 'True'
+            self.model = self.backend.load(self.model_path, use_mmap=use_mmap)
+            self.load_seconds = time.perf_counter() - started
+            self.initialized = True
         return True
     
-    def generate(self, prompt, max_tokens=100, temperature=0.7):
-        """Generate text based on a prompt"""
-        # In a real implementation, this would call the LLM to generate text
-        # For now, return mock responses based on the prompt
-        if not self.initialized:
-            self.initialize()
+    def warm_up(self):
+        """Load the model and run a throwaway generation before serving traffic.
+        
+        Returns cold-start timing and the process's memory usage afterwards.
+        """
+        started = time.perf_counter()
+        self.initialize()
+        if hasattr(self.backend, 'warm_up'):
+            self.backend.warm_up()
+        if self.prefix_cache is not None:
+            for text, key in self._prefixes:
+                self._prefix_state(key, text)
+        self._run_batch(["Hello"], 1, 0.0)
+        cold_start = time.perf_counter() - started
+        cold_start_gauge.set(cold_start)
+        
+        usage = memory_usage()
+        rss_gauge.set(usage['rss_bytes'] or 0)
+        pss_gauge.set(usage['pss_bytes'] or 0)
+        return {'load_seconds': self.load_seconds, 'cold_start_seconds': cold_start, **usage}
+    
+    def register_prefix(self, text):
+        """Declare a prompt prefix shared by many requests and return its hash.
         
-        # Mock some basic responses for testing
-        prompt_lower = prompt.lower()
+        Prompts starting with a registered prefix reuse the backend's cached
+        state for it and only send the rest of the prompt through the model.
+        Registering the same text again is a no-op.
+        """
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._prefix_lock:
+            if (text, key) not in self._prefixes:
+                # Replaced rather than mutated, so readers never need the lock
+                self._prefixes = tuple(sorted(self._prefixes + ((text, key),), key=lambda item: -len(item[0])))
+        return key
+    
+    def generate(self, prompt, max_tokens=100, temperature=0.7, intent=None):
+        """Generate text based on a prompt; intent is the message's classified intent, for the cache policy"""
+        key = None
+        if self.cache is not None and self.cache.enabled_for(intent):
+            key = make_key(prompt, max_tokens=max_tokens, temperature=temperature)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
-        if "appointment" in prompt_lower and "book" in prompt_lower:
-            return "I'd be happy to help you book an appointment. What symptoms are you experiencing?"
+        if self.scheduler is not None:
+            # Share a backend pass with other concurrent callers
+            result = self.scheduler.submit(prompt, max_tokens, temperature).result()
+        else:
+            result = self._run_batch([prompt], max_tokens, temperature)[0]
         
-        elif "reschedule" in prompt_lower:
-            return "I can help you reschedule your appointment. Which appointment would you like to change?"
+        if key is not None:
+            self.cache.set(key, result)
+        return result
+    
+    def generate_batch(self, prompts, max_tokens=100, temperature=0.7, intents=None):
+        """Generate text for several prompts in one backend pass; intents, if given, pairs one with each prompt"""
+        prompts = list(prompts)
+        if self.cache is None:
+            return self._run_batch(prompts, max_tokens, temperature)
         
-        elif "cancel" in prompt_lower:
-            return "I can help you cancel your appointment. Which appointment would you like to cancel?"
+        # Serve cached prompts directly and send only the misses to the backend
+        intents = list(intents) if intents is not None else [None] * len(prompts)
+        keys = [
+            make_key(prompt, max_tokens=max_tokens, temperature=temperature) if self.cache.enabled_for(intent) else None
+            for prompt, intent in zip(prompts, intents)
+        ]
+        results = [self.cache.get(key) if key is not None else None for key in keys]
+        misses = [index for index, result in enumerate(results) if result is None]
+        if misses:
+            generated = self._run_batch([prompts[index] for index in misses], max_tokens, temperature)
+            for index, result in zip(misses, generated):
+                results[index] = result
+                if keys[index] is not None:
+                    self.cache.set(keys[index], result)
+        return results
+    
+    def stream(self, prompt, max_tokens=100, temperature=0.7, intent=None):
+        """Yield generated tokens as soon as the backend produces them.
         
-        elif any(symptom in prompt_lower for symptom in ["pain", "fever", "headache", "cough"]):
-            return "I understand you're not feeling well. Could you tell me more about your symptoms and how long you've been experiencing them?"
+        A cached response is yielded whole; a completed stream is cached
+        unless the intent is one the cache skips.
+        """
+        started = time.perf_counter()
+        key = None
+        if self.cache is not None and self.cache.enabled_for(intent):
+            key = make_key(prompt, max_tokens=max_tokens, temperature=temperature)
+            cached = self.cache.get(key)
+            if cached is not None:
+                ttft_histogram.observe(time.perf_counter() - started)
+                yield cached
+                return
         
+        if not self.initialized:
+            self.initialize()
+        state, suffix = self._split_prompt(prompt)
+        if state is None:
+            tokens = self.backend.stream(prompt, max_tokens=max_tokens, temperature=temperature)
         else:
-            return "Thank you for your message. How can I assist you with your healthcare needs today?"
+            tokens = self.backend.stream(suffix, max_tokens=max_tokens, temperature=temperature, prefix_state=state)
+        generated = []
+        for index, token in enumerate(tokens):
+            if index == 0:
+                ttft_histogram.observe(time.perf_counter() - started)
+            generated.append(token)
+            yield token
+        if key is not None:
+            self.cache.set(key, ''.join(generated))
+    
+    def _run_batch(self, prompts, max_tokens, temperature):
+        if not self.initialized:
+            self.initialize()
+        if self.prefix_cache is None or not self._prefixes:
+            return self.backend.generate_batch(prompts, max_tokens=max_tokens, temperature=temperature)
+        
+        states, suffixes = [], []
+        for prompt in prompts:
+            state, suffix = self._split_prompt(prompt)
+            states.append(state)
+            suffixes.append(suffix if state is not None else prompt)
+        return self.backend.generate_batch(
+            suffixes, max_tokens=max_tokens, temperature=temperature, prefix_states=states
+        )
+    
+    def _split_prompt(self, prompt):
+        """Return the cached state of the longest registered prefix of prompt, and the rest"""
+        if self.prefix_cache is not None:
+            for text, key in self._prefixes:
+                if prompt.startswith(text):
+                    prefix_hits.inc()
+                    return self._prefix_state(key, text), prompt[len(text):]
+        return None, prompt
+    
+    def _prefix_state(self, key, text):
+        state = self.prefix_cache.get(key)
+        if state is None:
+            # Concurrent first requests may each prefill; warm_up() fills registered prefixes ahead of traffic
+            state = self.backend.prefill(text)
+            self.prefix_cache.set(key, state)
+        return state
+    
+    def close(self):
+        """Stop the batch scheduler, finishing any queued requests"""
+        if self.scheduler is not None:
+            self.scheduler.close()
+            self.scheduler = None
     
     def __del__(self):
         """Clean up resources when the service is destroyed"""
         # In a real implementation, this would free up model resources
         pass
+
+
+def get_llm_service(model_path=None):
+    """Return the process-wide LLMService for a model path.
+    
+    Agents and workers in one process share a single copy of the weights
+    instead of each loading their own.
+    """
+    model_path = model_path or os.getenv('LLAMA_MODEL_PATH', 'models/llama-2-7b')
+    key = os.path.abspath(model_path)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = _services[key] = LLMService(model_path)
+        return service
+
+
+def _restart_schedulers_after_fork():
+    # Threads do not survive fork(), so workers forked from a preloaded parent
+    # need their own batch scheduler; the mapped weights are inherited as-is
+    for service in _services.values():
+        if service.scheduler is not None:
+            service.scheduler = BatchScheduler(service._run_batch, service.batch_window_ms, service.max_batch_size)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_schedulers_after_fork)
@@ -0,0 +1,98 @@
+import hashlib
+import time
+
+from AI.models.weights import load_weights, touch_pages
+
+class PrefixState:
+    """Backend state after reading a prompt prefix; a real model's KV cache"""
+    
+    __slots__ = ('tokens', 'kv', 'digest')
+    
+    def __init__(self, tokens, kv, digest):
+        self.tokens = tokens
+        self.kv = kv
+        self.digest = digest
+    
+    @property
+    def nbytes(self):
+        return len(self.kv)
+
+class MockLLMBackend:
+    """Offline stand-in for the Llama backend that returns canned responses"""
+    
+    def __init__(self, token_delay=0.0, prefill_rounds=0):
+        # Optional per-token sleep so streaming behaviour can be observed offline
+        self.token_delay = token_delay
+        # Optional hash rounds per prompt token, so prompt processing costs CPU like a local model
+        self.prefill_rounds = prefill_rounds
+        self.weights = {}
+    
+    def load(self, model_path, use_mmap=True):
+        """Map the model weights, if any exist; the canned responses do not use them"""
+        self.weights = load_weights(model_path, use_mmap=use_mmap)
+        return self.weights
+    
+    def warm_up(self):
+        """Fault in the weight pages ahead of the first request"""
+        return touch_pages(self.weights)
+    
+    def prefill(self, text, state=None):
+        """Read prompt text after state and return the state at its end.
+        
+        Every token costs prefill_rounds hash rounds and adds a row to the
+        KV buffer, so the cost and size grow with the prompt as a real
+        model's do.
+        """
+        kv = bytearray(state.kv) if state is not None else bytearray()
+        digest = state.digest if state is not None else b""
+        tokens = text.split()
+        for token in tokens:
+            digest = hashlib.blake2b(digest + token.encode()).digest()
+            for _ in range(self.prefill_rounds):
+                digest = hashlib.blake2b(digest).digest()
+            kv += digest
+        return PrefixState((state.tokens if state is not None else 0) + len(tokens), kv, digest)
+    
+    def generate_batch(self, prompts, max_tokens=100, temperature=0.7, prefix_states=None):
+        """Generate a completion for every prompt in a single pass.
+        
+        With prefix_states, each prompt is the remainder after the matching
+        state's prefix (None where no prefix matched).
+        """
+        states = prefix_states or [None] * len(prompts)
+        return [self._respond(prompt, state) for prompt, state in zip(prompts, states)]
+    
+    def stream(self, prompt, max_tokens=100, temperature=0.7, prefix_state=None):
+        """Yield the completion for a prompt one token at a time"""
+        words = self._respond(prompt, prefix_state).split(" ")
+        for index, word in enumerate(words[:max_tokens]):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            # Like real tokenizers, tokens after the first carry their leading space
+            yield word if index == 0 else " " + word
+    
+    def _respond(self, prompt, prefix_state=None):
+        if self.prefill_rounds:
+            self.prefill(prompt, prefix_state)
+        
+        # Agent prompts end with the latest patient turn; answer that, not the history
+        if "Patient:" in prompt:
+            prompt = prompt.rsplit("Patient:", 1)[1]
+        
+        # Mock some basic responses for testing
+        prompt_lower = prompt.lower()
+    
+        if "appointment" in prompt_lower and "book" in prompt_lower:
+            return "I'd be happy to help you book an appointment. What symptoms are you experiencing?"
+    
+        elif "reschedule" in prompt_lower:
+            return "I can help you reschedule your appointment. Which appointment would you like to change?"
+    
+        elif "cancel" in prompt_lower:
+            return "I can help you cancel your appointment. Which appointment would you like to cancel?"
+    
+        elif any(symptom in prompt_lower for symptom in ["pain", "fever", "headache", "cough"]):
+            return "I understand you're not feeling well. Could you tell me more about your symptoms and how long you've been experiencing them?"
+    
+        else:
+            return "Thank you for your message. How can I assist you with your healthcare needs today?"
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from AI.utils.lru import SizedLRUCache
+from AI.utils.metrics import registry
+
+shared_hits = registry.counter("llm.response_cache.shared_hits")
+bypassed = registry.counter("llm.response_cache.bypassed")
+
+
+def normalize_prompt(prompt):
+    """Fold case, punctuation and whitespace so near-identical prompts share a key"""
+    folded = unicodedata.normalize("NFKC", prompt).casefold()
+    # Drop punctuation in any script, keep letters, digits and combining marks
+    cleaned = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in folded)
+    return " ".join(cleaned.split())
+
+
+def make_key(prompt, **params):
+    """Cache key for a prompt and the generation parameters that affect its output"""
+    payload = json.dumps([normalize_prompt(prompt), sorted(params.items())], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCacheBackend:
+    """Shared response cache stored in a local SQLite file.
+    
+    Lets several worker processes on one host reuse each other's
+    completions. Any object with the same get/set methods can be used
+    instead, e.g. a Redis-backed implementation.
+    """
+    
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS llm_response_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+    
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+    
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM llm_response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+    
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        self._connection().execute(
+            "INSERT OR REPLACE INTO llm_response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at)
+        )
+
+
+class ResponseCache:
+    """In-process LLM response cache with an optional shared second tier"""
+    
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=3600, skip_intents=(), shared_backend=None):
+        self.local = SizedLRUCache(max_bytes, ttl=ttl, name="llm.response_cache")
+        self.skip_intents = frozenset(skip_intents)
+        self.shared_backend = shared_backend
+    
+    @classmethod
+    def from_env(cls):
+        """Build the cache from environment settings, or return None when disabled"""
+        max_bytes = int(os.getenv("LLM_CACHE_MAX_BYTES", "0"))
+        if max_bytes <= 0:
+            return None
+        ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+        skip_intents = [intent.strip() for intent in os.getenv("LLM_CACHE_SKIP_INTENTS", "").split(",") if intent.strip()]
+        shared_path = os.getenv("LLM_CACHE_SHARED_PATH")
+        shared_backend = SQLiteCacheBackend(shared_path, ttl=ttl) if shared_path else None
+        return cls(max_bytes, ttl, skip_intents, shared_backend)
+    
+    def enabled_for(self, intent):
+        """Whether responses for this intent may be cached"""
+        if intent is not None and intent in self.skip_intents:
+            bypassed.inc()
+            return False
+        return True
+    
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared_backend is not None:
+            value = self.shared_backend.get(key)
+            if value is not None:
+                shared_hits.inc()
+                self.local.set(key, value)
+        return value
+    
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared_backend is not None:
+            self.shared_backend.set(key, value)
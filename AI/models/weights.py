@@ -0,0 +1,69 @@
+import mmap
+import os
+
+# File extensions treated as model weight shards when model_path is a directory
+WEIGHT_EXTENSIONS = ('.bin', '.gguf', '.safetensors', '.pt')
+
+
+def _weight_files(model_path):
+    if os.path.isfile(model_path):
+        return [model_path]
+    if os.path.isdir(model_path):
+        return sorted(
+            os.path.join(model_path, name)
+            for name in os.listdir(model_path)
+            if name.endswith(WEIGHT_EXTENSIONS)
+        )
+    return []
+
+
+def load_weights(model_path, use_mmap=True):
+    """Open every weight shard under model_path.
+    
+    With use_mmap the shards are mapped read-only, so pages are loaded
+    lazily on first touch and shared between processes forked after the
+    load (and with any other process mapping the same files). Without it
+    each shard is read into private memory. Returns a dict of shard path
+    to buffer; empty when no weights exist (e.g. with the mock backend).
+    """
+    shards = {}
+    for path in _weight_files(model_path):
+        with open(path, 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                continue
+            if use_mmap:
+                shards[path] = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                shards[path] = handle.read()
+    return shards
+
+
+def touch_pages(shards, stride=mmap.PAGESIZE):
+    """Fault in every page of the mapped shards so the first request does not pay for it"""
+    checksum = 0
+    for buffer in shards.values():
+        view = memoryview(buffer)
+        for offset in range(0, len(view), stride):
+            checksum ^= view[offset]
+        view.release()
+    return checksum
+
+
+def memory_usage():
+    """Resident and proportional set size of the current process, in bytes.
+    
+    PSS splits shared pages between the processes mapping them, so it shows
+    the real per-worker cost of shared weights; it is None where the kernel
+    does not expose it.
+    """
+    usage = {'rss_bytes': None, 'pss_bytes': None}
+    try:
+        with open('/proc/self/smaps_rollup') as handle:
+            for line in handle:
+                field, value = line.split(':', 1)
+                if field in ('Rss', 'Pss'):
+                    usage[f'{field.lower()}_bytes'] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        usage['rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return usage
@@ -3,6 +3,11 @@ import json
 import sys
 import os
 
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from AI.tools.providers import acall, get_provider
+
 class FindDoctorsTool(BaseTool):
     """Tool to find doctors based on specialty and location"""
     name = "find_doctors"
@@ -10,15 +15,20 @@ class FindDoctorsTool(BaseTool):
     
     def _run(self, specialty, location=None):
         """Find doctors matching the given specialty and location"""
-        # In a real implementation, this would query the database
-        # For now, return mock data
+        provider = get_provider("doctor_search")
+        if provider is not None:
+            return json.dumps(provider.find_doctors(specialty, location))
+        
+        # Without a registered provider, return mock data
         return json.dumps([
             {"id": "1", "name": "Dr. Smith", "specialty": specialty, "location": "New York", "available_slots": ["2023-04-30 10:00", "2023-04-30 14:00"]},
             {"id": "2", "name": "Dr. Johnson", "specialty": specialty, "location": "Chicago", "available_slots": ["2023-05-01 09:00", "2023-05-01 15:00"]},
         ])
     
     async def _arun(self, specialty, location=None):
-        # Async implementation would be similar
+        provider = get_provider("doctor_search")
+        if provider is not None:
+            return json.dumps(await acall(provider, "find_doctors", specialty, location))
         return self._run(specialty, location)
 
 class BookAppointmentTool(BaseTool):
@@ -28,8 +38,26 @@ class BookAppointmentTool(BaseTool):
     
     def _run(self, doctor_id, patient_id, time_slot, symptoms=None):
         """Book an appointment with the specified doctor"""
-        # In a real implementation, this would create an appointment in the database
-        # For now, return mock data
+        availability = get_provider("availability")
+        try:
+            free = availability is None or availability.is_slot_free(doctor_id, time_slot)
+        except (TypeError, ValueError) as exc:
+            # An unparseable slot or doctor id, e.g. "tomorrow at 10am"
+            return json.dumps({"error": str(exc)})
+        if not free:
+            # Offer the doctor's next open slots instead
+            alternatives = availability.available_slots([int(doctor_id)], per_doctor=3)
+            return json.dumps({
+                "error": "Time slot is not available",
+                "doctor_id": doctor_id,
+                "available_slots": alternatives.get(int(doctor_id), [])
+            })
+        
+        booking = get_provider("booking")
+        if booking is not None:
+            return json.dumps(booking.book(doctor_id, patient_id, time_slot, symptoms))
+        
+        # Without a registered provider, return mock data
         return json.dumps({
             "appointment_id": "123",
             "doctor_id": doctor_id,
@@ -40,7 +68,22 @@ class BookAppointmentTool(BaseTool):
         })
     
     async def _arun(self, doctor_id, patient_id, time_slot, symptoms=None):
-        # Async implementation would be similar
+        availability = get_provider("availability")
+        try:
+            free = availability is None or await acall(availability, "is_slot_free", doctor_id, time_slot)
+        except (TypeError, ValueError) as exc:
+            return json.dumps({"error": str(exc)})
+        if not free:
+            alternatives = await acall(availability, "available_slots", [int(doctor_id)], per_doctor=3)
+            return json.dumps({
+                "error": "Time slot is not available",
+                "doctor_id": doctor_id,
+                "available_slots": alternatives.get(int(doctor_id), [])
+            })
+        
+        booking = get_provider("booking")
+        if booking is not None:
+            return json.dumps(await acall(booking, "book", doctor_id, patient_id, time_slot, symptoms))
         return self._run(doctor_id, patient_id, time_slot, symptoms)
 
 class RescheduleAppointmentTool(BaseTool):
@@ -50,8 +93,26 @@ class RescheduleAppointmentTool(BaseTool):
     
     def _run(self, appointment_id, new_time_slot):
         """Reschedule the specified appointment"""
-        # In a real implementation, this would update the appointment in the database
-        # For now, return mock data
+        availability = get_provider("availability")
+        if availability is not None:
+            try:
+                doctor_id, free = availability.is_move_free(appointment_id, new_time_slot)
+            except (TypeError, ValueError) as exc:
+                return json.dumps({"error": str(exc)})
+            if not free:
+                # Outside the doctor's hours or taken; offer the doctor's next open slots
+                alternatives = availability.available_slots([doctor_id], per_doctor=3)
+                return json.dumps({
+                    "error": "Time slot is not available",
+                    "doctor_id": str(doctor_id),
+                    "available_slots": alternatives.get(doctor_id, [])
+                })
+        
+        booking = get_provider("booking")
+        if booking is not None:
+            return json.dumps(booking.reschedule(appointment_id, new_time_slot))
+        
+        # Without a registered provider, return mock data
         return json.dumps({
             "appointment_id": appointment_id,
             "new_time": new_time_slot,
@@ -59,7 +120,23 @@ class RescheduleAppointmentTool(BaseTool):
         })
     
     async def _arun(self, appointment_id, new_time_slot):
-        # Async implementation would be similar
+        availability = get_provider("availability")
+        if availability is not None:
+            try:
+                doctor_id, free = await acall(availability, "is_move_free", appointment_id, new_time_slot)
+            except (TypeError, ValueError) as exc:
+                return json.dumps({"error": str(exc)})
+            if not free:
+                alternatives = await acall(availability, "available_slots", [doctor_id], per_doctor=3)
+                return json.dumps({
+                    "error": "Time slot is not available",
+                    "doctor_id": str(doctor_id),
+                    "available_slots": alternatives.get(doctor_id, [])
+                })
+        
+        booking = get_provider("booking")
+        if booking is not None:
+            return json.dumps(await acall(booking, "reschedule", appointment_id, new_time_slot))
         return self._run(appointment_id, new_time_slot)
 
 class CancelAppointmentTool(BaseTool):
@@ -69,15 +146,20 @@ class CancelAppointmentTool(BaseTool):
     
     def _run(self, appointment_id):
         """Cancel the specified appointment"""
-        # In a real implementation, this would update the appointment in the database
-        # For now, return mock data
+        booking = get_provider("booking")
+        if booking is not None:
+            return json.dumps(booking.cancel(appointment_id))
+        
+        # Without a registered provider, return mock data
         return json.dumps({
             "appointment_id": appointment_id,
             "status": "cancelled"
         })
     
     async def _arun(self, appointment_id):
-        # Async implementation would be similar
+        booking = get_provider("booking")
+        if booking is not None:
+            return json.dumps(await acall(booking, "cancel", appointment_id))
         return self._run(appointment_id)
 
 class GetPatientAppointmentsTool(BaseTool):
@@ -87,13 +169,18 @@ class GetPatientAppointmentsTool(BaseTool):
     
     def _run(self, patient_id):
         """Get appointments for the specified patient"""
-        # In a real implementation, this would query the database
-        # For now, return mock data
+        provider = get_provider("patient_records")
+        if provider is not None:
+            return json.dumps(provider.appointments(patient_id))
+        
+        # Without a registered provider, return mock data
         return json.dumps([
             {"id": "123", "doctor": "Dr. Smith", "time": "2023-04-30 10:00", "status": "scheduled"},
             {"id": "456", "doctor": "Dr. Johnson", "time": "2023-05-01 15:00", "status": "scheduled"},
         ])
     
     async def _arun(self, patient_id):
-        # Async implementation would be similar
+        provider = get_provider("patient_records")
+        if provider is not None:
+            return json.dumps(await acall(provider, "appointments", patient_id))
         return self._run(patient_id)
@@ -4,6 +4,11 @@ import sys
 import os
 from datetime import datetime, timedelta
 
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from AI.tools.providers import acall, get_provider
+
 class GetDoctorScheduleTool(BaseTool):
     """Tool to get a doctor's schedule"""
     name = "get_doctor_schedule"
@@ -11,8 +16,11 @@ class GetDoctorScheduleTool(BaseTool):
     
     def _run(self, doctor_id, date=None):
         """Get the schedule for the specified doctor"""
-        # In a real implementation, this would query the database
-        # For now, return mock data
+        provider = get_provider("schedules")
+        if provider is not None:
+            return json.dumps(provider.schedule(doctor_id, date))
+        
+        # Without a registered provider, return mock data
         today = datetime.now().strftime("%Y-%m-%d")
         tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
         
@@ -26,7 +34,9 @@ class GetDoctorScheduleTool(BaseTool):
         })
     
     async def _arun(self, doctor_id, date=None):
-        # Async implementation would be similar
+        provider = get_provider("schedules")
+        if provider is not None:
+            return json.dumps(await acall(provider, "schedule", doctor_id, date))
         return self._run(doctor_id, date)
 
 class UpdateAvailabilityTool(BaseTool):
@@ -36,14 +46,17 @@ class UpdateAvailabilityTool(BaseTool):
     
     def _run(self, doctor_id, availability):
         """Update the availability for the specified doctor"""
-        # In a real implementation, this would update the database
-        # For now, just return success
         if isinstance(availability, str):
             try:
                 availability = json.loads(availability)
             except json.JSONDecodeError:
                 return json.dumps({"error": "Invalid JSON in availability"})
         
+        provider = get_provider("availability")
+        if provider is not None:
+            return json.dumps(provider.update_availability(doctor_id, availability))
+        
+        # Without a registered provider, just return success
         return json.dumps({
             "success": True,
             "doctor_id": doctor_id,
@@ -51,7 +64,15 @@ class UpdateAvailabilityTool(BaseTool):
         })
     
     async def _arun(self, doctor_id, availability):
-        # Async implementation would be similar
+        provider = get_provider("availability")
+        if provider is not None and not isinstance(availability, str):
+            return json.dumps(await acall(provider, "update_availability", doctor_id, availability))
+        if provider is not None:
+            try:
+                availability = json.loads(availability)
+            except json.JSONDecodeError:
+                return json.dumps({"error": "Invalid JSON in availability"})
+            return json.dumps(await acall(provider, "update_availability", doctor_id, availability))
         return self._run(doctor_id, availability)
 
 class GetPatientHistoryTool(BaseTool):
@@ -61,8 +82,11 @@ class GetPatientHistoryTool(BaseTool):
     
     def _run(self, patient_id):
         """Get the medical history for the specified patient"""
-        # In a real implementation, this would query the database
-        # For now, return mock data
+        provider = get_provider("patient_records")
+        if provider is not None:
+            return json.dumps(provider.history(patient_id))
+        
+        # Without a registered provider, return mock data
         return json.dumps({
             "patient_id": patient_id,
             "name": "John Doe",
@@ -79,7 +103,9 @@ class GetPatientHistoryTool(BaseTool):
         })
     
     async def _arun(self, patient_id):
-        # Async implementation would be similar
+        provider = get_provider("patient_records")
+        if provider is not None:
+            return json.dumps(await acall(provider, "history", patient_id))
         return self._run(patient_id)
 
 class AddAppointmentNotesTool(BaseTool):
@@ -89,8 +115,11 @@ class AddAppointmentNotesTool(BaseTool):
     
     def _run(self, appointment_id, notes):
         """Add notes to the specified appointment"""
-        # In a real implementation, this would update the database
-        # For now, just return success
+        provider = get_provider("schedules")
+        if provider is not None:
+            return json.dumps(provider.add_notes(appointment_id, notes))
+        
+        # Without a registered provider, just return success
         return json.dumps({
             "success": True,
             "appointment_id": appointment_id,
@@ -98,5 +127,7 @@ class AddAppointmentNotesTool(BaseTool):
         })
     
     async def _arun(self, appointment_id, notes):
-        # Async implementation would be similar
+        provider = get_provider("schedules")
+        if provider is not None:
+            return json.dumps(await acall(provider, "add_notes", appointment_id, notes))
         return self._run(appointment_id, notes)
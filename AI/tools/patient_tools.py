@@ -3,6 +3,12 @@ import json
 import sys
 import os
 
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from AI.tools.providers import acall, get_provider
+from AI.utils.symptom_lexicon import get_symptom_lexicon
+
 class ExtractSymptomsTool(BaseTool):
     """Tool to extract symptoms from patient messages"""
     name = "extract_symptoms"
@@ -11,28 +17,15 @@ class ExtractSymptomsTool(BaseTool):
     def _run(self, message):
         """Extract symptoms from the given message"""
         # In a real implementation, this would use NLP/LLM to extract symptoms
-        # For now, use a simple keyword approach
-        symptoms = []
-        symptom_keywords = {
-            "headache": "Head pain",
-            "fever": "Elevated body temperature",
-            "cough": "Expulsion of air from lungs",
-            "pain": "Discomfort",
-            "chest pain": "Discomfort in chest",
-            "stomachache": "Abdominal pain",
-            "nausea": "Feeling of sickness with an inclination to vomit",
-            "dizziness": "Feeling of being unsteady or lightheaded"
-        }
-        
-        message_lower = message.lower()
-        for keyword, description in symptom_keywords.items():
-            if keyword in message_lower:
-                symptoms.append({"name": keyword, "description": description})
-        
-        return json.dumps(symptoms)
+        # For now, match against the shared symptom lexicon
+        return json.dumps(get_symptom_lexicon().extract(message))
+    
+    def extract_batch(self, messages):
+        """Extract symptoms from many messages, e.g. to back-fill appointments"""
+        return get_symptom_lexicon().extract_batch(messages)
     
     async def _arun(self, message):
-        # Async implementation would be similar
+        # In-memory matching takes microseconds, so it runs on the event loop
         return self._run(message)
 
 class GetPatientProfileTool(BaseTool):
@@ -42,26 +35,31 @@ class GetPatientProfileTool(BaseTool):
     
     def _run(self, patient_id=None, whatsapp_number=None):
         """Get profile for the specified patient"""
-        # In a real implementation, this would query the database
-        # For now, return mock data
-        if patient_id or whatsapp_number:
-            return json.dumps({
-                "id": patient_id or "123",
-                "name": "John Doe",
-                "age": 35,
-                "gender": "Male",
-                "location": "Mumbai",
-                "medical_history": {
-                    "allergies": ["Penicillin"],
-                    "chronic_conditions": [],
-                    "previous_surgeries": ["Appendectomy 2018"]
-                }
-            })
-        else:
+        if not (patient_id or whatsapp_number):
             return json.dumps({"error": "Must provide either patient_id or whatsapp_number"})
+        
+        provider = get_provider("patient_records")
+        if provider is not None:
+            return json.dumps(provider.profile(patient_id, whatsapp_number))
+        
+        # Without a registered provider, return mock data
+        return json.dumps({
+            "id": patient_id or "123",
+            "name": "John Doe",
+            "age": 35,
+            "gender": "Male",
+            "location": "Mumbai",
+            "medical_history": {
+                "allergies": ["Penicillin"],
+                "chronic_conditions": [],
+                "previous_surgeries": ["Appendectomy 2018"]
+            }
+        })
     
     async def _arun(self, patient_id=None, whatsapp_number=None):
-        # Async implementation would be similar
+        provider = get_provider("patient_records")
+        if provider is not None and (patient_id or whatsapp_number):
+            return json.dumps(await acall(provider, "profile", patient_id, whatsapp_number))
         return self._run(patient_id, whatsapp_number)
 
 class UpdatePatientProfileTool(BaseTool):
@@ -71,14 +69,17 @@ class UpdatePatientProfileTool(BaseTool):
     
     def _run(self, patient_id, updates):
         """Update the specified patient's profile"""
-        # In a real implementation, this would update the database
-        # For now, just return success
         if isinstance(updates, str):
             try:
                 updates = json.loads(updates)
             except json.JSONDecodeError:
                 return json.dumps({"error": "Invalid JSON in updates"})
         
+        provider = get_provider("patient_records")
+        if provider is not None:
+            return json.dumps(provider.update_profile(patient_id, updates))
+        
+        # Without a registered provider, just return success
         return json.dumps({
             "success": True,
             "patient_id": patient_id,
@@ -86,5 +87,13 @@ class UpdatePatientProfileTool(BaseTool):
         })
     
     async def _arun(self, patient_id, updates):
-        # Async implementation would be similar
+        provider = get_provider("patient_records")
+        if provider is not None and not isinstance(updates, str):
+            return json.dumps(await acall(provider, "update_profile", patient_id, updates))
+        if provider is not None:
+            try:
+                updates = json.loads(updates)
+            except json.JSONDecodeError:
+                return json.dumps({"error": "Invalid JSON in updates"})
+            return json.dumps(await acall(provider, "update_profile", patient_id, updates))
         return self._run(patient_id, updates)
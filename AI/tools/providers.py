@@ -0,0 +1,36 @@
+import asyncio
+import threading
+
+# Data providers registered by the host application (e.g. the Django backend).
+# Tools look them up by name and fall back to mock data when none is registered,
+# which keeps the AI package free of any database dependency.
+_providers = {}
+_lock = threading.Lock()
+
+
+def register_provider(name, provider):
+    """Register the object that serves a tool's data"""
+    with _lock:
+        _providers[name] = provider
+
+
+def unregister_provider(name):
+    with _lock:
+        _providers.pop(name, None)
+
+
+def get_provider(name):
+    """Return the registered provider, or None"""
+    return _providers.get(name)
+
+
+async def acall(provider, method, *args, **kwargs):
+    """Call a provider method from a tool's _arun without blocking the event loop.
+
+    Providers may define a coroutine named "a" + method; otherwise the
+    blocking method runs on a worker thread.
+    """
+    native = getattr(provider, f"a{method}", None)
+    if native is not None:
+        return await native(*args, **kwargs)
+    return await asyncio.to_thread(getattr(provider, method), *args, **kwargs)
@@ -0,0 +1,132 @@
+import math
+import re
+import sys
+
+from AI.utils.lru import SizedLRUCache
+
+
+def count_tokens(text):
+    """Cheap token estimate (~4 characters per token for Llama-style tokenizers)"""
+    return math.ceil(len(text) / 4)
+
+
+def _first_sentence(text, limit=160):
+    sentence = re.split(r'(?<=[.!?।])\s', text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit].rstrip() + "…"
+
+
+def extractive_summarizer(summary, turns, token_budget):
+    """Fold evicted turns into the summary, keeping the most recent facts within budget.
+    
+    Stands in for an LLM summarizer; any callable with this signature can
+    be passed to ConversationMemory instead.
+    """
+    lines = summary.splitlines() if summary else []
+    lines.extend(f"{role}: {_first_sentence(text)}" for role, text in turns)
+    while lines and count_tokens("\n".join(lines)) > token_budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class MemoryPolicy:
+    """Window and token limits, shared by every memory in a store rather than copied into each"""
+    __slots__ = ('token_budget', 'window_turns', 'summarizer')
+    
+    def __init__(self, token_budget=1024, window_turns=12, summarizer=extractive_summarizer):
+        self.token_budget = token_budget
+        self.window_turns = window_turns
+        self.summarizer = summarizer
+
+
+class ConversationMemory:
+    """Sliding window of recent turns plus a rolling summary of older ones.
+    
+    The window is trimmed whenever it holds more than window_turns turns or
+    summary and window together exceed token_budget, so the context added
+    to each prompt stays bounded however long the conversation runs. This
+    is the only per-conversation agent state, so it holds just the data
+    and a reference to its store's policy.
+    """
+    __slots__ = ('policy', 'summary', 'turns', 'total_turns')
+    
+    def __init__(self, token_budget=1024, window_turns=12, summarizer=extractive_summarizer, policy=None):
+        self.policy = policy or MemoryPolicy(token_budget, window_turns, summarizer)
+        self.summary = ""
+        self.turns = []  # [(role, text), ...] oldest first
+        self.total_turns = 0
+    
+    def add_turn(self, role, text):
+        self.turns.append((role, text))
+        self.total_turns += 1
+        self._compact()
+    
+    def _tokens(self):
+        return count_tokens(self.summary) + sum(count_tokens(text) for _, text in self.turns)
+    
+    def _compact(self):
+        policy = self.policy
+        evicted = []
+        while len(self.turns) > policy.window_turns:
+            evicted.append(self.turns.pop(0))
+        # Keep at least the latest turn even if it alone is over budget
+        while len(self.turns) > 1 and self._tokens() > policy.token_budget:
+            evicted.append(self.turns.pop(0))
+        if evicted:
+            self.summary = policy.summarizer(self.summary, evicted, policy.token_budget // 4)
+    
+    def prompt_context(self):
+        """Render the summary and recent turns for inclusion in a prompt"""
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of earlier conversation:\n{self.summary}")
+        parts.extend(f"{role}: {text}" for role, text in self.turns)
+        return "\n".join(parts)
+    
+    def to_dict(self):
+        return {"summary": self.summary, "turns": [list(turn) for turn in self.turns], "total_turns": self.total_turns}
+    
+    @classmethod
+    def from_dict(cls, data, **kwargs):
+        memory = cls(**kwargs)
+        if data:
+            memory.summary = data.get("summary", "")
+            memory.turns = [tuple(turn) for turn in data.get("turns", [])]
+            memory.total_turns = data.get("total_turns", len(memory.turns))
+        return memory
+    
+    def size_bytes(self):
+        return sys.getsizeof(self.summary) + sum(
+            sys.getsizeof(role) + sys.getsizeof(text) + 64 for role, text in self.turns
+        )
+
+
+class ConversationMemoryStore:
+    """Caches hot conversation memories in-process and persists them through callbacks.
+    
+    loader(key) returns a previously saved dict (or None) and saver(key,
+    data) persists one; without them memories live only in the cache.
+    Cached memories are evicted least-recently-used by total size.
+    """
+    
+    def __init__(self, loader=None, saver=None, max_bytes=32 * 1024 * 1024, token_budget=1024, window_turns=12):
+        self.loader = loader
+        self.saver = saver
+        self.policy = MemoryPolicy(token_budget, window_turns)
+        self.cache = SizedLRUCache(max_bytes, name="conversation_memory", sizeof=lambda memory: memory.size_bytes())
+    
+    def get(self, key):
+        memory = self.cache.get(key)
+        if memory is None:
+            data = self.loader(key) if self.loader else None
+            memory = ConversationMemory.from_dict(data, policy=self.policy)
+            self.cache.set(key, memory)
+        return memory
+    
+    def save(self, key, memory):
+        # Re-inserting refreshes the entry's recorded size after new turns
+        self.cache.set(key, memory)
+        if self.saver:
+            self.saver(key, memory.to_dict())
+    
+    def forget(self, key):
+        self.cache.delete(key)
@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+
+from AI.utils.phrase_matcher import PhraseMatcher, normalize_text
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+class IntentMatch:
+    """An intent found in a message, with its score and the phrases that triggered it"""
+    __slots__ = ('intent', 'score', 'phrases')
+    
+    def __init__(self, intent, score, phrases):
+        self.intent = intent
+        self.score = score
+        self.phrases = phrases
+    
+    def to_dict(self):
+        return {"intent": self.intent, "score": self.score, "phrases": self.phrases}
+    
+    def __repr__(self):
+        return f"IntentMatch({self.intent!r}, {self.score}, {self.phrases!r})"
+
+
+class IntentEngine:
+    """Keyword intent classifier backed by a single compiled phrase matcher.
+    
+    Tables map each intent to its phrases, either as a list (weight 1.0)
+    or as a {phrase: weight} dict. An intent's score is the summed weight
+    of the distinct phrases found; ties go to the intent listed first.
+    """
+    
+    def __init__(self, tables, default_intent="GENERAL_INQUIRY"):
+        self.default_intent = default_intent
+        self.order = {intent: index for index, intent in enumerate(tables)}
+        self.phrase_weights = {}  # normalized phrase -> [(intent, weight), ...]
+        for intent, phrases in tables.items():
+            if not isinstance(phrases, dict):
+                phrases = {phrase: 1.0 for phrase in phrases}
+            for phrase, weight in phrases.items():
+                self.phrase_weights.setdefault(normalize_text(phrase), []).append((intent, float(weight)))
+        self.matcher = PhraseMatcher(self.phrase_weights)
+    
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Load intent tables from a JSON file"""
+        with open(path, encoding='utf-8') as handle:
+            return cls(json.load(handle), **kwargs)
+    
+    def classify(self, text):
+        """Return every matching intent, best first"""
+        scores = {}
+        for phrase in dict.fromkeys(self.matcher.find_all(text)):
+            for intent, weight in self.phrase_weights[phrase]:
+                score, phrases = scores.get(intent, (0.0, []))
+                phrases.append(phrase)
+                scores[intent] = (score + weight, phrases)
+        matches = [IntentMatch(intent, score, phrases) for intent, (score, phrases) in scores.items()]
+        matches.sort(key=lambda match: (-match.score, self.order[match.intent]))
+        return matches
+    
+    def top_intent(self, text):
+        """Return the best-scoring intent, or the default intent when nothing matches"""
+        matches = self.classify(text)
+        return matches[0].intent if matches else self.default_intent
+    
+    def classify_batch(self, texts):
+        """Classify many texts, e.g. when re-classifying stored messages"""
+        return [self.classify(text) for text in texts]
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_intent_engine(name):
+    """Return the process-wide engine for 'patient' or 'doctor'.
+    
+    Tables come from <NAME>_INTENTS_PATH when set, otherwise from the
+    bundled data/<name>_intents.json.
+    """
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            path = os.getenv(f'{name.upper()}_INTENTS_PATH') or os.path.join(DATA_DIR, f'{name}_intents.json')
+            engine = _engines[name] = IntentEngine.from_file(path)
+        return engine
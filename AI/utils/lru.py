@@ -0,0 +1,232 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from AI.utils.metrics import registry
+
+
+def estimate_size(value):
+    """Rough in-memory footprint of a cached value, in bytes"""
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class SizedLRUCache:
+    """Thread-safe LRU cache bounded by total size in bytes, with optional TTL.
+    
+    Hit, miss and eviction counts are published to the metrics registry
+    under the given name.
+    """
+    
+    def __init__(self, max_bytes, ttl=None, name="cache", sizeof=estimate_size):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self.hits = registry.counter(f"{name}.hits")
+        self.misses = registry.counter(f"{name}.misses")
+        self.evictions = registry.counter(f"{name}.evictions")
+        self.size_gauge = registry.gauge(f"{name}.bytes")
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses.inc()
+                return default
+            self._entries.move_to_end(key)
+        self.hits.inc()
+        return entry[0]
+    
+    def set(self, key, value, ttl=None):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return False
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions.inc()
+            self.size_gauge.set(self.total_bytes)
+        return True
+    
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.size_gauge.set(self.total_bytes)
+                return True
+        return False
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.size_gauge.set(0)
+    
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+
+class _Load:
+    """A miss being loaded; concurrent misses for the same key wait on it"""
+    
+    __slots__ = ('done', 'value', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReadThroughCache:
+    """Thread-safe read-through cache with LRU + TTL eviction and tag invalidation.
+    
+    get_or_load(key, loader) returns the cached value or calls loader(),
+    which returns (value, tags). Concurrent misses for one key share a
+    single loader call. invalidate(*tags) drops every entry loaded with
+    any of those tags, so writers can evict exactly the entries built from
+    the rows they changed. A load that overlaps an invalidation is handed
+    to its callers but not cached, as it may have read the old rows.
+    
+    Hits, misses, shared loads, invalidations and evictions are published
+    to the metrics registry under the given name, with a hit_rate gauge.
+    Cached values are shared between callers and must not be mutated.
+    """
+    
+    def __init__(self, max_entries=10000, ttl=None, name="cache"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, tags, expires_at)
+        self._tagged = {}  # tag -> set of keys
+        self._loads = {}  # key -> _Load
+        self._generation = 0  # Bumped by every invalidation
+        self._lock = threading.Lock()
+        self.hits = registry.counter(f"{name}.hits")
+        self.misses = registry.counter(f"{name}.misses")
+        self.shared_loads = registry.counter(f"{name}.shared_loads")
+        self.invalidations = registry.counter(f"{name}.invalidations")
+        self.evictions = registry.counter(f"{name}.evictions")
+        self.entries_gauge = registry.gauge(f"{name}.entries")
+        self.hit_rate = registry.gauge(f"{name}.hit_rate")
+    
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._count(self.hits)
+                return entry[0]
+            self._count(self.misses)
+            load = self._loads.get(key)
+            owner = load is None
+            if owner:
+                load = self._loads[key] = _Load()
+                generation = self._generation
+        
+        if not owner:
+            self.shared_loads.inc()
+            load.done.wait()
+            if load.error is not None:
+                raise load.error
+            return load.value
+        
+        try:
+            value, tags = loader()
+        except BaseException as exc:
+            load.error = exc
+            raise
+        else:
+            load.value = value
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, value, tags)
+            return value
+        finally:
+            with self._lock:
+                del self._loads[key]
+            load.done.set()
+    
+    def invalidate(self, *tags):
+        """Drop every entry loaded with any of the given tags"""
+        with self._lock:
+            self._generation += 1
+            dropped = 0
+            for tag in tags:
+                for key in list(self._tagged.get(tag, ())):
+                    self._remove(key)
+                    dropped += 1
+            self.entries_gauge.set(len(self._entries))
+        if dropped:
+            self.invalidations.inc(dropped)
+        return dropped
+    
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tagged.clear()
+            self.entries_gauge.set(0)
+    
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _count(self, counter):
+        # Caller holds the lock, so the two counters are read consistently
+        counter.inc()
+        total = self.hits.value + self.misses.value
+        self.hit_rate.set(self.hits.value / total if total else 0.0)
+    
+    def _store(self, key, value, tags):
+        if key in self._entries:
+            self._remove(key)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        tags = frozenset(tags)
+        self._entries[key] = (value, tags, expires_at)
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions.inc()
+        self.entries_gauge.set(len(self._entries))
+    
+    def _remove(self, key):
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
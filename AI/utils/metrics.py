@@ -0,0 +1,147 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Default histogram buckets, in seconds, covering sub-millisecond work up to slow LLM turns
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter:
+    """Monotonically increasing counter"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return {"type": "counter", "value": self.value}
+
+
+class Gauge:
+    """Value that can go up and down, e.g. a queue depth"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def snapshot(self):
+        return {"type": "gauge", "value": self.value}
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate quantiles"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is the +Inf bucket
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager that observes the elapsed wall time of its block"""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Approximate quantile, reported as the upper bound of the bucket it falls into"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = q * self.count
+            running = 0
+            for index, bucket_count in enumerate(self.counts):
+                running += bucket_count
+                if running >= target:
+                    return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            buckets = {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+            buckets["+Inf"] = self.counts[-1]
+            count, total = self.count, self.sum
+        return {
+            "type": "histogram",
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """Process-wide registry of named metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name):
+        return self._get_or_create(name, Counter)
+
+    def gauge(self, name):
+        return self._get_or_create(name, Gauge)
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(name, lambda: Histogram(buckets))
+
+    def snapshot(self):
+        """Return a JSON-serializable view of every registered metric"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {name: metric.snapshot() for name, metric in sorted(metrics.items())}
+
+    def clear(self):
+        with self._lock:
+            self._metrics = {}
+
+
+# Shared registry used by the AI services and the Django backend
+registry = MetricsRegistry()
@@ -0,0 +1,65 @@
+import re
+import unicodedata
+
+# Characters that count as part of a word, including Devanagari vowel signs and
+# other combining marks that str.isalnum() (and so \w) does not cover
+WORD_CHARS = r"\w\u0300-\u036f\u0900-\u097f"
+
+
+def normalize_text(text):
+    """Unicode-normalize, case-fold and collapse whitespace"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def _trie_to_pattern(node):
+    # node: dict of char -> child node; the key "" marks the end of a phrase
+    terminal = "" in node
+    branches = []
+    for char in sorted(key for key in node if key):
+        piece = r"\s+" if char == " " else re.escape(char)
+        branches.append(piece + _trie_to_pattern(node[char]))
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if terminal:
+        # Greedy optional: the longer phrase wins, the shorter one is the fallback
+        body = "(?:" + body + ")?"
+    return body
+
+
+class PhraseMatcher:
+    """Finds many phrases in a text with a single regex pass.
+    
+    The phrases are compiled into a character trie rendered as one regular
+    expression, so the scan cost depends on the text length and not on the
+    number of phrases. Matches respect word boundaries and, at any
+    position, the longest phrase wins ("chest pain" over "pain").
+    """
+    
+    def __init__(self, phrases):
+        self.phrases = {normalize_text(phrase) for phrase in phrases if phrase.strip()}
+        self._regex = self._compile(self.phrases)
+    
+    @staticmethod
+    def _compile(phrases):
+        if not phrases:
+            return None
+        trie = {}
+        for phrase in phrases:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[""] = True
+        return re.compile(f"(?<![{WORD_CHARS}])(?:{_trie_to_pattern(trie)})(?![{WORD_CHARS}])")
+    
+    def find_all(self, text, normalized=False):
+        """Return the matched phrases, in order of appearance"""
+        if self._regex is None:
+            return []
+        if not normalized:
+            text = normalize_text(text)
+        return [" ".join(match.group().split()) for match in self._regex.finditer(text)]
+    
+    def find_batch(self, texts):
+        """Return find_all() for each text"""
+        return [self.find_all(text) for text in texts]
@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+
+from AI.utils.phrase_matcher import PhraseMatcher, normalize_text
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+class SymptomLexicon:
+    """Symptom names and synonyms compiled into one phrase matcher.
+    
+    Each entry is {"name", "description", "synonyms"}; any synonym found in
+    a message is reported under its canonical name. Matching is on word
+    boundaries and prefers the longest phrase, so "chest pain" is not also
+    reported as "pain".
+    """
+    
+    def __init__(self, entries):
+        self.entries = {}
+        self.canonical = {}  # normalized phrase -> canonical symptom name
+        for entry in entries:
+            name = entry["name"]
+            self.entries[name] = {"name": name, "description": entry.get("description", "")}
+            for phrase in [name] + list(entry.get("synonyms", [])):
+                # The first entry to claim a phrase keeps it
+                self.canonical.setdefault(normalize_text(phrase), name)
+        self.matcher = PhraseMatcher(self.canonical)
+    
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as handle:
+            return cls(json.load(handle))
+    
+    def __len__(self):
+        return len(self.canonical)
+    
+    def extract(self, message):
+        """Return the distinct symptoms in a message, in order of first mention"""
+        names = dict.fromkeys(self.canonical[phrase] for phrase in self.matcher.find_all(message))
+        return [self.entries[name] for name in names]
+    
+    def extract_batch(self, messages):
+        """Return extract() for every message"""
+        return [self.extract(message) for message in messages]
+
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+def get_symptom_lexicon():
+    """Return the process-wide lexicon, loading it on first use.
+    
+    Uses SYMPTOM_LEXICON_PATH when set, otherwise the bundled
+    data/symptom_lexicon.json. That file is a seed list of common
+    symptoms, with English, Hinglish and Hindi synonyms; point
+    SYMPTOM_LEXICON_PATH at a full lexicon in the same format for
+    production use.
+    """
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            path = os.getenv('SYMPTOM_LEXICON_PATH') or os.path.join(DATA_DIR, 'symptom_lexicon.json')
+            _lexicon = SymptomLexicon.from_file(path)
+        return _lexicon
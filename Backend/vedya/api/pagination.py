@@ -0,0 +1,112 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows fetched per query while streaming an export
+STREAM_BATCH_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row, field):
+    value = getattr(row, field)
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    payload = json.dumps([value, row.pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if field != 'id':
+            value = parse_datetime(value) if isinstance(value, str) else None
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    # Anything else would reach the database as a lookup value; bool is an int subclass
+    if not isinstance(last_id, int) or isinstance(last_id, bool) or value is None:
+        raise InvalidCursor('Invalid cursor')
+    if field == 'id' and value != last_id:
+        raise InvalidCursor('Invalid cursor')
+    return value, last_id
+
+
+def _after(queryset, field, value, last_id):
+    """Rows strictly after (value, id) in (field, id) order, answerable from an index"""
+    if field == 'id':
+        return queryset.filter(id__gt=last_id)
+    return queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': last_id}))
+
+
+def _ordered(queryset, field):
+    return queryset.order_by(field, 'id') if field != 'id' else queryset.order_by('id')
+
+
+def page_size(request):
+    try:
+        size = int(request.query_params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        size = DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(request, queryset, serialize, field='id'):
+    """One page of results after the request's cursor, with the cursor for the next page.
+
+    Each page is a single indexed range query, so deep pages cost the same
+    as the first one, unlike OFFSET pagination.
+    """
+    size = page_size(request)
+    queryset = _ordered(queryset, field)
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        queryset = _after(queryset, field, *decode_cursor(cursor, field))
+    rows = list(queryset[:size + 1])
+    next_cursor = encode_cursor(rows[size - 1], field) if len(rows) > size else None
+    return {
+        'results': [serialize(row) for row in rows[:size]],
+        'next_cursor': next_cursor,
+    }
+
+
+def _batches(queryset, field):
+    queryset = _ordered(queryset, field)
+    page = list(queryset[:STREAM_BATCH_SIZE])
+    while page:
+        yield page
+        if len(page) < STREAM_BATCH_SIZE:
+            return
+        last = page[-1]
+        page = list(_after(queryset, field, getattr(last, field), last.pk)[:STREAM_BATCH_SIZE])
+
+
+def stream_response(queryset, serialize, field='id', mode='ndjson'):
+    """Stream every matching row as NDJSON or one JSON array.
+
+    Rows are fetched in keyset batches and written as they are serialized,
+    so memory use does not grow with the size of the export.
+    """
+    def ndjson():
+        for batch in _batches(queryset, field):
+            yield ''.join(json.dumps(serialize(row)) + '\n' for row in batch)
+
+    def json_array():
+        yield '['
+        first = True
+        for batch in _batches(queryset, field):
+            chunk = ','.join(json.dumps(serialize(row)) for row in batch)
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']'
+
+    if mode == 'json':
+        return StreamingHttpResponse(json_array(), content_type='application/json')
+    return StreamingHttpResponse(ndjson(), content_type='application/x-ndjson')
@@ -0,0 +1,86 @@
+import logging
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.db import connection
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+budget_exceeded = registry.counter('db.budget_exceeded')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """An endpoint ran more queries than its declared budget (strict mode only)"""
+
+
+def query_budget(limit):
+    """Declare the most queries a view may run per request.
+
+    Apply outside @api_view so the middleware sees it on the resolved view.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+class _QueryStats:
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class QueryBudgetMiddleware:
+    """Record query count and database time per endpoint.
+
+    Metrics go to db.queries.<url name> and db.seconds.<url name>. With
+    QUERY_BUDGET_STRICT enabled (tests, load runs), a request that runs
+    more queries than its view's @query_budget raises QueryBudgetExceeded
+    instead of only being logged. Streamed bodies are not counted, as
+    their queries run after the response leaves the middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = _QueryStats()
+        request.query_budget = None
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = (match.url_name or match.view_name) if match else 'unresolved'
+        registry.histogram(f'db.queries.{endpoint}', QUERY_COUNT_BUCKETS).observe(stats.count)
+        registry.histogram(f'db.seconds.{endpoint}').observe(stats.seconds)
+
+        budget = request.query_budget
+        if budget is not None and stats.count > budget:
+            budget_exceeded.inc()
+            message = f'{endpoint} ran {stats.count} queries, over its budget of {budget}'
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
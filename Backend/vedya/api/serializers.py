@@ -0,0 +1,38 @@
+from vedya.core.availability import format_slot
+
+
+def serialize_doctor(doctor):
+    return {
+        'id': doctor.id,
+        'name': doctor.user.get_full_name(),
+        'specialization': doctor.specialization,
+        'experience_years': doctor.experience_years,
+        'location': doctor.location,
+        'phone_number': doctor.phone_number,
+        'whatsapp_enabled': doctor.whatsapp_enabled,
+    }
+
+
+def serialize_patient(patient):
+    return {
+        'id': patient.id,
+        'full_name': patient.full_name,
+        'whatsapp_number': patient.whatsapp_number,
+        'age': patient.age,
+        'gender': patient.gender,
+        'location': patient.location,
+    }
+
+
+def serialize_appointment(appointment):
+    # Expects patient and doctor__user to be loaded with select_related
+    return {
+        'id': appointment.id,
+        'patient': {'id': appointment.patient_id, 'full_name': appointment.patient.full_name},
+        'doctor': {'id': appointment.doctor_id, 'name': appointment.doctor.user.get_full_name()},
+        'scheduled_time': appointment.scheduled_time.isoformat(),
+        'end_time': appointment.end_time.isoformat(),
+        'time': format_slot(appointment.scheduled_time),
+        'status': appointment.status,
+        'symptoms': appointment.symptoms,
+    }
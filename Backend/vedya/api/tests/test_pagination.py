@@ -0,0 +1,76 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from vedya.api.pagination import InvalidCursor, decode_cursor, encode_cursor
+from vedya.core.models import Appointment, Doctor, Patient
+
+
+def _cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+class DecodeCursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        moment = timezone.now()
+        row = Appointment(id=7, scheduled_time=moment)
+
+        self.assertEqual(decode_cursor(encode_cursor(row, 'scheduled_time'), 'scheduled_time'), (moment, 7))
+        self.assertEqual(decode_cursor(encode_cursor(row, 'id'), 'id'), (7, 7))
+
+    def test_malformed_cursors_are_rejected(self):
+        cursors = [
+            ('id', 'not base64!'),
+            ('id', _cursor({'a': 1})),
+            ('id', _cursor(['abc', 'abc'])),
+            ('id', _cursor([True, True])),
+            ('id', _cursor([3.5, 3.5])),
+            ('id', _cursor([1, 2])),
+            ('scheduled_time', _cursor(['2026-10-19T10:00:00+00:00', 'abc'])),
+            ('scheduled_time', _cursor([5, 1])),
+            ('scheduled_time', _cursor(['yesterday', 1])),
+            ('scheduled_time', _cursor(['2026-13-45T10:00:00', 1])),
+        ]
+        for field, cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor, field)
+
+
+class AppointmentListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='doctor')
+        doctor = Doctor.objects.create(user=user, specialization='General', license_number='L1')
+        patient = Patient.objects.create(whatsapp_number='+911', full_name='Patient')
+        start = timezone.now().replace(microsecond=0)
+        # Two at the same time, so the id breaks the tie
+        for minutes in (0, 30, 30, 60, 90):
+            Appointment.objects.create(
+                patient=patient, doctor=doctor, scheduled_time=start + timedelta(minutes=minutes),
+                end_time=start + timedelta(minutes=minutes + 30)
+            )
+
+    def test_pages_cover_every_row_once_in_order(self):
+        ids, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get('/api/appointments/', params).json()
+            ids.extend(row['id'] for row in page['results'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        expected = list(Appointment.objects.order_by('scheduled_time', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_bad_cursor_is_a_400(self):
+        for path, cursor in (('/api/patients/', _cursor(['abc', 'abc'])),
+                             ('/api/appointments/', _cursor(['2026-10-19T10:00:00+00:00', 'abc']))):
+            with self.subTest(path=path):
+                response = self.client.get(path, {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Invalid cursor'})
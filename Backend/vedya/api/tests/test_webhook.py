@@ -0,0 +1,23 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from vedya.api.views import RETRY_REPLY
+from vedya.core.message_pipeline import MessagePipeline
+from vedya.core.models import Message
+
+
+# Write messages straight to the test database
+@override_settings(WRITE_BEHIND_MAX_ITEMS=0)
+class TwilioWebhookTests(TestCase):
+    def test_stopped_pipeline_asks_the_patient_to_retry(self):
+        pipeline = MessagePipeline(workers=1, agent_factory=mock.Mock, twilio_factory=mock.Mock)
+        pipeline.stop()
+
+        with mock.patch('vedya.api.views.get_pipeline', return_value=pipeline):
+            response = self.client.post('/api/webhook/twilio/', {'From': 'whatsapp:+911', 'Body': 'Hello'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/xml')
+        self.assertIn(RETRY_REPLY, response.content.decode())
+        self.assertEqual(list(Message.objects.values_list('sender', 'content')), [('patient', 'Hello')])
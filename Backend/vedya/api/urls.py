@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('webhook/twilio/', views.twilio_webhook, name='twilio_webhook'),
+    path('metrics/', views.metrics, name='metrics'),
     path('doctors/', views.doctor_list, name='doctor_list'),
     path('patients/', views.patient_list, name='patient_list'),
     path('appointments/', views.appointment_list, name='appointment_list'),
@@ -6,58 +6,129 @@ from rest_framework import status
 from twilio.twiml.messaging_response import MessagingResponse
 import json
 
-# Import needed services and models here
+from datetime import datetime, time, timedelta
 
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from vedya.core.message_pipeline import get_pipeline, record_inbound_message
+from vedya.core.models import Appointment, Doctor, Patient
+from AI.utils.metrics import registry
+
+from .pagination import InvalidCursor, keyset_page, stream_response
+from .query_budget import query_budget
+from .serializers import serialize_appointment, serialize_doctor, serialize_patient
+
+webhook_latency = registry.histogram('webhook.response_seconds')
+
+RETRY_REPLY = "Sorry, we couldn't process your message right now. Please send it again in a minute."
+
+@query_budget(8)
 @csrf_exempt
 def twilio_webhook(request):
     """Endpoint for handling incoming WhatsApp messages from Twilio"""
     if request.method == 'POST':
-        # Extract incoming message details
-        incoming_msg = request.POST.get('Body', '').strip()
-        sender = request.POST.get('From', '')
-        
-        # Create a response
-        resp = MessagingResponse()
-        
-        # TODO: Process message with Patient AI Agent
-        # This will be replaced with actual AI agent call
-        resp.message(f"Thank you for your message: {incoming_msg}. Our AI assistant is processing your request.")
-        
-        return HttpResponse(str(resp))
+        with webhook_latency.time():
+            # Extract incoming message details
+            incoming_msg = request.POST.get('Body', '').strip()
+            sender = request.POST.get('From', '')
+            media_url = request.POST.get('MediaUrl0') or None
+            media_type = request.POST.get('MediaContentType0') or None
+            
+            # Persist the message and hand it to the background pipeline; the
+            # agent's reply is delivered out-of-band via the Twilio REST API.
+            # Media is fetched and transcribed there too, never in this request.
+            job = record_inbound_message(sender, incoming_msg, media_url, media_type)
+            resp = MessagingResponse()
+            try:
+                get_pipeline().enqueue(job)
+            except RuntimeError:
+                # The pipeline is shutting down; ask the patient to send the message again
+                resp.message(RETRY_REPLY)
+            
+            # Acknowledge immediately; an empty TwiML response unless we could not queue the message
+            return HttpResponse(str(resp), content_type='text/xml')
     
     return HttpResponse(status=405)
 
+@query_budget(0)
+@api_view(['GET'])
+def metrics(request):
+    """Expose in-process pipeline and service metrics"""
+    return Response(registry.snapshot())
+
+def _parse_moment(value, end_of_day=False):
+    """Parse an ISO datetime, or a date meaning its start (or the end of it)"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        moment = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+def _list_response(request, queryset, serialize, field='id'):
+    """Keyset-paginated page, or a streamed export with ?stream=ndjson|json"""
+    mode = request.query_params.get('stream')
+    if mode:
+        if mode not in ('ndjson', 'json'):
+            return Response({'error': 'stream must be ndjson or json'}, status=status.HTTP_400_BAD_REQUEST)
+        return stream_response(queryset, serialize, field, mode)
+    try:
+        return Response(keyset_page(request, queryset, serialize, field))
+    except InvalidCursor as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+@query_budget(2)
 @api_view(['GET', 'POST'])
 def doctor_list(request):
     """List all doctors or create a new doctor"""
     if request.method == 'GET':
-        # TODO: Fetch doctors from database
-        doctors = []  # Replace with actual database query
-        return Response(doctors)
+        doctors = Doctor.objects.select_related('user')
+        specialization = request.query_params.get('specialization')
+        if specialization:
+            doctors = doctors.filter(specialization__iexact=specialization)
+        return _list_response(request, doctors, serialize_doctor)
     
     elif request.method == 'POST':
         # TODO: Create new doctor in database
         return Response({'message': 'Doctor created'}, status=status.HTTP_201_CREATED)
 
+@query_budget(2)
 @api_view(['GET', 'POST'])
 def patient_list(request):
     """List all patients or create a new patient"""
     if request.method == 'GET':
-        # TODO: Fetch patients from database
-        patients = []  # Replace with actual database query
-        return Response(patients)
+        return _list_response(request, Patient.objects.all(), serialize_patient)
     
     elif request.method == 'POST':
         # TODO: Create new patient in database
         return Response({'message': 'Patient created'}, status=status.HTTP_201_CREATED)
 
+@query_budget(2)
 @api_view(['GET', 'POST'])
 def appointment_list(request):
     """List all appointments or create a new appointment"""
     if request.method == 'GET':
-        # TODO: Fetch appointments from database
-        appointments = []  # Replace with actual database query
-        return Response(appointments)
+        appointments = Appointment.objects.select_related('patient', 'doctor__user')
+        params = request.query_params
+        try:
+            if params.get('doctor'):
+                appointments = appointments.filter(doctor_id=int(params['doctor']))
+            if params.get('patient'):
+                appointments = appointments.filter(patient_id=int(params['patient']))
+            if params.get('status'):
+                appointments = appointments.filter(status__in=params['status'].split(','))
+            if params.get('from'):
+                appointments = appointments.filter(scheduled_time__gte=_parse_moment(params['from']))
+            if params.get('to'):
+                appointments = appointments.filter(scheduled_time__lt=_parse_moment(params['to'], end_of_day=True))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        # Ordered by (scheduled_time, id) so pages follow the appointment index
+        return _list_response(request, appointments, serialize_appointment, 'scheduled_time')
     
     elif request.method == 'POST':
         # TODO: Create new appointment in database
@@ -5,3 +5,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vedya.config.settings')
 
 application = get_asgi_application()
+
+# Load the model before the server starts accepting traffic
+from vedya.core.warmup import warm_up
+
+warm_up()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'vedya.api.query_budget.QueryBudgetMiddleware',  # Outermost, so it sees every query
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -66,6 +68,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',  # For development/testing
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,  # Seconds to wait for another process's write lock
+        },
     }
 }
 
@@ -103,5 +108,67 @@ TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
 
+# Outbound WhatsApp sending; 'mock' sends through TwilioMock for offline load tests
+TWILIO_BACKEND = os.getenv('TWILIO_BACKEND', 'twilio')
+TWILIO_RATE_LIMIT_PER_SECOND = float(os.getenv('TWILIO_RATE_LIMIT_PER_SECOND', '80'))  # 0 disables
+TWILIO_RATE_LIMIT_BURST = int(os.getenv('TWILIO_RATE_LIMIT_BURST', '80'))
+TWILIO_MAX_RETRIES = int(os.getenv('TWILIO_MAX_RETRIES', '4'))
+TWILIO_SEND_WORKERS = int(os.getenv('TWILIO_SEND_WORKERS', '16'))  # Concurrency of send_many
+TWILIO_MOCK_LATENCY_MS = float(os.getenv('TWILIO_MOCK_LATENCY_MS', '0'))
+TWILIO_MOCK_JITTER_MS = float(os.getenv('TWILIO_MOCK_JITTER_MS', '0'))
+TWILIO_MOCK_FAILURE_RATE = float(os.getenv('TWILIO_MOCK_FAILURE_RATE', '0'))
+
 # LLM settings
 LLAMA_MODEL_PATH = os.getenv('LLAMA_MODEL_PATH', 'models/llama-2-7b')
+LLM_WARMUP_ON_STARTUP = os.getenv('LLM_WARMUP_ON_STARTUP', 'True') == 'True'
+
+# Build the doctor index and availability engine in the WSGI/ASGI entry point rather than on first use
+SEARCH_WARMUP_ON_STARTUP = os.getenv('SEARCH_WARMUP_ON_STARTUP', 'True') == 'True'
+
+# Fail requests that exceed their view's @query_budget instead of logging them
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+
+# Default appointment length used when searching and booking slots
+APPOINTMENT_SLOT_MINUTES = int(os.getenv('APPOINTMENT_SLOT_MINUTES', '30'))
+
+# Appointment reminders, sent this many minutes before the appointment
+REMINDER_LEAD_MINUTES = [int(minutes) for minutes in os.getenv('REMINDER_LEAD_MINUTES', '1440,60').split(',') if minutes]
+REMINDER_WINDOW_HOURS = int(os.getenv('REMINDER_WINDOW_HOURS', '48'))  # Reminders held in memory ahead of time
+REMINDER_GRACE_MINUTES = int(os.getenv('REMINDER_GRACE_MINUTES', '10'))  # How late a missed reminder is still sent
+REMINDER_POLL_SECONDS = int(os.getenv('REMINDER_POLL_SECONDS', '15'))
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', '500'))
+REMINDER_RETRY_SECONDS = int(os.getenv('REMINDER_RETRY_SECONDS', '30'))  # First retry of a failed send; doubles after each
+
+# Read-through cache for patient profiles, histories and doctor schedules (0 entries disables)
+RECORD_CACHE_MAX_ENTRIES = int(os.getenv('RECORD_CACHE_MAX_ENTRIES', '10000'))
+RECORD_CACHE_TTL_SECONDS = float(os.getenv('RECORD_CACHE_TTL_SECONDS', '300'))  # Bounds staleness from other processes' writes
+
+# Threads, each with its own database connection, serving the AI tools' async calls
+PROVIDER_THREADS = int(os.getenv('PROVIDER_THREADS', '16'))
+
+# Message pipeline settings
+MESSAGE_PIPELINE_WORKERS = int(os.getenv('MESSAGE_PIPELINE_WORKERS', '4'))
+MESSAGE_PIPELINE_MAX_BATCH = int(os.getenv('MESSAGE_PIPELINE_MAX_BATCH', '10'))  # Max messages coalesced into one agent turn
+
+# Write-behind for agent replies and conversation memory: batched per transaction (0 items writes each row at once)
+WRITE_BEHIND_MAX_ITEMS = int(os.getenv('WRITE_BEHIND_MAX_ITEMS', '500'))
+WRITE_BEHIND_MAX_DELAY_MS = int(os.getenv('WRITE_BEHIND_MAX_DELAY_MS', '200'))  # Longest a write waits to be flushed
+
+# Agent conversation memory: recent turns plus a rolling summary, bounded per conversation
+CONVERSATION_MEMORY_TOKEN_BUDGET = int(os.getenv('CONVERSATION_MEMORY_TOKEN_BUDGET', '1024'))
+CONVERSATION_MEMORY_WINDOW_TURNS = int(os.getenv('CONVERSATION_MEMORY_WINDOW_TURNS', '12'))
+CONVERSATION_MEMORY_CACHE_BYTES = int(os.getenv('CONVERSATION_MEMORY_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+# Inbound media (voice notes, images): streamed to disk, audio transcribed in worker processes
+MEDIA_DOWNLOAD_DIR = os.getenv('MEDIA_DOWNLOAD_DIR', os.path.join(tempfile.gettempdir(), 'vedya-media'))
+MEDIA_DOWNLOAD_CONCURRENCY = int(os.getenv('MEDIA_DOWNLOAD_CONCURRENCY', '8'))
+MEDIA_CHUNK_BYTES = int(os.getenv('MEDIA_CHUNK_BYTES', '65536'))
+MEDIA_MAX_BYTES = int(os.getenv('MEDIA_MAX_BYTES', str(16 * 1024 * 1024)))  # WhatsApp's own media limit
+MEDIA_DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv('MEDIA_DOWNLOAD_TIMEOUT_SECONDS', '30'))
+MEDIA_TRANSCRIBER = os.getenv('MEDIA_TRANSCRIBER', '')  # Dotted path of transcribe(path, content_type); empty disables
+MEDIA_TRANSCRIBE_PROCESSES = int(os.getenv('MEDIA_TRANSCRIBE_PROCESSES', '2'))
+MEDIA_TIMEOUT_SECONDS = float(os.getenv('MEDIA_TIMEOUT_SECONDS', '120'))  # Longest an agent turn waits for its media
+
+# Stream long agent replies to WhatsApp sentence by sentence
+WHATSAPP_STREAMING_REPLIES = os.getenv('WHATSAPP_STREAMING_REPLIES', 'False') == 'True'
+WHATSAPP_STREAMING_MIN_CHARS = int(os.getenv('WHATSAPP_STREAMING_MIN_CHARS', '80'))
@@ -5,3 +5,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vedya.config.settings')
 
 application = get_wsgi_application()
+
+# Load the model before the server starts accepting traffic
+from vedya.core.warmup import warm_up
+
+warm_up()
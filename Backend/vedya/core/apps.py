@@ -0,0 +1,32 @@
+import os
+import sys
+
+from django.apps import AppConfig
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+
+class CoreConfig(AppConfig):
+    name = 'vedya.core'
+    default_auto_field = 'django.db.models.BigAutoField'
+
+    def ready(self):
+        from django.conf import settings
+
+        from AI.tools.providers import register_provider
+
+        from . import signals  # noqa: F401  (connects the model signal handlers)
+        from .availability import AvailabilityProvider
+        from .booking import BookingProvider
+        from .doctor_index import DoctorSearchProvider
+        from .records import PatientRecordsProvider, ScheduleProvider
+
+        # Serve the AI tools from the database-backed indexes
+        availability = AvailabilityProvider(settings.APPOINTMENT_SLOT_MINUTES)
+        register_provider('availability', availability)
+        register_provider('doctor_search', DoctorSearchProvider(availability))
+        register_provider('booking', BookingProvider(availability))
+        # Profiles, histories and schedules are read through the shared record cache
+        register_provider('patient_records', PatientRecordsProvider())
+        register_provider('schedules', ScheduleProvider())
@@ -0,0 +1,397 @@
+import threading
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .provider_threads import in_worker_thread
+
+# Availability is tracked in fixed slots; each day is one integer bitset
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+# Appointment statuses that occupy a doctor's time
+ACTIVE_STATUSES = ('scheduled', 'rescheduled')
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+SLOT_FORMAT = '%Y-%m-%d %H:%M'
+
+
+def _weekday_index(key):
+    key = str(key).strip().lower()
+    for index, name in enumerate(WEEKDAYS):
+        if key == name or key == name[:3] or key == str(index):
+            return index
+    return None
+
+
+def _minutes(value):
+    hours, _, minutes = str(value).strip().partition(':')
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def _window_bits(start_minute, end_minute):
+    """Bitset with the slots covering [start_minute, end_minute) set"""
+    first = max(0, start_minute // SLOT_MINUTES)
+    last = min(SLOTS_PER_DAY, -(-end_minute // SLOT_MINUTES))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def _inner_window_bits(start_minute, end_minute):
+    """Bitset with the slots lying wholly within [start_minute, end_minute) set"""
+    first = -(-start_minute // SLOT_MINUTES) * SLOT_MINUTES
+    last = end_minute // SLOT_MINUTES * SLOT_MINUTES
+    return _window_bits(first, last)
+
+
+def compile_weekly(availability):
+    """Compile Doctor.availability JSON into seven per-weekday bitsets.
+
+    Accepts {"monday": [["09:00", "13:00"], ...]}, with windows also given
+    as {"start": ..., "end": ...} or "09:00-13:00", and three-letter day names.
+    Unparseable entries are ignored.
+    """
+    weekly = [0] * 7
+    if not isinstance(availability, dict):
+        return tuple(weekly)
+    for day, windows in availability.items():
+        index = _weekday_index(day)
+        if index is None or not isinstance(windows, (list, tuple)):
+            continue
+        for window in windows:
+            try:
+                if isinstance(window, dict):
+                    start, end = window['start'], window['end']
+                elif isinstance(window, str):
+                    start, end = window.split('-', 1)
+                else:
+                    start, end = window
+                weekly[index] |= _window_bits(_minutes(start), _minutes(end))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return tuple(weekly)
+
+
+def _local(moment):
+    return timezone.localtime(moment) if timezone.is_aware(moment) else moment
+
+
+def _slot_span(start, end):
+    """Split an interval into (date, bitset) pieces, one per local day it touches"""
+    start, end = _local(start), _local(end)
+    pieces = []
+    day = start.date()
+    while True:
+        day_start = datetime.combine(day, time.min, tzinfo=start.tzinfo)
+        first = max(0, int((start - day_start).total_seconds() // 60))
+        last = min(24 * 60, int(-(-(end - day_start).total_seconds() // 60)))
+        bits = _window_bits(first, last)
+        if bits:
+            pieces.append((day, bits))
+        day += timedelta(days=1)
+        if datetime.combine(day, time.min, tzinfo=start.tzinfo) >= end:
+            return pieces
+
+
+def _runs(free, length):
+    """Bits where `length` consecutive free slots start"""
+    starts = free
+    for shift in range(1, length):
+        starts &= free >> shift
+    return starts
+
+
+class _DoctorCalendar:
+    __slots__ = ('weekly', 'source', 'appointments', 'booked')
+
+    def __init__(self):
+        self.weekly = (0,) * 7
+        self.source = None
+        self.appointments = {}  # date -> {appointment_id: bits}
+        self.booked = {}  # date -> union of the day's appointment bits
+
+
+class AvailabilityEngine:
+    """Per-doctor free-slot calendar compiled from weekly availability and bookings.
+
+    Weekly availability becomes one bitset per weekday and bookings one
+    bitset per date, so a free-slot query is a few integer operations per
+    doctor and day, with no JSON parsing or Appointment scan per request.
+    Bookings are tracked by appointment ID, so a reschedule or
+    cancellation releases exactly that appointment's slots.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.doctors = {}
+        self.appointment_days = {}  # appointment_id -> (doctor_id, [dates])
+        self._evicted_on = None  # Date of the last sweep of past days
+
+    def _calendar(self, doctor_id):
+        calendar = self.doctors.get(doctor_id)
+        if calendar is None:
+            calendar = self.doctors[doctor_id] = _DoctorCalendar()
+        return calendar
+
+    def set_availability(self, doctor_id, availability):
+        """(Re)compile a doctor's weekly availability"""
+        with self._lock:
+            calendar = self._calendar(doctor_id)
+            if calendar.source != availability:
+                calendar.weekly = compile_weekly(availability)
+                calendar.source = availability
+
+    def remove_doctor(self, doctor_id):
+        with self._lock:
+            calendar = self.doctors.pop(doctor_id, None)
+            if calendar is None:
+                return
+            for day_appointments in calendar.appointments.values():
+                for appointment_id in day_appointments:
+                    self.appointment_days.pop(appointment_id, None)
+
+    def _evict_past(self):
+        """Drop bookings on days before today, once a day, so the engine does not grow without bound"""
+        today = _local(timezone.now()).date()
+        if self._evicted_on == today:
+            return
+        self._evicted_on = today
+        for calendar in self.doctors.values():
+            for day in [day for day in calendar.appointments if day < today]:
+                for appointment_id in calendar.appointments.pop(day):
+                    entry = self.appointment_days.get(appointment_id)
+                    if entry is None:
+                        continue
+                    # An appointment running past midnight keeps its later days
+                    dates = [date for date in entry[1] if date >= today]
+                    if dates:
+                        self.appointment_days[appointment_id] = (entry[0], dates)
+                    else:
+                        del self.appointment_days[appointment_id]
+                calendar.booked.pop(day, None)
+
+    def book(self, appointment_id, doctor_id, start, end):
+        """Mark an appointment's interval as taken, replacing any previous booking it had"""
+        with self._lock:
+            self._evict_past()
+            self.release(appointment_id)
+            calendar = self._calendar(doctor_id)
+            dates = []
+            for day, bits in _slot_span(start, end):
+                calendar.appointments.setdefault(day, {})[appointment_id] = bits
+                calendar.booked[day] = calendar.booked.get(day, 0) | bits
+                dates.append(day)
+            self.appointment_days[appointment_id] = (doctor_id, dates)
+
+    def release(self, appointment_id):
+        """Free the slots held by an appointment, if it was booked"""
+        with self._lock:
+            entry = self.appointment_days.pop(appointment_id, None)
+            if entry is None:
+                return
+            doctor_id, dates = entry
+            calendar = self.doctors.get(doctor_id)
+            if calendar is None:
+                return
+            for day in dates:
+                day_appointments = calendar.appointments.get(day, {})
+                day_appointments.pop(appointment_id, None)
+                if day_appointments:
+                    booked = 0
+                    for bits in day_appointments.values():
+                        booked |= bits
+                    calendar.booked[day] = booked
+                else:
+                    calendar.appointments.pop(day, None)
+                    calendar.booked.pop(day, None)
+
+    def sync_appointment(self, appointment):
+        """Apply an Appointment's current state (booked, moved or cancelled)"""
+        if appointment.status in ACTIVE_STATUSES:
+            self.book(appointment.id, appointment.doctor_id, appointment.scheduled_time, appointment.end_time)
+        else:
+            self.release(appointment.id)
+
+    def _free_bits(self, calendar, day, ignore=None):
+        booked = calendar.booked.get(day, 0)
+        if ignore is not None and ignore in calendar.appointments.get(day, {}):
+            booked = 0
+            for appointment_id, bits in calendar.appointments[day].items():
+                if appointment_id != ignore:
+                    booked |= bits
+        return calendar.weekly[day.weekday()] & ~booked & FULL_DAY
+
+    def is_free(self, doctor_id, start, end, ignore=None):
+        """Whether the doctor is available and unbooked for the whole interval.
+
+        ignore names an appointment whose own booking does not count, so an
+        appointment can be checked against a move to an overlapping time.
+        """
+        with self._lock:
+            self._evict_past()
+            calendar = self.doctors.get(doctor_id)
+            if calendar is None:
+                return False
+            return all(
+                self._free_bits(calendar, day, ignore) & bits == bits for day, bits in _slot_span(start, end)
+            )
+
+    def first_free_slots(self, doctor_ids, start=None, end=None, duration_minutes=30, limit=10, per_doctor=None):
+        """Earliest free slots across the given doctors within [start, end).
+
+        Returns (start_datetime, doctor_id) pairs in time order. per_doctor
+        caps how many slots a single doctor contributes.
+        """
+        start = _local(start or timezone.now())
+        end = _local(end or start + timedelta(days=7))
+        length = max(1, -(-duration_minutes // SLOT_MINUTES))
+        taken = {}
+        results = []
+        with self._lock:
+            self._evict_past()
+            calendars = [(doctor_id, self.doctors[doctor_id]) for doctor_id in doctor_ids if doctor_id in self.doctors]
+            day = start.date()
+            while day <= end.date() and len(results) < limit:
+                day_start = datetime.combine(day, time.min, tzinfo=start.tzinfo)
+                # Only slots that begin at or after `start` and end by `end`
+                window_first = max(0, int(-(-(start - day_start).total_seconds() // 60)))
+                window_last = min(24 * 60, int((end - day_start).total_seconds() // 60))
+                window = _inner_window_bits(window_first, window_last)
+                candidates = []
+                for doctor_id, calendar in calendars:
+                    starts = _runs(self._free_bits(calendar, day) & window, length)
+                    slot = 0
+                    while starts:
+                        if starts & 1:
+                            # Offer back-to-back slots rather than overlapping ones
+                            candidates.append((slot, doctor_id))
+                            starts >>= length
+                            slot += length
+                        else:
+                            starts >>= 1
+                            slot += 1
+                candidates.sort()
+                for slot, doctor_id in candidates:
+                    if per_doctor is not None and taken.get(doctor_id, 0) >= per_doctor:
+                        continue
+                    taken[doctor_id] = taken.get(doctor_id, 0) + 1
+                    results.append((day_start + timedelta(minutes=slot * SLOT_MINUTES), doctor_id))
+                    if len(results) >= limit:
+                        break
+                day += timedelta(days=1)
+        return results
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def build_availability_engine():
+    """Compile every doctor's availability and upcoming bookings"""
+    from .models import Appointment, Doctor
+
+    engine = AvailabilityEngine()
+    for doctor_id, availability in Doctor.objects.values_list('id', 'availability').iterator(chunk_size=5000):
+        engine.set_availability(doctor_id, availability)
+    upcoming = Appointment.objects.filter(
+        status__in=ACTIVE_STATUSES,
+        end_time__gte=timezone.now()
+    ).values_list('id', 'doctor_id', 'scheduled_time', 'end_time')
+    for appointment_id, doctor_id, start, end in upcoming.iterator(chunk_size=5000):
+        engine.book(appointment_id, doctor_id, start, end)
+    return engine
+
+
+def get_availability_engine():
+    """Return the process-wide availability engine, building it on first use"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = build_availability_engine()
+        return _engine
+
+
+def loaded_availability_engine():
+    """Return the engine only if it has been built, for incremental updates"""
+    return _engine
+
+
+def parse_slot(value):
+    """Parse a "YYYY-MM-DD HH:MM" slot (or ISO datetime) in the current time zone"""
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        try:
+            moment = datetime.strptime(value.strip(), SLOT_FORMAT)
+        except ValueError:
+            try:
+                moment = datetime.fromisoformat(value.strip())
+            except ValueError:
+                raise ValueError(f'Invalid time slot {value!r}; expected "YYYY-MM-DD HH:MM"') from None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def format_slot(moment):
+    return _local(moment).strftime(SLOT_FORMAT)
+
+
+class AvailabilityProvider:
+    """Serves availability lookups and updates for the AI tools"""
+
+    def __init__(self, duration_minutes=30):
+        self.duration_minutes = duration_minutes
+
+    def available_slots(self, doctor_ids, days=7, per_doctor=2, limit=50):
+        """Next free slots per doctor, as {doctor_id: ["YYYY-MM-DD HH:MM", ...]}"""
+        slots = {doctor_id: [] for doctor_id in doctor_ids}
+        now = timezone.now()
+        for start, doctor_id in get_availability_engine().first_free_slots(
+                doctor_ids, now, now + timedelta(days=days), self.duration_minutes, limit, per_doctor):
+            slots[doctor_id].append(format_slot(start))
+        return slots
+
+    def is_slot_free(self, doctor_id, time_slot):
+        """Whether the slot is free; raises ValueError for an unparseable slot or doctor id"""
+        doctor_id, start = int(doctor_id), parse_slot(time_slot)
+        return get_availability_engine().is_free(doctor_id, start, start + timedelta(minutes=self.duration_minutes))
+
+    def is_move_free(self, appointment_id, time_slot):
+        """Whether an appointment can move to the slot, keeping its length.
+
+        Returns (doctor_id, free). An appointment that does not exist gives
+        (None, True), leaving the booking provider to report it. Raises
+        ValueError for an unparseable slot or appointment id.
+        """
+        from .models import Appointment
+
+        appointment_id, start = int(appointment_id), parse_slot(time_slot)
+        current = Appointment.objects.filter(id=appointment_id).values('doctor_id', 'scheduled_time', 'end_time').first()
+        if current is None:
+            return None, True
+        end = start + (current['end_time'] - current['scheduled_time'])
+        free = get_availability_engine().is_free(current['doctor_id'], start, end, ignore=appointment_id)
+        return current['doctor_id'], free
+
+    def update_availability(self, doctor_id, availability):
+        """Persist a doctor's weekly availability and recompile it"""
+        from .models import Doctor
+        from .records import invalidate
+
+        updated = Doctor.objects.filter(id=doctor_id).update(availability=availability)
+        if not updated:
+            return {"error": f"Doctor {doctor_id} not found"}
+        # update() bypasses signals, so refresh the engine and cached schedules directly
+        engine = loaded_availability_engine()
+        if engine is not None:
+            engine.set_availability(int(doctor_id), availability)
+        invalidate(('doctor', int(doctor_id)))
+        return {"success": True, "doctor_id": doctor_id, "availability": availability}
+
+    aavailable_slots = in_worker_thread(available_slots)
+    ais_slot_free = in_worker_thread(is_slot_free)
+    ais_move_free = in_worker_thread(is_move_free)
+    aupdate_availability = in_worker_thread(update_availability)
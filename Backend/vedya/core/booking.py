@@ -0,0 +1,305 @@
+import os
+import sys
+import threading
+import time
+import zlib
+from bisect import bisect_left, insort
+from collections import defaultdict
+from contextlib import ExitStack, nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.utils.metrics import registry
+
+from .availability import ACTIVE_STATUSES, format_slot, loaded_availability_engine, parse_slot
+from .models import Appointment
+from .provider_threads import in_worker_thread
+from .records import invalidate_appointment
+from .reminders import loaded_reminder_scheduler
+
+# Independent locks that (doctor, day) keys hash onto
+LOCK_STRIPES = 256
+# Attempts for a booking that hits a locked SQLite database from another process
+LOCKED_RETRIES = 5
+
+booking_latency = registry.histogram('booking.seconds')
+bookings_made = registry.counter('booking.booked')
+booking_conflicts = registry.counter('booking.conflicts')
+booking_retries = registry.counter('booking.retries')
+
+
+class BookingError(Exception):
+    """A booking, reschedule or cancellation could not be made"""
+
+
+class SlotUnavailable(BookingError):
+    """The doctor already has an appointment overlapping the requested time"""
+
+
+_stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+# SQLite has a single writer and fails, rather than waits, when two open
+# transactions both try to write, so writers in this process go one at a time
+_sqlite_writer = threading.Lock()
+
+
+def _days(start, end):
+    day, last = timezone.localtime(start).date(), timezone.localtime(end).date()
+    days = []
+    while day <= last:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _slot_locks(doctor_id, days):
+    """Hold the locks for a doctor's days, for this process and on the database.
+
+    Only bookings for the same doctor and day contend; the striped locks
+    are taken in a fixed order so multi-day bookings cannot deadlock.
+    """
+    stack = ExitStack()
+    stack.enter_context(_sqlite_writer if connection.vendor == 'sqlite' else nullcontext())
+    for stripe in sorted({zlib.crc32(f'{doctor_id}:{day}'.encode()) % LOCK_STRIPES for day in days}):
+        stack.enter_context(_stripes[stripe])
+    return stack
+
+
+def _lock_days_in_database(doctor_id, days):
+    # Serialize with other processes; Postgres advisory locks are held until the transaction ends
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for day in sorted(days):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [doctor_id, day.toordinal()])
+
+
+def _overlapping(doctor_id, start, end):
+    return Appointment.objects.filter(
+        doctor_id=doctor_id,
+        status__in=ACTIVE_STATUSES,
+        scheduled_time__lt=end,
+        end_time__gt=start
+    )
+
+
+def _retry_when_locked(operation):
+    for attempt in range(LOCKED_RETRIES):
+        try:
+            return operation()
+        except OperationalError as exc:
+            if 'locked' not in str(exc) or attempt == LOCKED_RETRIES - 1:
+                raise
+            booking_retries.inc()
+            time.sleep(0.05 * 2 ** attempt)
+
+
+def _duration():
+    return timedelta(minutes=settings.APPOINTMENT_SLOT_MINUTES)
+
+
+def book(patient_id, doctor_id, start, end=None, symptoms=''):
+    """Create an appointment, or raise SlotUnavailable if the doctor is taken"""
+    end = end or start + _duration()
+    if end <= start:
+        raise BookingError('Appointment must end after it starts')
+    days = _days(start, end)
+
+    def attempt():
+        with _slot_locks(doctor_id, days), transaction.atomic():
+            _lock_days_in_database(doctor_id, days)
+            if _overlapping(doctor_id, start, end).exists():
+                raise SlotUnavailable(f'Doctor {doctor_id} is not free at {format_slot(start)}')
+            return Appointment.objects.create(
+                patient_id=patient_id,
+                doctor_id=doctor_id,
+                scheduled_time=start,
+                end_time=end,
+                symptoms=symptoms or ''
+            )
+
+    with booking_latency.time():
+        try:
+            appointment = _retry_when_locked(attempt)
+        except SlotUnavailable:
+            booking_conflicts.inc()
+            raise
+    bookings_made.inc()
+    return appointment
+
+
+def reschedule(appointment_id, start, end=None):
+    """Move an appointment, keeping its length unless an end is given"""
+    current = Appointment.objects.filter(id=appointment_id).values('doctor_id', 'scheduled_time', 'end_time').first()
+    if current is None:
+        raise BookingError(f'Appointment {appointment_id} not found')
+    doctor_id = current['doctor_id']
+    end = end or start + (current['end_time'] - current['scheduled_time'])
+    days = _days(start, end)
+
+    def attempt():
+        with _slot_locks(doctor_id, days), transaction.atomic():
+            _lock_days_in_database(doctor_id, days)
+            appointment = Appointment.objects.select_for_update().get(id=appointment_id)
+            if appointment.status not in ACTIVE_STATUSES:
+                raise BookingError(f'Appointment {appointment_id} is {appointment.status}')
+            if _overlapping(doctor_id, start, end).exclude(id=appointment_id).exists():
+                raise SlotUnavailable(f'Doctor {doctor_id} is not free at {format_slot(start)}')
+            appointment.scheduled_time = start
+            appointment.end_time = end
+            appointment.status = 'rescheduled'
+            appointment.save(update_fields=['scheduled_time', 'end_time', 'status', 'updated_at'])
+            return appointment
+
+    with booking_latency.time():
+        try:
+            return _retry_when_locked(attempt)
+        except SlotUnavailable:
+            booking_conflicts.inc()
+            raise
+
+
+def cancel(appointment_id):
+    """Cancel an appointment, freeing its slot"""
+    def attempt():
+        with transaction.atomic():
+            appointment = Appointment.objects.select_for_update().filter(id=appointment_id).first()
+            if appointment is None:
+                raise BookingError(f'Appointment {appointment_id} not found')
+            if appointment.status != 'cancelled':
+                appointment.status = 'cancelled'
+                appointment.save(update_fields=['status', 'updated_at'])
+            return appointment
+
+    with _sqlite_writer if connection.vendor == 'sqlite' else nullcontext():
+        return _retry_when_locked(attempt)
+
+
+def book_many(requests):
+    """Book many appointments at once, e.g. for a health camp day.
+
+    Each request is a dict with patient_id, doctor_id, start and optionally
+    end and symptoms. Requests are grouped per doctor: one lock, one
+    overlap query and one bulk insert per doctor instead of per booking.
+    Requests that overlap an existing appointment, or an earlier request
+    in the batch, are rejected. Returns (appointments, rejected) where
+    rejected holds (request, reason) pairs.
+    """
+    by_doctor = defaultdict(list)
+    rejected = []
+    for request in requests:
+        start = request['start']
+        end = request.get('end') or start + _duration()
+        if end <= start:
+            rejected.append((request, 'Appointment must end after it starts'))
+            continue
+        by_doctor[request['doctor_id']].append((start, end, request))
+
+    booked = []
+    for doctor_id, wanted in by_doctor.items():
+        wanted.sort(key=lambda item: item[0])
+        first = wanted[0][0]
+        last = max(end for _, end, _ in wanted)
+        days = _days(first, last)
+
+        def attempt():
+            accepted, conflicts = [], []
+            with _slot_locks(doctor_id, days), transaction.atomic():
+                _lock_days_in_database(doctor_id, days)
+                # Existing bookings never overlap, so sorted by start they are sorted by end too
+                taken = sorted(_overlapping(doctor_id, first, last).values_list('scheduled_time', 'end_time'))
+                starts = [start for start, _ in taken]
+                for start, end, request in wanted:
+                    index = bisect_left(starts, end)
+                    if index and taken[index - 1][1] > start:
+                        conflicts.append((request, f'Doctor {doctor_id} is not free at {format_slot(start)}'))
+                        continue
+                    insort(taken, (start, end))
+                    starts.insert(index, start)
+                    accepted.append(Appointment(
+                        patient_id=request['patient_id'],
+                        doctor_id=doctor_id,
+                        scheduled_time=start,
+                        end_time=end,
+                        symptoms=request.get('symptoms') or ''
+                    ))
+                created = Appointment.objects.bulk_create(accepted)
+            return created, conflicts
+
+        with booking_latency.time():
+            created, conflicts = _retry_when_locked(attempt)
+        # bulk_create skips post_save, so update the availability engine, reminders and record cache here
+        engine = loaded_availability_engine()
+        scheduler = loaded_reminder_scheduler()
+        for appointment in created:
+            if appointment.pk is None:
+                continue
+            if engine is not None:
+                engine.sync_appointment(appointment)
+            if scheduler is not None:
+                scheduler.schedule_appointment(appointment)
+            invalidate_appointment(appointment)
+        bookings_made.inc(len(created))
+        booking_conflicts.inc(len(conflicts))
+        booked.extend(created)
+        rejected.extend(conflicts)
+    return booked, rejected
+
+
+def describe(appointment):
+    return {
+        "appointment_id": str(appointment.id),
+        "doctor_id": str(appointment.doctor_id),
+        "patient_id": str(appointment.patient_id),
+        "time": format_slot(appointment.scheduled_time),
+        "status": appointment.status,
+        "symptoms": appointment.symptoms
+    }
+
+
+class BookingProvider:
+    """Serves the appointment tools from the booking engine"""
+
+    def __init__(self, availability=None):
+        self.availability = availability
+
+    def _unavailable(self, doctor_id, error):
+        result = {"error": str(error), "doctor_id": str(doctor_id)}
+        if self.availability is not None:
+            alternatives = self.availability.available_slots([int(doctor_id)], per_doctor=3)
+            result["available_slots"] = alternatives.get(int(doctor_id), [])
+        return result
+
+    def book(self, doctor_id, patient_id, time_slot, symptoms=None):
+        try:
+            return describe(book(int(patient_id), int(doctor_id), parse_slot(time_slot), symptoms=symptoms))
+        except SlotUnavailable as exc:
+            return self._unavailable(doctor_id, exc)
+        except (BookingError, ValueError) as exc:
+            return {"error": str(exc)}
+
+    def reschedule(self, appointment_id, new_time_slot):
+        try:
+            appointment = reschedule(int(appointment_id), parse_slot(new_time_slot))
+        except SlotUnavailable as exc:
+            doctor_id = Appointment.objects.filter(id=appointment_id).values_list('doctor_id', flat=True).first()
+            return self._unavailable(doctor_id, exc)
+        except (BookingError, ValueError) as exc:
+            return {"error": str(exc)}
+        return {"appointment_id": str(appointment.id), "new_time": format_slot(appointment.scheduled_time), "status": appointment.status}
+
+    def cancel(self, appointment_id):
+        try:
+            appointment = cancel(int(appointment_id))
+        except (BookingError, ValueError) as exc:
+            return {"error": str(exc)}
+        return {"appointment_id": str(appointment.id), "status": appointment.status}
+
+    abook = in_worker_thread(book)
+    areschedule = in_worker_thread(reschedule)
+    acancel = in_worker_thread(cancel)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+from django.conf import settings
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.utils.conversation_memory import ConversationMemoryStore
+
+from .models import Conversation
+from .write_behind import pending_memory, store_memory
+
+
+def load_memory(conversation_id):
+    """Read a conversation's saved agent memory"""
+    # Memory still in the write-behind buffer is newer than the row
+    pending = pending_memory(conversation_id)
+    if pending is not None:
+        return pending
+    return Conversation.objects.filter(id=conversation_id).values_list('memory', flat=True).first()
+
+
+def save_memory(conversation_id, data):
+    """Store the agent memory in the conversation's own memory column"""
+    store_memory(conversation_id, data)
+
+
+def create_memory_store():
+    """Memory store for patient agents, keyed by conversation id and persisted to Conversation.memory"""
+    return ConversationMemoryStore(
+        loader=load_memory,
+        saver=save_memory,
+        max_bytes=settings.CONVERSATION_MEMORY_CACHE_BYTES,
+        token_budget=settings.CONVERSATION_MEMORY_TOKEN_BUDGET,
+        window_turns=settings.CONVERSATION_MEMORY_WINDOW_TURNS
+    )
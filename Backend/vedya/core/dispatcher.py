@@ -0,0 +1,122 @@
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class _Shard:
+    """One worker thread and the per-key backlog it owns"""
+
+    def __init__(self, dispatcher, index):
+        self.dispatcher = dispatcher
+        self.index = index
+        self.condition = threading.Condition()
+        self.pending = OrderedDict()  # key -> items in arrival order, keys in first-arrival order
+        self.size = 0
+        self.closing = False
+        self.thread = threading.Thread(
+            target=self._run,
+            name=f'{dispatcher.name}-{index}',
+            daemon=True
+        )
+
+    def put(self, key, item):
+        with self.condition:
+            if self.closing:
+                # The worker may already have drained and exited; the item would never be handled
+                raise RuntimeError(f'{self.dispatcher.name} is stopped')
+            self.pending.setdefault(key, []).append(item)
+            self.size += 1
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+
+    def _take(self):
+        """Block until a key has work, then take its whole backlog"""
+        with self.condition:
+            while not self.pending:
+                if self.closing:
+                    return None, None
+                self.condition.wait()
+            key, items = self.pending.popitem(last=False)
+            max_batch = self.dispatcher.max_batch
+            if max_batch and len(items) > max_batch:
+                # Put the remainder back at the front so this key keeps its order
+                self.pending[key] = items[max_batch:]
+                self.pending.move_to_end(key, last=False)
+                items = items[:max_batch]
+            self.size -= len(items)
+            return key, items
+
+    def _run(self):
+        while True:
+            key, items = self._take()
+            if key is None:
+                break
+            try:
+                self.dispatcher.handler(key, items)
+            except Exception:
+                logger.exception('Dispatcher handler failed for %s', key)
+
+
+class ShardedDispatcher:
+    """Routes work to a fixed set of workers by key.
+
+    Every key is pinned to one shard, so items for the same key are handled
+    serially and in arrival order, while different keys run concurrently on
+    other shards. Items that pile up for a key while its shard is busy are
+    handed to the handler together as a single batch.
+    """
+
+    def __init__(self, handler, workers=4, max_batch=None, name='dispatcher'):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.name = name
+        self.shards = [_Shard(self, index) for index in range(workers)]
+        self._started = False
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the shard workers (idempotent); raises RuntimeError once stopped"""
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError(f'{self.name} is stopped')
+            if self._started:
+                return
+            for shard in self.shards:
+                shard.thread.start()
+            self._started = True
+
+    def shard_for(self, key):
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        return self.shards[zlib.crc32(key.encode('utf-8')) % len(self.shards)]
+
+    def submit(self, key, item):
+        """Queue an item for the given key; never blocks on the handler.
+
+        Raises RuntimeError once the dispatcher is stopped, rather than
+        accepting an item no worker will handle.
+        """
+        self.start()
+        self.shard_for(key).put(key, item)
+
+    def pending(self):
+        """Number of items submitted but not yet handed to the handler"""
+        return sum(shard.size for shard in self.shards)
+
+    def stop(self, timeout=None):
+        """Drain every shard and stop the workers; the dispatcher cannot be restarted"""
+        with self._lock:
+            self._stopped = True
+            if not self._started:
+                return
+        for shard in self.shards:
+            shard.close()
+        for shard in self.shards:
+            shard.thread.join(timeout)
@@ -0,0 +1,307 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from itertools import islice
+
+from .provider_threads import in_worker_thread
+
+# Size of a geospatial grid cell in degrees (~11 km of latitude)
+CELL_DEGREES = 0.1
+# Below this many candidates a nearest query just measures them all
+BRUTE_FORCE_LIMIT = 256
+KM_PER_DEGREE = 111.32
+EARTH_RADIUS_KM = 6371.0088
+
+COORDINATES = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+SUFFIXES = ('ists', 'ist', 'ians', 'ian', 'ics', 'y', 's')
+
+
+def _stem(token):
+    # Light stemming so "cardiologist" and "cardiology" share a posting list
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return [_stem(token) for token in re.findall(r'\w+', text)]
+
+
+def parse_coordinates(text):
+    """Return (lat, lon) when text is a "lat,lon" pair, else None"""
+    match = COORDINATES.match(text or '')
+    if not match:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _cell(latitude, longitude):
+    return (math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES))
+
+
+class DoctorIndex:
+    """In-process search index over doctors.
+
+    Specialty and location words map to posting sets of doctor IDs, and
+    doctors with coordinates are bucketed into a fixed lat/lon grid (a
+    fixed-precision geohash) for nearest-doctor queries. Each specialty
+    word also has its own grid, so a nearest query for a specialty only
+    visits doctors of that specialty. Entries are updated one doctor at a
+    time, so model signals keep it in sync.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.doctors = {}  # id -> (name, specialty, location, latitude, longitude)
+        self.specialty_postings = defaultdict(set)
+        self.location_postings = defaultdict(set)
+        self.cells = defaultdict(set)
+        self.located = 0  # Doctors with coordinates
+        self.specialty_cells = defaultdict(lambda: defaultdict(set))  # token -> cell -> ids
+        self.specialty_located = defaultdict(int)  # token -> doctors with coordinates
+
+    def __len__(self):
+        return len(self.doctors)
+
+    def upsert(self, doctor_id, name, specialty, location, latitude=None, longitude=None):
+        with self._lock:
+            self._discard(doctor_id)
+            self.doctors[doctor_id] = (name, specialty, location, latitude, longitude)
+            for token in tokenize(specialty):
+                self.specialty_postings[token].add(doctor_id)
+            for token in tokenize(location):
+                self.location_postings[token].add(doctor_id)
+            if latitude is not None and longitude is not None:
+                cell = _cell(latitude, longitude)
+                self.cells[cell].add(doctor_id)
+                self.located += 1
+                for token in set(tokenize(specialty)):
+                    self.specialty_cells[token][cell].add(doctor_id)
+                    self.specialty_located[token] += 1
+
+    def upsert_doctor(self, doctor):
+        """Index (or re-index) a Doctor model instance"""
+        self.upsert(
+            doctor.id,
+            doctor.user.get_full_name(),
+            doctor.specialization,
+            doctor.location,
+            doctor.latitude,
+            doctor.longitude
+        )
+
+    def remove(self, doctor_id):
+        with self._lock:
+            self._discard(doctor_id)
+
+    def _discard(self, doctor_id):
+        entry = self.doctors.pop(doctor_id, None)
+        if entry is None:
+            return
+        _, specialty, location, latitude, longitude = entry
+        for postings, text in ((self.specialty_postings, specialty), (self.location_postings, location)):
+            for token in tokenize(text):
+                ids = postings.get(token)
+                if ids is not None:
+                    ids.discard(doctor_id)
+                    if not ids:
+                        del postings[token]
+        if latitude is not None and longitude is not None:
+            self.located -= 1
+            cell = _cell(latitude, longitude)
+            grids = [(self.cells, None)] + [(self.specialty_cells[token], token) for token in set(tokenize(specialty))]
+            for cells, token in grids:
+                ids = cells.get(cell)
+                if ids is not None:
+                    ids.discard(doctor_id)
+                    if not ids:
+                        del cells[cell]
+                if token is not None:
+                    self.specialty_located[token] -= 1
+                    if not self.specialty_located[token]:
+                        del self.specialty_located[token]
+                        del self.specialty_cells[token]
+
+    def _postings(self, postings, text):
+        """Posting sets for every query token, smallest first; None for no filter"""
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        return sorted((postings.get(token, set()) for token in tokens), key=len)
+
+    def _filter(self, specialty=None, location=None):
+        # Sets a doctor must belong to, smallest first, so the first one drives the scan
+        sets = []
+        for postings, text in ((self.specialty_postings, specialty), (self.location_postings, location)):
+            matching = self._postings(postings, text)
+            if matching is not None:
+                sets.extend(matching)
+        return sorted(sets, key=len) or None
+
+    def search(self, specialty=None, location=None, limit=20):
+        """IDs of doctors matching the specialty and location words"""
+        with self._lock:
+            sets = self._filter(specialty, location)
+            if sets is None:
+                return list(islice(self.doctors, limit))
+            # Walk the most selective set and stop as soon as enough doctors match
+            smallest, others = sets[0], sets[1:]
+            matches = (doctor_id for doctor_id in smallest if all(doctor_id in ids for ids in others))
+            return list(islice(matches, limit))
+
+    def nearest(self, latitude, longitude, k=10, specialty=None, max_km=None):
+        """Return up to k (doctor_id, distance_km) pairs, closest first.
+
+        Grid rings around the query cell are searched outwards and the
+        search stops once no unvisited ring can hold a closer doctor. With
+        a specialty, the grid of its most selective word is searched and
+        the other words filter what it finds.
+        """
+        with self._lock:
+            cells, located, allowed = self.cells, self.located, None
+            tokens = set(tokenize(specialty))
+            if tokens:
+                token = min(tokens, key=lambda token: len(self.specialty_postings.get(token, ())))
+                candidates = self.specialty_postings.get(token)
+                if not candidates:
+                    return []
+                allowed = [self.specialty_postings.get(other, set()) for other in tokens - {token}]
+                if len(candidates) <= BRUTE_FORCE_LIMIT:
+                    candidates = [doctor_id for doctor_id in candidates if all(doctor_id in ids for ids in allowed)]
+                    return self._nearest_among(candidates, latitude, longitude, k, max_km)
+                cells, located = self.specialty_cells[token], self.specialty_located[token]
+            elif self.located <= BRUTE_FORCE_LIMIT:
+                return self._nearest_among(self.doctors, latitude, longitude, k, max_km)
+            center_x, center_y = _cell(latitude, longitude)
+            max_ring = int(math.ceil(360 / CELL_DEGREES))
+            best = []  # max-heap of (-distance, id)
+            seen = 0
+            for ring in range(max_ring + 1):
+                # Closest any cell in this ring can be to the query point
+                edge_latitude = min(89.9, abs(latitude) + (ring + 1) * CELL_DEGREES)
+                bound = max(0, ring - 1) * CELL_DEGREES * KM_PER_DEGREE * math.cos(math.radians(edge_latitude))
+                if (len(best) >= k and bound > -best[0][0]) or (max_km is not None and bound > max_km):
+                    break
+                if seen >= located:
+                    break  # Every located doctor has been visited
+                for cell in self._ring_cells(center_x, center_y, ring):
+                    doctor_ids = cells.get(cell, ())
+                    seen += len(doctor_ids)
+                    for doctor_id in doctor_ids:
+                        if allowed and not all(doctor_id in ids for ids in allowed):
+                            continue
+                        _, _, _, doctor_latitude, doctor_longitude = self.doctors[doctor_id]
+                        distance = haversine_km(latitude, longitude, doctor_latitude, doctor_longitude)
+                        if max_km is not None and distance > max_km:
+                            continue
+                        if len(best) < k:
+                            heapq.heappush(best, (-distance, doctor_id))
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, (-distance, doctor_id))
+            return [(doctor_id, -negative) for negative, doctor_id in sorted(best, reverse=True)]
+
+    def _nearest_among(self, doctor_ids, latitude, longitude, k, max_km):
+        results = []
+        for doctor_id in doctor_ids:
+            _, _, _, doctor_latitude, doctor_longitude = self.doctors[doctor_id]
+            if doctor_latitude is None or doctor_longitude is None:
+                continue
+            distance = haversine_km(latitude, longitude, doctor_latitude, doctor_longitude)
+            if max_km is None or distance <= max_km:
+                results.append((distance, doctor_id))
+        return [(doctor_id, distance) for distance, doctor_id in heapq.nsmallest(k, results)]
+
+    def _ring_cells(self, center_x, center_y, ring):
+        if ring == 0:
+            yield (center_x, center_y)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (center_x + dx, center_y - ring)
+            yield (center_x + dx, center_y + ring)
+        for dy in range(-ring + 1, ring):
+            yield (center_x - ring, center_y + dy)
+            yield (center_x + ring, center_y + dy)
+
+    def describe(self, doctor_id):
+        name, specialty, location, latitude, longitude = self.doctors[doctor_id]
+        return {"id": str(doctor_id), "name": name, "specialty": specialty, "location": location}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def build_doctor_index():
+    """Build a fresh index from the Doctor table"""
+    from .models import Doctor
+
+    index = DoctorIndex()
+    rows = Doctor.objects.values_list(
+        'id', 'user__first_name', 'user__last_name', 'specialization', 'location', 'latitude', 'longitude'
+    )
+    for doctor_id, first_name, last_name, specialty, location, latitude, longitude in rows.iterator(chunk_size=5000):
+        index.upsert(doctor_id, f'{first_name} {last_name}'.strip(), specialty, location, latitude, longitude)
+    return index
+
+
+def get_doctor_index():
+    """Return the process-wide doctor index, building it on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = build_doctor_index()
+        return _index
+
+
+def loaded_doctor_index():
+    """Return the index only if it has been built, for incremental updates"""
+    return _index
+
+
+def rebuild_doctor_index():
+    """Replace the process-wide index with one rebuilt from the database"""
+    global _index
+    index = build_doctor_index()
+    with _index_lock:
+        _index = index
+    return index
+
+
+class DoctorSearchProvider:
+    """Serves FindDoctorsTool from the in-memory index"""
+
+    def __init__(self, availability=None):
+        self.availability = availability
+
+    def find_doctors(self, specialty, location=None, limit=10):
+        index = get_doctor_index()
+        coordinates = parse_coordinates(location)
+        if coordinates:
+            results = []
+            for doctor_id, distance in index.nearest(*coordinates, k=limit, specialty=specialty):
+                doctor = index.describe(doctor_id)
+                doctor["distance_km"] = round(distance, 1)
+                results.append(doctor)
+        else:
+            results = [index.describe(doctor_id) for doctor_id in index.search(specialty, location, limit)]
+
+        if self.availability is not None and results:
+            slots = self.availability.available_slots([int(doctor["id"]) for doctor in results])
+            for doctor in results:
+                doctor["available_slots"] = slots.get(int(doctor["id"]), [])
+        return results
+
+    afind_doctors = in_worker_thread(find_doctors)
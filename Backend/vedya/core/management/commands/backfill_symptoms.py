@@ -0,0 +1,67 @@
+import os
+import sys
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../..')))
+
+from AI.utils.symptom_lexicon import get_symptom_lexicon
+from vedya.core.models import Appointment, Message
+
+
+class Command(BaseCommand):
+    help = "Fill empty Appointment.symptoms from the patient's WhatsApp messages before booking"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--window-hours', type=float, default=72.0,
+                            help='Read only the messages sent this long before each booking')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        lexicon = get_symptom_lexicon()
+        chunk_size = options['chunk_size']
+        window = timedelta(hours=options['window_hours'])
+        updated = 0
+        last_id = 0
+
+        while True:
+            appointments = list(
+                Appointment.objects.filter(symptoms='', id__gt=last_id)
+                .order_by('id')
+                .only('id', 'patient_id', 'created_at')[:chunk_size]
+            )
+            if not appointments:
+                break
+            last_id = appointments[-1].id
+
+            # One query for the chunk's patient messages, bounded by the earliest and latest booking windows
+            messages = defaultdict(list)
+            rows = Message.objects.filter(
+                sender='patient',
+                conversation__patient_id__in={appointment.patient_id for appointment in appointments},
+                timestamp__gte=min(appointment.created_at for appointment in appointments) - window,
+                timestamp__lte=max(appointment.created_at for appointment in appointments)
+            ).order_by('timestamp').values_list('conversation__patient_id', 'timestamp', 'content')
+            for patient_id, timestamp, content in rows.iterator():
+                messages[patient_id].append((timestamp, content))
+
+            texts = [
+                '\n'.join(content for timestamp, content in messages[appointment.patient_id]
+                          if appointment.created_at - window <= timestamp <= appointment.created_at)
+                for appointment in appointments
+            ]
+            changed = []
+            for appointment, symptoms in zip(appointments, lexicon.extract_batch(texts)):
+                if symptoms:
+                    appointment.symptoms = ', '.join(symptom['name'] for symptom in symptoms)
+                    changed.append(appointment)
+
+            if changed and not options['dry_run']:
+                Appointment.objects.bulk_update(changed, ['symptoms'])
+            updated += len(changed)
+
+        self.stdout.write(f'{"Would update" if options["dry_run"] else "Updated"} {updated} appointments')
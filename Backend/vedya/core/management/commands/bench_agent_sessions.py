@@ -0,0 +1,111 @@
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../..')))
+
+from AI.agents.patient_agent import PatientAgent
+from AI.utils.conversation_memory import ConversationMemory, ConversationMemoryStore
+
+TURNS = [
+    ('Patient', 'Hi, I need to book an appointment'),
+    ('Assistant', "I'd be happy to help you book an appointment. What symptoms are you experiencing?"),
+    ('Patient', 'I have had a fever and headache since two days'),
+    ('Assistant', "I understand you're not feeling well. How long have you been experiencing them?"),
+    ('Patient', 'Tomorrow morning would be best for me'),
+    ('Assistant', 'Dr. Sharma is free at 10:00 tomorrow. Shall I book it?'),
+]
+
+
+def _copy(text):
+    # Real conversations hold their own message strings, not shared literals
+    return text.encode().decode()
+
+
+def _traced(build):
+    """Return build()'s result and the bytes it left allocated"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, allocated
+
+
+class Command(BaseCommand):
+    help = 'Measure the memory and create/serialize/evict cost of live patient agent sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=10000)
+        parser.add_argument('--turns', type=int, default=len(TURNS), help=f'Turns per session (at most {len(TURNS)})')
+        parser.add_argument('--agent-copies', type=int, default=200,
+                            help='Sessions measured for the agent-per-session comparison, scaled to --sessions')
+
+    def handle(self, *args, **options):
+        sessions, turns = options['sessions'], TURNS[:options['turns']]
+        mb = 1024 * 1024
+
+        # Build the shared definition outside the measurements, as a warmed-up worker has
+        PatientAgent(llm=None)
+
+        def agent_per_session():
+            # Previous layout: every conversation built its own tools, prompt and memory limits
+            agents = []
+            for _ in range(options['agent_copies']):
+                memory = ConversationMemory()
+                for role, text in turns:
+                    memory.add_turn(role, _copy(text))
+                agents.append((PatientAgent._create_definition(), memory))
+            return agents
+
+        _, copies_bytes = _traced(agent_per_session)
+        per_copy = copies_bytes / options['agent_copies']
+        self.stdout.write(
+            f'Agent per session: {per_copy / 1024:.1f}KB each, '
+            f'{per_copy * sessions / mb:.1f}MB for {sessions} sessions (extrapolated)'
+        )
+
+        store = ConversationMemoryStore(max_bytes=1 << 40)
+
+        def shared_agent():
+            agent = PatientAgent(llm=None, memory_store=store)
+            for key in range(sessions):
+                memory = store.get(key)
+                for role, text in turns:
+                    memory.add_turn(role, _copy(text))
+                store.save(key, memory)
+            return agent
+
+        started = time.perf_counter()
+        _, session_bytes = _traced(shared_agent)
+        created = time.perf_counter() - started
+        self.stdout.write(
+            f'Shared definition: {session_bytes / sessions:.0f} bytes each, '
+            f'{session_bytes / mb:.1f}MB for {sessions} sessions '
+            f'({per_copy * sessions / session_bytes:.1f}x smaller)'
+        )
+
+        started = time.perf_counter()
+        payloads = [json.dumps(store.get(key).to_dict()) for key in range(sessions)]
+        serialized = time.perf_counter() - started
+        started = time.perf_counter()
+        for payload in payloads:
+            ConversationMemory.from_dict(json.loads(payload), policy=store.policy)
+        restored = time.perf_counter() - started
+        started = time.perf_counter()
+        for key in range(sessions):
+            store.forget(key)
+        evicted = time.perf_counter() - started
+        average = sum(len(payload) for payload in payloads) / sessions
+        self.stdout.write(
+            f'Per session: create {created / sessions * 1e6:.1f}us (traced), serialize {serialized / sessions * 1e6:.1f}us, '
+            f'restore {restored / sessions * 1e6:.1f}us, evict {evicted / sessions * 1e6:.1f}us; '
+            f'Conversation.memory payload {average:.0f} bytes'
+        )
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from vedya.core.dispatcher import ShardedDispatcher
+from vedya.core.twilio_mock import TwilioMock
+
+
+class Command(BaseCommand):
+    help = 'Measure message dispatcher throughput for increasing worker counts using TwilioMock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=200, help='Number of distinct WhatsApp senders')
+        parser.add_argument('--messages', type=int, default=5, help='Messages sent by each patient')
+        parser.add_argument('--agent-latency-ms', type=float, default=20.0, help='Simulated agent turn latency')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+
+    def handle(self, *args, **options):
+        baseline = None
+        for workers in options['workers']:
+            result = self._run(workers, options['patients'], options['messages'], options['agent_latency_ms'] / 1000)
+            baseline = baseline or result['throughput'] / workers
+            self.stdout.write(
+                f"workers={workers:<3} messages={result['messages']:<6} turns={result['turns']:<6} "
+                f"elapsed={result['elapsed']:.2f}s throughput={result['throughput']:.0f} msg/s "
+                f"scaling={result['throughput'] / baseline:.1f}x ordered={result['ordered']}"
+            )
+
+    def _run(self, workers, patients, messages_per_patient, agent_latency):
+        twilio = TwilioMock()
+        seen = {}
+        turns = []
+        done = threading.Semaphore(0)
+
+        def handle_turn(sender, items):
+            # Stand-in for the agent: fixed latency per turn, reply through the mock
+            time.sleep(agent_latency)
+            seen.setdefault(sender, []).extend(item['Body'] for item in items)
+            turns.append(len(items))
+            twilio.send_message(sender, f'Reply to {len(items)} message(s)')
+            for _ in items:
+                done.release()
+
+        dispatcher = ShardedDispatcher(handle_turn, workers=workers, name='bench-dispatcher')
+        numbers = [f'+9190000{index:05d}' for index in range(patients)]
+        for number in numbers:
+            twilio.register_callback(number, lambda message: dispatcher.submit(message['From'], message))
+
+        total = patients * messages_per_patient
+        start = time.perf_counter()
+        for sequence in range(messages_per_patient):
+            for number in numbers:
+                twilio.simulate_incoming_message(number, str(sequence))
+        for _ in range(total):
+            done.acquire()
+        elapsed = time.perf_counter() - start
+        dispatcher.stop()
+
+        expected = [str(sequence) for sequence in range(messages_per_patient)]
+        return {
+            'messages': total,
+            'turns': len(turns),
+            'elapsed': elapsed,
+            'throughput': total / elapsed,
+            'ordered': all(seen.get(number) == expected for number in numbers),
+        }
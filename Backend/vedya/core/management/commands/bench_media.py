@@ -0,0 +1,123 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from vedya.core import message_pipeline
+from vedya.core.media import MediaPipeline
+from vedya.core.media_mock import MediaServer
+from vedya.core.message_pipeline import MessagePipeline
+from vedya.core.models import Message
+from vedya.core.twilio_mock import TwilioMock
+
+SCRIPTS = [
+    'I have had a fever and headache since two days',
+    'Mujhe kal subah doctor se milna hai',
+    'I need to book an appointment for my mother',
+    'Please cancel my appointment tomorrow',
+]
+TRANSCRIBER = 'vedya.core.transcribers.scripted_transcriber'
+
+
+class Command(BaseCommand):
+    help = 'Measure streamed voice-note ingestion against a local media server, then run voice notes through the webhook'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=40)
+        parser.add_argument('--size-kb', type=int, default=1024)
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent downloads')
+        parser.add_argument('--processes', type=int, default=2, help='Transcription processes')
+        parser.add_argument('--bandwidth-kbps', type=float, default=0,
+                            help='Per-download throughput of the media server in KB/s (0 is unthrottled)')
+
+    def handle(self, *args, **options):
+        notes, size = options['notes'], options['size_kb'] * 1024
+        bandwidth = options['bandwidth_kbps'] * 1024 or None
+        work_dir = tempfile.mkdtemp(prefix='bench-media-')
+        try:
+            with MediaServer(bytes_per_second=bandwidth) as server:
+                urls = [server.add_voice_note(SCRIPTS[index % len(SCRIPTS)], size) for index in range(notes)]
+                self._buffered(urls, options['concurrency'])
+                server.peak_active = 0
+                pipeline = MediaPipeline(
+                    download_workers=options['concurrency'], transcriber=TRANSCRIBER,
+                    processes=options['processes'], dest_dir=os.path.join(work_dir, 'media')
+                )
+                try:
+                    self._streamed(pipeline, urls, server)
+                    self._webhook(pipeline, server, work_dir, size)
+                finally:
+                    pipeline.close()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _buffered(self, urls, concurrency):
+        # Before: each download held in memory whole, as response.content would
+        tracemalloc.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            total = sum(pool.map(lambda url: len(requests.get(url).content), urls))
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'Buffered downloads: {len(urls)} notes, {total / 2 ** 20:.0f}MB in {elapsed:.2f}s, '
+            f'peak Python memory {peak / 2 ** 20:.1f}MB'
+        )
+
+    def _streamed(self, pipeline, urls, server):
+        tracemalloc.start()
+        started = time.perf_counter()
+        results = [future.result() for future in [pipeline.submit(url) for url in urls]]
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        wrong = sum(1 for index, result in enumerate(results) if result.transcript != SCRIPTS[index % len(SCRIPTS)])
+        self.stdout.write(
+            f'Streamed + transcribed: {len(urls)} notes in {elapsed:.2f}s, peak Python memory {peak / 2 ** 20:.1f}MB, '
+            f'at most {server.peak_active} concurrent downloads, {wrong} wrong transcripts'
+        )
+        if wrong:
+            raise CommandError('Transcripts did not match their scripts')
+
+    def _webhook(self, pipeline, server, work_dir, size):
+        setup_test_environment()
+        # A file rather than shared-cache memory, so pipeline workers can write concurrently
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(work_dir, 'db.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        mock = TwilioMock()
+        message_pipeline._pipeline = MessagePipeline(twilio_factory=lambda: mock, media_pipeline=pipeline)
+        try:
+            client = Client()
+            latencies = []
+            for index, script in enumerate(SCRIPTS * 3):
+                url = server.add_voice_note(script, size)
+                started = time.perf_counter()
+                client.post('/api/webhook/twilio/', {
+                    'From': f'whatsapp:+9198{index:08d}', 'Body': '', 'MediaUrl0': url, 'MediaContentType0': 'audio/ogg'
+                })
+                latencies.append(time.perf_counter() - started)
+            message_pipeline._pipeline.stop()
+            transcribed = Message.objects.filter(sender='patient').exclude(content='').count()
+            replies = Message.objects.filter(sender='system').count()
+            self.stdout.write(
+                f'Webhook with voice notes: p50 {statistics.median(latencies) * 1000:.1f}ms, '
+                f'{transcribed}/{len(latencies)} messages transcribed, {replies} agent replies'
+            )
+            reply = mock.get_conversation_history('+919800000000')
+            self.stdout.write(f'  e.g. "{SCRIPTS[0]}" -> "{reply[-1]["body"] if reply else "(no reply)"}"')
+        finally:
+            message_pipeline._pipeline = None
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from AI.utils.metrics import registry
+from vedya.core.outbound import OutboundSender
+from vedya.core.twilio_mock import TwilioMock
+
+
+class Command(BaseCommand):
+    help = 'Measure outbound send throughput against TwilioMock with injected latency and failures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--latency-ms', type=float, default=50.0)
+        parser.add_argument('--jitter-ms', type=float, default=20.0)
+        parser.add_argument('--failure-rate', type=float, default=0.05)
+        parser.add_argument('--rate', type=float, default=500.0, help='Rate limit in messages per second (0 disables)')
+        parser.add_argument('--workers', type=int, nargs='+', default=[8, 32, 64, 128])
+
+    def handle(self, *args, **options):
+        messages = [(f'+9190000{index % 1000:05d}', f'Reminder {index}') for index in range(options['messages'])]
+        for workers in options['workers']:
+            mock = TwilioMock(
+                latency=options['latency_ms'] / 1000,
+                jitter=options['jitter_ms'] / 1000,
+                failure_rate=options['failure_rate']
+            )
+            # A small burst so the sustained rate limit shows in the results
+            sender = OutboundSender(
+                mock, rate_per_second=options['rate'], burst=max(1, options['rate'] / 10),
+                max_retries=5, base_delay=0.05, workers=workers
+            )
+            retries = registry.counter('outbound.retries').value
+            started = time.perf_counter()
+            results = sender.send_many(messages)
+            elapsed = time.perf_counter() - started
+            sender.close()
+            failed = sum(isinstance(result, Exception) for result in results)
+            self.stdout.write(
+                f'workers={workers:<3} sent={len(results) - failed:<6} failed={failed:<4} '
+                f'retries={registry.counter("outbound.retries").value - retries:<5} '
+                f'elapsed={elapsed:.2f}s throughput={len(results) / elapsed:.0f} msg/s'
+            )
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from AI.agents.doctor_agent import DoctorAgent
+from AI.agents.patient_agent import PatientAgent
+from AI.agents.tool_executor import ToolCall
+from vedya.core.models import Appointment, Doctor, Patient
+
+
+class Command(BaseCommand):
+    help = 'Compare sequential and concurrent tool execution for a patient and a doctor agent turn'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turns', type=int, default=20)
+        parser.add_argument('--query-latency-ms', type=float, default=5.0,
+                            help='Delay added to every query, standing in for a database across the network')
+
+    def handle(self, *args, **options):
+        delay = options['query_latency_ms'] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            # Fires again whenever a thread's connection is reopened
+            if slow_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_query)
+
+        setup_test_environment()
+        # A file rather than shared-cache memory, so worker threads open their own connections
+        test_dir = tempfile.mkdtemp(prefix='bench-tools-')
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(test_dir, 'db.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            patient, doctor = self._seed()
+            if delay:
+                connection_created.connect(add_latency)
+                connections.close_all()
+            # Without the record cache every turn reaches the database
+            with override_settings(RECORD_CACHE_MAX_ENTRIES=0):
+                self._compare('Patient turn', PatientAgent(llm=None), [
+                    ToolCall('get_patient_profile', {'patient_id': patient.id}),
+                    ToolCall('get_patient_appointments', {'patient_id': patient.id}),
+                    ToolCall('find_doctors', {'specialty': 'General Physician', 'location': 'Pune'}),
+                    ToolCall('extract_symptoms', {'message': 'fever and headache since two days'}),
+                ], options['turns'])
+                self._compare('Doctor turn', DoctorAgent(llm=None), [
+                    ToolCall('get_doctor_schedule', {'doctor_id': doctor.id}),
+                    ToolCall('get_patient_history', {'patient_id': patient.id}),
+                ], options['turns'])
+        finally:
+            connection_created.disconnect(add_latency)
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _seed(self):
+        start = timezone.now() + timedelta(days=1)
+        patient = Patient.objects.create(whatsapp_number='+910000000001', full_name='Bench Patient', age=40)
+        doctors = []
+        for number in range(1, 21):
+            user = User.objects.create(username=f'bench-doctor{number}', first_name='Doctor', last_name=str(number))
+            doctors.append(Doctor.objects.create(
+                user=user, specialization='General Physician', license_number=str(number),
+                phone_number='0', location='Pune'
+            ))
+        for offset, doctor in enumerate(doctors):
+            scheduled = start + timedelta(hours=offset)
+            Appointment.objects.create(
+                patient=patient, doctor=doctor, scheduled_time=scheduled, end_time=scheduled + timedelta(minutes=30)
+            )
+        return patient, doctors[0]
+
+    def _compare(self, label, agent, calls, turns):
+        tools = {tool.name: tool for tool in agent.tools}
+
+        def sequential():
+            for call in calls:
+                tools[call.name]._run(**call.args)
+
+        async def concurrent():
+            results = await agent.arun_tools(calls)
+            failed = [result for result in results if result.error]
+            if failed:
+                raise RuntimeError(f'{failed[0].name}: {failed[0].error}')
+
+        async def slowest():
+            # The per-tool floor: each tool alone, through the same async path
+            medians = []
+            for call in calls:
+                times = await self._time_async(lambda: agent.arun_tools([call]), turns)
+                medians.append(statistics.median(times))
+            return max(medians)
+
+        sequential_times = [self._time(sequential) for _ in range(turns)]
+        concurrent_times = asyncio.run(self._time_async(concurrent, turns))
+        floor = asyncio.run(slowest())
+        self.stdout.write(
+            f'{label} ({len(calls)} tools): sequential p50 {statistics.median(sequential_times) * 1000:.1f}ms, '
+            f'concurrent p50 {statistics.median(concurrent_times) * 1000:.1f}ms, '
+            f'slowest single tool {floor * 1000:.1f}ms'
+        )
+
+    def _time(self, fn):
+        started = time.perf_counter()
+        fn()
+        return time.perf_counter() - started
+
+    async def _time_async(self, fn, count):
+        times = []
+        for _ in range(count):
+            started = time.perf_counter()
+            await fn()
+            times.append(time.perf_counter() - started)
+        return times
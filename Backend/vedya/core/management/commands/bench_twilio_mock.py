@@ -0,0 +1,57 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from vedya.core.twilio_mock import TwilioMock
+
+
+class Command(BaseCommand):
+    help = 'Soak-test TwilioMock with concurrent traffic and measure its throughput and history lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000000)
+        parser.add_argument('--numbers', type=int, default=50000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--lookups', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        mock = TwilioMock()
+        numbers = [f'+9190{index:08d}' for index in range(options['numbers'])]
+        per_thread = options['messages'] // options['threads']
+
+        def traffic(seed):
+            rng = random.Random(seed)
+            for sequence in range(per_thread):
+                number = rng.choice(numbers)
+                if sequence % 2:
+                    mock.send_whatsapp_message(number, f'Reply {sequence}')
+                else:
+                    mock.simulate_incoming_message(f'whatsapp:{number}', f'Message {sequence}')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as pool:
+            list(pool.map(traffic, range(options['threads'])))
+        elapsed = time.perf_counter() - started
+        total = per_thread * options['threads']
+        self.stdout.write(
+            f'{total} messages from {options["threads"]} threads in {elapsed:.2f}s ({total / elapsed:.0f} msg/s); '
+            f'retained {len(mock.sent_messages)} sent and {len(mock.received_messages)} received'
+        )
+
+        timings = []
+        ordered = True
+        rng = random.Random(0)
+        for _ in range(options['lookups']):
+            number = rng.choice(numbers)
+            started = time.perf_counter()
+            history = mock.get_conversation_history(number)
+            timings.append(time.perf_counter() - started)
+            sequences = [entry['sequence'] for entry in history]
+            ordered = ordered and sequences == sorted(sequences)
+        timings.sort()
+        self.stdout.write(
+            f'History lookups: p50={timings[len(timings) // 2] * 1e6:.1f}us '
+            f'p99={timings[int(len(timings) * 0.99)] * 1e6:.1f}us ordered={ordered}'
+        )
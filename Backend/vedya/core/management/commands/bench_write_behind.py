@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from vedya.core import write_behind
+from vedya.core.conversation_store import load_memory, save_memory
+from vedya.core.message_pipeline import record_inbound_message
+from vedya.core.models import Message
+from vedya.core.write_behind import WriteBehindBuffer, create_message
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class CommitCounter:
+    """Counts the transactions that write, on every connection opened while installed.
+
+    An autocommit write is one commit; writes inside atomic() count once,
+    when the outermost block commits.
+    """
+
+    def __init__(self):
+        self.commits = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        db = context['connection']
+        if sql.lstrip()[:6].upper() in WRITES:
+            if not db.in_atomic_block:
+                self._count()
+            elif not getattr(db, 'bench_commit_pending', False):
+                db.bench_commit_pending = True
+                transaction.on_commit(lambda: self._committed(db), using=db.alias)
+        return execute(sql, params, many, context)
+
+    def _committed(self, db):
+        db.bench_commit_pending = False
+        self._count()
+
+    def _count(self):
+        with self._lock:
+            self.commits += 1
+
+    def install(self, sender=None, connection=None, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+class Command(BaseCommand):
+    help = 'Compare commits per message with and without the write-behind buffer on a throwaway database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversations', type=int, default=100)
+        parser.add_argument('--turns', type=int, default=10, help='Patient messages per conversation')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent workers, each owning some conversations')
+        parser.add_argument('--max-items', type=int, default=500)
+        parser.add_argument('--max-delay-ms', type=int, default=200)
+
+    def handle(self, *args, **options):
+        work_dir = tempfile.mkdtemp(prefix='bench-write-behind-')
+        setup_test_environment()
+        # A file rather than shared-cache memory, so the worker threads can write concurrently
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(work_dir, 'db.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        counter = CommitCounter()
+        connection_created.connect(counter.install)
+        try:
+            with override_settings(WRITE_BEHIND_MAX_ITEMS=0):
+                before = self._run('Row at a time', counter, options, prefix='+9170', buffer=None)
+            buffer = WriteBehindBuffer(options['max_items'], options['max_delay_ms'] / 1000)
+            write_behind._buffer = buffer
+            try:
+                after = self._run('Write-behind', counter, options, prefix='+9180', buffer=buffer)
+            finally:
+                buffer.stop()
+                write_behind._buffer = None
+            self.stdout.write(f'{before / after:.1f}x fewer commits per message with write-behind')
+        finally:
+            connection_created.disconnect(counter.install)
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _run(self, label, counter, options, prefix, buffer):
+        numbers = [f'whatsapp:{prefix}{index:08d}' for index in range(options['conversations'])]
+        stale_reads = []
+
+        def converse(owned):
+            # One worker answers all of a patient's turns, as a pipeline shard does
+            try:
+                for turn in range(options['turns']):
+                    for number in owned:
+                        job = record_inbound_message(number, f'{turn} patient message')
+                        create_message(conversation_id=job.conversation_id, sender='system', content=f'{turn} reply')
+                        memory = {'turn': turn}
+                        save_memory(job.conversation_id, memory)
+                        if load_memory(job.conversation_id) != memory:
+                            stale_reads.append(number)
+            finally:
+                connections.close_all()
+
+        threads = options['threads']
+        counter.commits = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(converse, [numbers[index::threads] for index in range(threads)]))
+        if buffer is not None:
+            buffer.flush()
+        elapsed = time.perf_counter() - started
+        commits = counter.commits
+
+        messages = Message.objects.filter(conversation__patient__whatsapp_number__startswith=prefix)
+        expected = len(numbers) * options['turns'] * 2
+        order = defaultdict(list)
+        for conversation_id, content in messages.order_by('timestamp', 'id').values_list('conversation_id', 'content'):
+            order[conversation_id].append(int(content.split()[0]))
+        out_of_order = sum(1 for turns in order.values() if turns != sorted(turns))
+        per_message = commits / expected
+        self.stdout.write(
+            f'{label}: {expected} messages in {elapsed:.2f}s ({expected / elapsed:.0f}/s), '
+            f'{commits} commits, {per_message:.3f} per message; '
+            f'{messages.count()} rows written, {out_of_order} conversations out of order, '
+            f'{len(stale_reads)} stale reads'
+        )
+        if messages.count() != expected or out_of_order or stale_reads:
+            raise CommandError(f'{label} lost, reordered or hid writes')
+        return per_message
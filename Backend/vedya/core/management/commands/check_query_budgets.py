@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import resolve
+from django.utils import timezone
+
+from vedya.api.query_budget import QueryBudgetExceeded
+from vedya.core import message_pipeline
+from vedya.core.message_pipeline import MessagePipeline
+from vedya.core.models import Appointment, Doctor, Patient
+from vedya.core.twilio_mock import TwilioMock
+
+# (method, path, data) for every endpoint with a declared budget
+CASES = [
+    ('post', '/api/webhook/twilio/', {'From': 'whatsapp:+15550000001', 'Body': 'I need an appointment'}),
+    ('post', '/api/webhook/twilio/', {'From': 'whatsapp:+15550000001', 'Body': 'Tomorrow morning please'}),
+    ('get', '/api/doctors/', {'limit': 20}),
+    ('get', '/api/patients/', {'limit': 20}),
+    ('get', '/api/appointments/', {'limit': 20}),
+    ('get', '/api/appointments/', {'limit': 20, 'doctor': 1, 'status': 'scheduled'}),
+    ('get', '/api/metrics/', {}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Run each API endpoint against a throwaway test database in strict query-budget mode'
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        # Replies to the webhook messages go to the mock instead of real WhatsApp numbers
+        pipeline = message_pipeline._pipeline = MessagePipeline(twilio_factory=TwilioMock)
+        try:
+            self._seed()
+            failures = self._check()
+        finally:
+            pipeline.stop()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        if failures:
+            raise CommandError(f'{failures} request(s) exceeded their query budget')
+
+    def _seed(self):
+        start = timezone.now() + timedelta(days=1)
+        for number in range(1, 31):
+            user = User.objects.create(username=f'doctor{number}', first_name='Doctor', last_name=str(number))
+            doctor = Doctor.objects.create(
+                user=user, specialization='General Physician', license_number=str(number),
+                phone_number='0', location='Pune'
+            )
+            patient = Patient.objects.create(whatsapp_number=f'+9100000{number:04d}', full_name=f'Patient {number}')
+            Appointment.objects.create(
+                patient=patient, doctor=doctor, scheduled_time=start, end_time=start + timedelta(minutes=30)
+            )
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def _check(self):
+        client = Client()
+        failures = 0
+        for method, path, data in CASES:
+            budget = getattr(resolve(path).func, 'query_budget', None)
+            with CaptureQueriesContext(connection) as queries:
+                try:
+                    getattr(client, method)(path, data)
+                    outcome = self.style.SUCCESS('ok')
+                except QueryBudgetExceeded:
+                    failures += 1
+                    outcome = self.style.ERROR('over budget')
+            self.stdout.write(f'{method.upper():<5}{path:<28}{len(queries):>4} queries  budget {budget}  {outcome}')
+        return failures
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../..')))
+
+from AI.utils.intent_engine import get_intent_engine
+from vedya.core.models import Message
+
+
+class Command(BaseCommand):
+    help = 'Re-classify stored patient messages with the compiled intent engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--output', help='Write one JSON line per message with all matching intents')
+
+    def handle(self, *args, **options):
+        engine = get_intent_engine('patient')
+        chunk_size = options['chunk_size']
+        totals = Counter()
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else None
+
+        rows = Message.objects.filter(sender='patient').order_by('id').values_list('id', 'content')
+        chunk = []
+        try:
+            for row in rows.iterator(chunk_size=chunk_size):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    self._classify(engine, chunk, totals, output)
+                    chunk = []
+            if chunk:
+                self._classify(engine, chunk, totals, output)
+        finally:
+            if output:
+                output.close()
+
+        for intent, count in totals.most_common():
+            self.stdout.write(f'{intent}: {count}')
+
+    def _classify(self, engine, chunk, totals, output):
+        results = engine.classify_batch(content for _, content in chunk)
+        for (message_id, _), matches in zip(chunk, results):
+            totals[matches[0].intent if matches else engine.default_intent] += 1
+            if output:
+                output.write(json.dumps({
+                    'message_id': message_id,
+                    'intents': [match.to_dict() for match in matches]
+                }, ensure_ascii=False) + '\n')
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vedya.core.doctor_index import DoctorIndex, rebuild_doctor_index
+
+SPECIALTIES = [
+    'General Physician', 'Cardiologist', 'Dermatologist', 'Pediatrician', 'Gynecologist',
+    'Orthopedic Surgeon', 'Neurologist', 'Psychiatrist', 'ENT Specialist', 'Ophthalmologist',
+    'Dentist', 'Pulmonologist', 'Gastroenterologist', 'Endocrinologist', 'Urologist',
+]
+CITIES = [
+    ('Mumbai', 19.07, 72.88), ('Delhi', 28.70, 77.10), ('Bengaluru', 12.97, 77.59), ('Chennai', 13.08, 80.27),
+    ('Kolkata', 22.57, 88.36), ('Hyderabad', 17.38, 78.49), ('Pune', 18.52, 73.86), ('Jaipur', 26.91, 75.79),
+    ('Lucknow', 26.85, 80.95), ('Patna', 25.59, 85.14), ('Bhopal', 23.26, 77.41), ('Nagpur', 21.15, 79.09),
+]
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the in-memory doctor index from the database, or benchmark it with synthetic doctors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--benchmark', type=int, metavar='N', help='Benchmark with N synthetic doctors instead')
+        parser.add_argument('--queries', type=int, default=10000)
+        parser.add_argument('--p99-budget-us', type=float, default=1000,
+                            help='Fail the benchmark when a lookup\'s p99 exceeds this')
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            self._benchmark(options['benchmark'], options['queries'], options['p99_budget_us'])
+            return
+        start = time.perf_counter()
+        index = rebuild_doctor_index()
+        self.stdout.write(f'Indexed {len(index)} doctors in {time.perf_counter() - start:.2f}s')
+
+    def _benchmark(self, count, queries, p99_budget_us):
+        rng = random.Random(42)
+        index = DoctorIndex()
+        start = time.perf_counter()
+        for doctor_id in range(1, count + 1):
+            city, latitude, longitude = rng.choice(CITIES)
+            index.upsert(
+                doctor_id, f'Doctor {doctor_id}', rng.choice(SPECIALTIES), f'{city}, India',
+                latitude + rng.uniform(-1.5, 1.5), longitude + rng.uniform(-1.5, 1.5)
+            )
+        self.stdout.write(f'Built index of {count} doctors in {time.perf_counter() - start:.2f}s')
+
+        over_budget = []
+
+        def measure(label, query, lookup=True):
+            timings = []
+            for _ in range(queries):
+                started = time.perf_counter()
+                query()
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            p50, p99 = timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+            self.stdout.write(f'{label:<34} p50={p50 * 1e6:8.1f}us  p99={p99 * 1e6:8.1f}us')
+            if lookup and p99 * 1e6 > p99_budget_us:
+                over_budget.append(label)
+
+        measure('specialty + location', lambda: index.search(rng.choice(SPECIALTIES), rng.choice(CITIES)[0], 10))
+        measure('specialty only', lambda: index.search(rng.choice(SPECIALTIES), None, 10))
+        measure('nearest 10', lambda: index.nearest(*rng.choice(CITIES)[1:], k=10))
+        measure('nearest 10 with specialty', lambda: index.nearest(*rng.choice(CITIES)[1:], k=10, specialty=rng.choice(SPECIALTIES)))
+        measure('update (re-index one doctor)', lambda: index.upsert(
+            rng.randint(1, count), 'Doctor', rng.choice(SPECIALTIES), rng.choice(CITIES)[0], 20.0, 78.0), lookup=False)
+        if over_budget:
+            raise CommandError(f'p99 over {p99_budget_us:.0f}us at {count} doctors: {", ".join(over_budget)}')
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../..')))
+
+from AI.models.llm_service import LLMService
+from AI.models.weights import memory_usage
+
+
+def _private_worker(model_path, results):
+    # Before: every worker loads its own private copy on first request
+    os.environ['LLM_MMAP_WEIGHTS'] = 'False'
+    started = time.perf_counter()
+    service = LLMService(model_path)
+    service.generate('Hello')
+    results.put({'first_request_seconds': time.perf_counter() - started, **memory_usage()})
+
+
+def _shared_worker(service, results):
+    # After: weights were mapped and warmed in the parent before forking
+    started = time.perf_counter()
+    service.generate('Hello')
+    results.put({'first_request_seconds': time.perf_counter() - started, **memory_usage()})
+
+
+class Command(BaseCommand):
+    help = 'Compare per-worker RSS/PSS and cold-start time with private vs shared memory-mapped weights'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model-path', help='Weights file or directory; a dummy file is created if omitted')
+        parser.add_argument('--size-mb', type=int, default=256, help='Size of the dummy weights file')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        model_path = options['model_path']
+        cleanup = None
+        if not model_path:
+            handle = tempfile.NamedTemporaryFile(suffix='.bin', delete=False)
+            chunk = os.urandom(1024 * 1024)
+            for _ in range(options['size_mb']):
+                handle.write(chunk)
+            handle.close()
+            model_path = cleanup = handle.name
+
+        context = multiprocessing.get_context('fork')
+        try:
+            self._report('private weights per worker', self._run(context, options['workers'], _private_worker, model_path))
+
+            service = LLMService(model_path)
+            stats = service.warm_up()
+            self.stdout.write(f"parent warm-up: {stats['cold_start_seconds']:.3f}s")
+            self._report('shared mmap weights (preloaded)', self._run(context, options['workers'], _shared_worker, service))
+        finally:
+            if cleanup:
+                os.unlink(cleanup)
+
+    def _run(self, context, workers, target, argument):
+        results = context.Queue()
+        processes = [context.Process(target=target, args=(argument, results)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        reports = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        return reports
+
+    def _report(self, label, reports):
+        mb = 1024 * 1024
+        self.stdout.write(label)
+        for index, report in enumerate(reports):
+            pss = f"{report['pss_bytes'] / mb:.0f}MB" if report['pss_bytes'] is not None else 'n/a'
+            self.stdout.write(
+                f"  worker {index}: first request {report['first_request_seconds']:.3f}s "
+                f"rss={report['rss_bytes'] / mb:.0f}MB pss={pss}"
+            )
@@ -0,0 +1,68 @@
+import os
+import statistics
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../..')))
+
+from AI.agents.patient_agent import SYSTEM_PROMPT, PatientAgent
+from AI.models.llm_service import LLMService
+from AI.models.mock_backend import MockLLMBackend
+
+MESSAGES = [
+    'Hi, I need to book an appointment',
+    'I have had a fever and headache since two days',
+    'Tomorrow morning would be best for me',
+    'Can I reschedule to the evening instead?',
+    'Thank you',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare time-to-first-token of patient agent turns with and without the system-prompt prefix cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefill-rounds', type=int, default=200,
+                            help='CPU hash rounds per prompt token on the local mock backend')
+        parser.add_argument('--conversations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        results = {}
+        for label, max_bytes in (('without prefix cache', 0), ('with prefix cache', None)):
+            service = LLMService(
+                backend=MockLLMBackend(prefill_rounds=options['prefill_rounds']),
+                batch_window_ms=0, prefix_cache_max_bytes=max_bytes
+            )
+            service.warm_up()
+            results[label] = self._run(PatientAgent(service), options['conversations'])
+            line = f"{label}: p50 {self._ms(results[label], 0.5)}  p95 {self._ms(results[label], 0.95)}"
+            if service.prefix_cache is not None:
+                line += f"  ({len(service.prefix_cache)} prefix, {service.prefix_cache.total_bytes / 1024:.0f}KB cached)"
+            self.stdout.write(line)
+
+        before = statistics.median(results['without prefix cache'])
+        after = statistics.median(results['with prefix cache'])
+        self.stdout.write(
+            f'System prompt: {len(SYSTEM_PROMPT.split())} tokens; median time-to-first-token '
+            f'{before / after:.1f}x faster with the prefix cached'
+        )
+
+    def _run(self, agent, conversations):
+        ttft = []
+        for conversation in range(conversations):
+            for message in MESSAGES:
+                started = time.perf_counter()
+                tokens = agent.stream_message(f'patient-{conversation}', message)
+                next(tokens)
+                ttft.append(time.perf_counter() - started)
+                # Finish the turn so it is recorded in the conversation memory
+                for _ in tokens:
+                    pass
+        return ttft
+
+    def _ms(self, values, q):
+        ordered = sorted(values)
+        return f'{ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000:.1f}ms'
@@ -0,0 +1,411 @@
+import heapq
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from AI.utils.metrics import registry
+from vedya.core import message_pipeline
+from vedya.core.message_pipeline import MessagePipeline
+from vedya.core.outbound import OutboundSender
+from vedya.core.twilio_mock import TwilioMock
+from vedya.core.twilio_service import TwilioService
+
+WEBHOOK_PATH = '/api/webhook/twilio/'
+METRICS_PATH = '/api/metrics/'
+
+# Conversation scripts: each patient picks one and sends its turns in order,
+# with one of the alternatives chosen per turn
+SCRIPTS = {
+    'booking': [
+        ['Hi, I would like to book an appointment', 'Namaste, appointment chahiye', 'I need to see a doctor'],
+        ['I have had a fever and headache since yesterday', 'Mujhe bukhar aur sir dard hai',
+         'My child has a cough and a runny nose'],
+        ['Do you have a general physician in Pune?', 'Any doctor near Kothrud is fine', 'A pediatrician please'],
+        ['Tomorrow morning works for me', 'Kal shaam ko 5 baje', 'Any time after 4 pm on Friday'],
+        ['Yes, please confirm the booking', 'Haan, book kar dijiye', 'Confirm it, thank you'],
+    ],
+    'reschedule': [
+        ['I need to reschedule my appointment', 'Can I change my appointment?', 'Appointment ka time badalna hai'],
+        ['Something came up at work tomorrow', 'I will be travelling that day', 'Mujhe us din kaam hai'],
+        ['Is a different time on Saturday possible?', 'Can we move it to next Monday morning?',
+         'Another time in the evening please'],
+        ['Yes, that new time is fine', 'Theek hai, wahi rakh dijiye', 'Perfect, please update it'],
+    ],
+    'cancel': [
+        ['I want to cancel my appointment', 'Please cancel my booking', 'Appointment cancel karna hai'],
+        ['I am feeling better now', 'I have already seen another doctor', 'Plans changed, sorry'],
+        ['Yes, cancel it', 'Haan, radd kar dijiye', 'Confirmed, please cancel'],
+    ],
+    'symptoms': [
+        ['I have been feeling unwell', 'Tabiyat kharab hai', 'I am not feeling well since morning'],
+        ['I have chest pain and shortness of breath', 'Pet mein dard aur ulti ho rahi hai',
+         'Sore throat, body ache and a mild fever'],
+        ['It started two days ago and is getting worse at night', 'It comes and goes every few hours',
+         'Since last week, medicine has not helped'],
+        ['Should I see a doctor?', 'What should I do?', 'Which specialist should I visit?'],
+    ],
+}
+DEFAULT_MIX = 'booking=0.4,reschedule=0.2,cancel=0.15,symptoms=0.25'
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCRIPTS:
+            raise CommandError(f'Unknown script {name!r}; choose from {", ".join(SCRIPTS)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def summarize(values):
+    """count, mean, p50/p95/p99 and max of a list of latencies in seconds"""
+    ordered = sorted(values)
+    return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered) if ordered else 0.0,
+        'p50': _percentile(ordered, 0.50),
+        'p95': _percentile(ordered, 0.95),
+        'p99': _percentile(ordered, 0.99),
+        'max': ordered[-1] if ordered else 0.0,
+    }
+
+
+def histogram_delta(before, after):
+    """Summarize the observations a registry histogram received between two snapshots.
+
+    Quantiles are bucket upper bounds, as in Histogram.quantile.
+    """
+    count = after['count'] - (before['count'] if before else 0)
+    if count <= 0:
+        return None
+    total = after['sum'] - (before['sum'] if before else 0.0)
+    counts = [(bound, value - (before['buckets'].get(bound, 0) if before else 0))
+              for bound, value in after['buckets'].items()]
+    summary = {'count': count, 'mean': total / count}
+    for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+        running = 0
+        for bound, bucket_count in counts:
+            running += bucket_count
+            if running >= q * count:
+                summary[name] = float(bound) if bound != '+Inf' else None
+                break
+    return summary
+
+
+class Conversation:
+    """One synthetic patient working through a script"""
+
+    def __init__(self, index, script, messages, start):
+        self.number = f'+1555{index:07d}'
+        self.script = script
+        self.messages = messages
+        self.start = start  # Seconds after the run begins
+        self.next = 0
+
+
+class ReplyRecorder:
+    """Twilio stand-in for the pipeline that notes when each patient gets a reply.
+
+    Sends go through a real OutboundSender in front of TwilioMock, so the
+    rate limit, retries and mock latency are all part of what is measured.
+    A reply answers every message from that number still waiting for one;
+    with streamed replies that is the first chunk.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self._lock = threading.Lock()
+        self.pending = defaultdict(deque)  # number -> (posted_at, script)
+        self.latencies = defaultdict(list)  # script -> seconds
+
+    def expect(self, number, script, posted_at):
+        with self._lock:
+            self.pending[number].append((posted_at, script))
+
+    def send_whatsapp_message(self, to_number, message, media_url=None):
+        sid = self.service.send_whatsapp_message(to_number, message, media_url)
+        now = time.perf_counter()
+        with self._lock:
+            waiting = self.pending.get(to_number)
+            while waiting:
+                posted_at, script = waiting.popleft()
+                self.latencies[script].append(now - posted_at)
+        return sid
+
+    def unanswered(self):
+        with self._lock:
+            return sum(len(waiting) for waiting in self.pending.values())
+
+
+class Command(BaseCommand):
+    help = 'Replay synthetic patient conversations against the Twilio webhook and report latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, default=5.0, help='New conversations per second (Poisson arrivals)')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds during which conversations start')
+        parser.add_argument('--think-time', type=float, default=1.0, help='Mean seconds between a patient\'s messages')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help='Script weights, e.g. booking=0.5,cancel=0.5')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at most')
+        parser.add_argument('--url', help='Post to a running server at this base URL instead of the test client')
+        parser.add_argument('--drain-timeout', type=float, default=30.0,
+                            help='Seconds to wait for outstanding replies after the last message')
+        parser.add_argument('--twilio-latency-ms', type=float, default=50.0)
+        parser.add_argument('--twilio-jitter-ms', type=float, default=20.0)
+        parser.add_argument('--twilio-failure-rate', type=float, default=0.0)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Results file (default load-test-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        self.options = options
+        rng = random.Random(options['seed'])
+        conversations = self._conversations(rng)
+        self.stdout.write(
+            f'{len(conversations)} conversations, {sum(len(c.messages) for c in conversations)} messages, '
+            f'target {options["rate"]:g} conversations/s'
+        )
+        if options['url']:
+            results = self._run_http(conversations, rng)
+        else:
+            results = self._run_client(conversations, rng)
+        self._report(results)
+
+        output = options['output'] or f'load-test-{datetime.now():%Y%m%d-%H%M%S}.json'
+        with open(output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        self.stdout.write(f'Results written to {output}')
+
+    def _conversations(self, rng):
+        mix = _parse_mix(self.options['mix'])
+        names, weights = list(mix), list(mix.values())
+        conversations, started = [], 0.0
+        while True:
+            started += rng.expovariate(self.options['rate'])
+            if started >= self.options['duration']:
+                return conversations
+            script = rng.choices(names, weights)[0]
+            messages = [rng.choice(turn) for turn in SCRIPTS[script]]
+            conversations.append(Conversation(len(conversations), script, messages, started))
+
+    # Modes
+
+    def _run_client(self, conversations, rng):
+        """In-process run against a throwaway database with TwilioMock replying"""
+        options = self.options
+        mock = TwilioMock(
+            latency=options['twilio_latency_ms'] / 1000,
+            jitter=options['twilio_jitter_ms'] / 1000,
+            failure_rate=options['twilio_failure_rate']
+        )
+        sender = OutboundSender(mock, max_retries=5, base_delay=0.05, workers=options['concurrency'])
+        recorder = ReplyRecorder(TwilioService(sender=sender))
+        local = threading.local()
+
+        def post(conversation, body):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            recorder.expect(conversation.number, conversation.script, time.perf_counter())
+            response = local.client.post(WEBHOOK_PATH, {'From': f'whatsapp:{conversation.number}', 'Body': body})
+            return response.status_code
+
+        setup_test_environment()
+        # A file rather than shared-cache memory, so concurrent writers wait instead of failing
+        test_dir = tempfile.mkdtemp(prefix='load-test-')
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(test_dir, 'db.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        pipeline = message_pipeline._pipeline = MessagePipeline(twilio_factory=lambda: recorder)
+        try:
+            before = registry.snapshot()
+            results = self._drive(conversations, rng, post)
+            deadline = time.monotonic() + options['drain_timeout']
+            while recorder.unanswered() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            pipeline.stop()
+            results['elapsed_with_drain'] = time.perf_counter() - results.pop('started')
+            results['stages'] = self._stages(before, registry.snapshot())
+        finally:
+            message_pipeline._pipeline = None
+            sender.close()
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results['mode'] = 'client'
+        results['unanswered'] = recorder.unanswered()
+        results['end_to_end'] = summarize([value for values in recorder.latencies.values() for value in values])
+        results['end_to_end_by_script'] = {script: summarize(values) for script, values in recorder.latencies.items()}
+        results['outbound_sent'] = mock.sent_count
+        return results
+
+    def _run_http(self, conversations, rng):
+        """Post to a running server; its outbound side should be TWILIO_BACKEND=mock"""
+        base = self.options['url'].rstrip('/')
+
+        def post(conversation, body):
+            data = urllib.parse.urlencode({'From': f'whatsapp:{conversation.number}', 'Body': body}).encode()
+            try:
+                with urllib.request.urlopen(base + WEBHOOK_PATH, data, timeout=30) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as exc:
+                return exc.code
+
+        before = self._fetch_metrics(base)
+        results = self._drive(conversations, rng, post)
+        # The server answers in the background; give it the drain timeout to catch up
+        deadline = time.monotonic() + self.options['drain_timeout']
+        after = self._fetch_metrics(base)
+        while after and time.monotonic() < deadline and after.get('pipeline.queue_depth', {}).get('value'):
+            time.sleep(0.25)
+            after = self._fetch_metrics(base)
+        results['elapsed_with_drain'] = time.perf_counter() - results.pop('started')
+        results['mode'] = 'http'
+        results['url'] = base
+        # Without seeing the replies, the server's own pipeline histogram stands in for end to end
+        results['stages'] = self._stages(before, after) if before and after else {}
+        return results
+
+    def _fetch_metrics(self, base):
+        try:
+            with urllib.request.urlopen(base + METRICS_PATH, timeout=10) as response:
+                return json.load(response)
+        except (OSError, ValueError) as exc:
+            self.stderr.write(f'Could not read {base}{METRICS_PATH}: {exc}')
+            return None
+
+    # Driving the load
+
+    def _drive(self, conversations, rng, post):
+        """Fire every conversation's messages on schedule, keeping each patient's order.
+
+        Arrivals are open-loop: a conversation starts at its arrival time
+        whether or not earlier requests have finished. A patient's next
+        message is scheduled a random think time after the previous one
+        was acknowledged.
+        """
+        think_time = self.options['think_time']
+        ready = [(conversation.start, index) for index, conversation in enumerate(conversations)]
+        heapq.heapify(ready)
+        condition = threading.Condition()
+        in_flight = [0]
+        webhook = defaultdict(list)
+        errors = defaultdict(int)
+        lag = []
+
+        def fire(index, due, epoch):
+            conversation = conversations[index]
+            body = conversation.messages[conversation.next]
+            lag.append(time.perf_counter() - epoch - due)
+            started = time.perf_counter()
+            try:
+                status = post(conversation, body)
+            except Exception as exc:
+                status = type(exc).__name__
+            webhook[conversation.script].append(time.perf_counter() - started)
+            if status != 200:
+                errors[str(status)] += 1
+            conversation.next += 1
+            with condition:
+                in_flight[0] -= 1
+                if conversation.next < len(conversation.messages):
+                    pause = rng.expovariate(1 / think_time) if think_time else 0.0
+                    heapq.heappush(ready, (time.perf_counter() - epoch + pause, index))
+                condition.notify()
+
+        epoch = time.perf_counter()
+        with ThreadPoolExecutor(self.options['concurrency']) as executor:
+            with condition:
+                while ready or in_flight[0]:
+                    if not ready:
+                        condition.wait()
+                        continue
+                    due, index = ready[0]
+                    wait = due - (time.perf_counter() - epoch)
+                    if wait > 0:
+                        condition.wait(wait)
+                        continue
+                    heapq.heappop(ready)
+                    in_flight[0] += 1
+                    executor.submit(fire, index, due, epoch)
+        elapsed = time.perf_counter() - epoch
+
+        sent = sum(len(values) for values in webhook.values())
+        return {
+            'config': {key: self.options[key] for key in (
+                'rate', 'duration', 'think_time', 'mix', 'concurrency', 'seed',
+                'twilio_latency_ms', 'twilio_jitter_ms', 'twilio_failure_rate'
+            )},
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'conversations': len(conversations),
+            'messages': sent,
+            'errors': dict(errors),
+            'elapsed': elapsed,
+            'throughput': sent / elapsed if elapsed else 0.0,
+            'schedule_lag': summarize(lag),
+            'webhook': summarize([value for values in webhook.values() for value in values]),
+            'webhook_by_script': {script: summarize(values) for script, values in webhook.items()},
+            'started': epoch,
+        }
+
+    def _stages(self, before, after):
+        """Per-stage timings from the histograms that saw traffic during the run"""
+        stages = {}
+        for name, metric in after.items():
+            if metric.get('type') != 'histogram' or 'seconds' not in name:
+                continue
+            summary = histogram_delta(before.get(name), metric)
+            if summary is not None:
+                stages[name] = summary
+        return stages
+
+    # Reporting
+
+    def _report(self, results):
+        self.stdout.write(
+            f'{results["messages"]} messages in {results["elapsed"]:.1f}s '
+            f'({results["throughput"]:.1f} msg/s), errors {sum(results["errors"].values())}'
+        )
+        rows = [('webhook ack', results['webhook'])]
+        rows += [(f'  {script}', summary) for script, summary in sorted(results['webhook_by_script'].items())]
+        if 'end_to_end' in results:
+            rows.append(('end to end', results['end_to_end']))
+            rows += [(f'  {script}', summary) for script, summary in sorted(results['end_to_end_by_script'].items())]
+        rows.append(('schedule lag', results['schedule_lag']))
+        self.stdout.write(f'{"":<16}{"count":>7}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"max ms":>10}')
+        for label, summary in rows:
+            self.stdout.write(
+                f'{label:<16}{summary["count"]:>7}' +
+                ''.join(f'{summary[key] * 1000:>10.1f}' for key in ('p50', 'p95', 'p99', 'max'))
+            )
+        if results.get('unanswered'):
+            self.stdout.write(self.style.WARNING(f'{results["unanswered"]} message(s) got no reply in time'))
+
+        self.stdout.write('Stages (bucketed, upper bounds):')
+        for name, summary in sorted(results['stages'].items()):
+            quantiles = ' '.join(
+                f'{key}={"inf" if summary[key] is None else format(summary[key] * 1000, ".0f")}ms'
+                for key in ('p50', 'p95', 'p99')
+            )
+            self.stdout.write(f'  {name:<40}{summary["count"]:>7}  mean={summary["mean"] * 1000:.1f}ms {quantiles}')
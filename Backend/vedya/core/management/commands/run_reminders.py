@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vedya.core.reminders import start_reminder_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Run the appointment reminder scheduler; run exactly one of these per deployment'
+
+    def handle(self, *args, **options):
+        scheduler = start_reminder_scheduler()
+        self.stdout.write(
+            f'Loaded {len(scheduler.wheel)} reminders due before {scheduler.loaded_until:%Y-%m-%d %H:%M}'
+        )
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            scheduler.stop()
@@ -0,0 +1,117 @@
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from vedya.core.booking import SlotUnavailable, book, book_many
+from vedya.core.models import Appointment, Doctor, Patient
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent bookings at a few popular slots and verify no doctor is double-booked'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=500, help='Concurrent booking attempts')
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--doctors', type=int, default=4)
+        parser.add_argument('--slots', type=int, default=20, help='Distinct start times per doctor to fight over')
+        parser.add_argument('--camp', type=int, default=1000, help='Bookings submitted through book_many afterwards')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic doctors, patients and appointments')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        doctors, patients = self._create_fixtures(tag, options['doctors'], options['threads'])
+        try:
+            self._stress(doctors, patients, options)
+            if options['camp']:
+                self._camp(doctors, patients, options['camp'])
+            self._verify(doctors)
+        finally:
+            if not options['keep']:
+                User.objects.filter(username__startswith=f'stress-{tag}-').delete()
+                Patient.objects.filter(whatsapp_number__startswith=f'+{tag}').delete()
+
+    def _create_fixtures(self, tag, doctor_count, patient_count):
+        doctors = []
+        for number in range(doctor_count):
+            user = User.objects.create(username=f'stress-{tag}-{number}')
+            doctors.append(Doctor.objects.create(
+                user=user,
+                specialization='General Physician',
+                license_number=f'STRESS-{tag}-{number}',
+                phone_number='0',
+                location='Stress Test'
+            ).id)
+        patients = [
+            Patient.objects.create(whatsapp_number=f'+{tag}{number:04d}', full_name=f'Stress {number}').id
+            for number in range(patient_count)
+        ]
+        return doctors, patients
+
+    def _stress(self, doctors, patients, options):
+        rng = random.Random(7)
+        base = timezone.now().replace(second=0, microsecond=0) + timedelta(days=30)
+        # Overlapping 30 minute slots every 15 minutes maximise contention
+        starts = [base + timedelta(minutes=15 * slot) for slot in range(options['slots'])]
+        attempts = [(rng.choice(patients), rng.choice(doctors), rng.choice(starts)) for _ in range(options['bookings'])]
+
+        def attempt(args):
+            patient_id, doctor_id, start = args
+            try:
+                book(patient_id, doctor_id, start)
+                return True
+            except SlotUnavailable:
+                return False
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as pool:
+            outcomes = list(pool.map(attempt, attempts))
+        elapsed = time.perf_counter() - started
+        booked = sum(outcomes)
+        self.stdout.write(
+            f'{len(attempts)} concurrent attempts on {connection.vendor} with {options["threads"]} threads: '
+            f'{booked} booked, {len(attempts) - booked} rejected as conflicts in {elapsed:.2f}s '
+            f'({len(attempts) / elapsed:.0f} attempts/s)'
+        )
+
+    def _camp(self, doctors, patients, count):
+        base = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=60)
+        requests = [
+            {
+                'patient_id': patients[number % len(patients)],
+                'doctor_id': doctors[number % len(doctors)],
+                # Every tenth request repeats the previous slot for that doctor
+                'start': base + timedelta(minutes=30 * (number // len(doctors) - (number % 10 == 9)))
+            }
+            for number in range(count)
+        ]
+        started = time.perf_counter()
+        booked, rejected = book_many(requests)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'book_many: {len(booked)} booked, {len(rejected)} rejected in {elapsed:.2f}s '
+            f'({count / elapsed:.0f} requests/s)'
+        )
+
+    def _verify(self, doctors):
+        conflicts = 0
+        rows = Appointment.objects.filter(
+            doctor_id__in=doctors, status__in=('scheduled', 'rescheduled')
+        ).order_by('doctor_id', 'scheduled_time').values_list('doctor_id', 'scheduled_time', 'end_time')
+        previous_doctor, previous_end = None, None
+        for doctor_id, start, end in rows:
+            if doctor_id == previous_doctor and start < previous_end:
+                conflicts += 1
+            if doctor_id != previous_doctor or end > previous_end:
+                previous_doctor, previous_end = doctor_id, end
+        if conflicts:
+            raise CommandError(f'Overlapping appointments: {conflicts}')
+        self.stdout.write(self.style.SUCCESS('Overlapping appointments: 0'))
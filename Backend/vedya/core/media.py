@@ -0,0 +1,254 @@
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.utils.metrics import registry
+
+from .transcribers import run_transcriber
+
+logger = logging.getLogger(__name__)
+
+downloads = registry.counter('media.downloads')
+download_failures = registry.counter('media.download_failures')
+download_bytes = registry.counter('media.bytes')
+download_seconds = registry.histogram('media.download_seconds')
+transcribe_seconds = registry.histogram('media.transcribe_seconds')
+transcribe_failures = registry.counter('media.transcribe_failures')
+in_flight = registry.gauge('media.in_flight')
+
+# What the agent sees in place of media it cannot read
+IMAGE_TEXT = '[Patient sent an image]'
+UNTRANSCRIBED_TEXT = '[Patient sent a voice note that could not be transcribed]'
+FAILED_TEXT = '[Patient sent media that could not be downloaded]'
+
+
+class MediaTooLarge(Exception):
+    pass
+
+
+class MediaFile:
+    """A downloaded media item on local disk.
+
+    Whoever holds it owns the file: close() deletes it, and so does
+    leaving a with block over it.
+    """
+    __slots__ = ('path', 'content_type', 'size')
+
+    def __init__(self, path, content_type, size):
+        self.path = path
+        self.content_type = content_type
+        self.size = size
+
+    @property
+    def is_audio(self):
+        return self.content_type.startswith('audio/')
+
+    def close(self):
+        """Delete the file; safe to call more than once"""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MediaResult:
+    """Outcome of ingesting one inbound media item"""
+    __slots__ = ('content_type', 'transcript', 'error')
+
+    def __init__(self, content_type=None, transcript=None, error=None):
+        self.content_type = content_type
+        self.transcript = transcript
+        self.error = error
+
+    @property
+    def text(self):
+        """The text handed to the agent for this media item"""
+        if self.transcript:
+            return self.transcript
+        if self.error is not None and self.content_type is None:
+            return FAILED_TEXT
+        if self.content_type and self.content_type.startswith('image/'):
+            return IMAGE_TEXT
+        return UNTRANSCRIBED_TEXT
+
+
+def download_media(url, session=None, dest_dir=None, chunk_bytes=None, max_bytes=None, timeout=None, auth=None):
+    """Stream url into a new file under dest_dir and return it as a MediaFile.
+
+    At most chunk_bytes of the body is held in memory at a time. Media over
+    max_bytes raises MediaTooLarge, whether announced by Content-Length or
+    found while reading; the partial file is removed on any failure.
+    """
+    session = session or requests
+    dest_dir = dest_dir or settings.MEDIA_DOWNLOAD_DIR
+    chunk_bytes = chunk_bytes or settings.MEDIA_CHUNK_BYTES
+    max_bytes = max_bytes or settings.MEDIA_MAX_BYTES
+    os.makedirs(dest_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    with session.get(url, stream=True, timeout=timeout or settings.MEDIA_DOWNLOAD_TIMEOUT_SECONDS, auth=auth) as response:
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', 'application/octet-stream').split(';')[0].strip()
+        if int(response.headers.get('Content-Length') or 0) > max_bytes:
+            raise MediaTooLarge(f'{url} is over {max_bytes} bytes')
+        fd, path = tempfile.mkstemp(dir=dest_dir, prefix='media-')
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for chunk in response.iter_content(chunk_bytes):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise MediaTooLarge(f'{url} is over {max_bytes} bytes')
+                    handle.write(chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+    downloads.inc()
+    download_bytes.inc(size)
+    download_seconds.observe(time.perf_counter() - started)
+    return MediaFile(path, content_type, size)
+
+
+class MediaPipeline:
+    """Downloads and transcribes inbound media away from the webhook and agent workers.
+
+    submit() starts the download at once and returns a Future of a
+    MediaResult. Downloads run on download_workers threads, which is the
+    limit on concurrent downloads; audio then goes to the transcriber, a
+    dotted path to transcribe(path, content_type) -> str, in a pool of
+    separate processes so CPU-bound speech recognition never holds the GIL
+    of the serving process. Downloaded files are deleted once processed.
+    """
+
+    def __init__(self, download_workers=None, transcriber=None, processes=None, dest_dir=None,
+                 chunk_bytes=None, max_bytes=None):
+        self.download_workers = download_workers or settings.MEDIA_DOWNLOAD_CONCURRENCY
+        self.transcriber = settings.MEDIA_TRANSCRIBER if transcriber is None else transcriber
+        self.processes = processes or settings.MEDIA_TRANSCRIBE_PROCESSES
+        self.dest_dir = dest_dir or settings.MEDIA_DOWNLOAD_DIR
+        self.chunk_bytes = chunk_bytes or settings.MEDIA_CHUNK_BYTES
+        self.max_bytes = max_bytes or settings.MEDIA_MAX_BYTES
+        self.session = requests.Session()
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=self.download_workers))
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=self.download_workers))
+        self._downloads = ThreadPoolExecutor(self.download_workers, thread_name_prefix='media')
+        self._transcriptions = None
+        self._lock = threading.Lock()
+
+    def submit(self, url, content_type=None):
+        """Ingest a media URL in the background; returns a Future of its MediaResult"""
+        result = Future()
+        in_flight.inc()
+        result.add_done_callback(lambda _: in_flight.dec())
+        self._downloads.submit(self._ingest, url, content_type, result)
+        return result
+
+    def download(self, url):
+        """Download under the pipeline's concurrency limit and return the MediaFile; the caller closes it"""
+        return self._downloads.submit(self._download, url).result()
+
+    def _download(self, url):
+        # Twilio serves media only to the account; the credentials are dropped if it redirects elsewhere
+        auth = None
+        if (urlparse(url).hostname or '').endswith('.twilio.com') and settings.TWILIO_ACCOUNT_SID:
+            auth = (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        return download_media(
+            url, self.session, self.dest_dir, self.chunk_bytes, self.max_bytes, auth=auth
+        )
+
+    def _ingest(self, url, content_type, result):
+        try:
+            media = self._download(url)
+        except Exception as exc:
+            download_failures.inc()
+            logger.warning('Could not download media %s: %s', url, exc)
+            result.set_result(MediaResult(error=exc))
+            return
+        if content_type and media.content_type == 'application/octet-stream':
+            # Fall back to the type Twilio reported in the webhook
+            media.content_type = content_type
+        if not (media.is_audio and self.transcriber):
+            media.close()
+            result.set_result(MediaResult(media.content_type))
+            return
+        # Hand off to the process pool so this download slot is free while the audio is transcribed
+        try:
+            future = self._pool().submit(run_transcriber, self.transcriber, media.path, media.content_type)
+        except Exception as exc:
+            media.close()
+            transcribe_failures.inc()
+            result.set_result(MediaResult(media.content_type, error=exc))
+            return
+        future.add_done_callback(lambda done: self._transcribed(media, done, result))
+
+    def _transcribed(self, media, done, result):
+        media.close()
+        try:
+            text, seconds = done.result()
+        except Exception as exc:
+            transcribe_failures.inc()
+            logger.warning('Could not transcribe %s: %s', media.content_type, exc)
+            result.set_result(MediaResult(media.content_type, error=exc))
+            return
+        transcribe_seconds.observe(seconds)
+        result.set_result(MediaResult(media.content_type, (text or '').strip()))
+
+    def _pool(self):
+        with self._lock:
+            if self._transcriptions is None:
+                # Spawned rather than forked: the serving process has threads and open sockets
+                self._transcriptions = ProcessPoolExecutor(
+                    self.processes, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._transcriptions
+
+    def close(self):
+        """Finish queued media and stop the download threads and transcription processes"""
+        self._downloads.shutdown(wait=True)
+        with self._lock:
+            if self._transcriptions is not None:
+                self._transcriptions.shutdown(wait=True)
+                self._transcriptions = None
+        self.session.close()
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_media_pipeline():
+    """Return the process-wide media pipeline"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = MediaPipeline()
+        return _pipeline
+
+
+def _reset_after_fork():
+    # Threads, pool processes and pooled sockets belong to the parent
+    global _pipeline, _pipeline_lock
+    _pipeline = None
+    _pipeline_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,114 @@
+import itertools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .transcribers import SCRIPT_MARKER
+
+
+class MediaServer:
+    """Local HTTP stand-in for Twilio media URLs, for tests and load runs.
+
+    add() serves bytes at a new URL on 127.0.0.1. Bodies are written in
+    chunk_bytes pieces, throttled to bytes_per_second when set, after
+    latency seconds, so downloads take realistic time without the
+    network. The peak number of concurrent requests is recorded to check
+    download concurrency limits.
+    """
+
+    def __init__(self, latency=0.0, bytes_per_second=None, chunk_bytes=65536):
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        self.chunk_bytes = chunk_bytes
+        self.requests = 0
+        self.active = 0
+        self.peak_active = 0
+        self._media = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def add(self, content, content_type):
+        """Serve content and return its URL"""
+        media_id = f'ME{next(self._ids):08d}'
+        with self._lock:
+            self._media[media_id] = (content, content_type)
+        return f'{self.base_url}/Media/{media_id}'
+
+    def add_voice_note(self, transcript, size=256 * 1024, content_type='audio/ogg'):
+        """Serve a synthetic voice note of size bytes that scripted_transcriber reads back as transcript"""
+        head = SCRIPT_MARKER + transcript.encode('utf-8') + b'\n'
+        return self.add(head + os.urandom(max(0, size - len(head))), content_type)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='media-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    media = server._media.get(self.path.rsplit('/', 1)[-1])
+                    server.requests += 1
+                    server.active += 1
+                    server.peak_active = max(server.peak_active, server.active)
+                self.counted = True
+                try:
+                    self._serve(media)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    self._done()
+
+            def _serve(self, media):
+                if server.latency:
+                    time.sleep(server.latency)
+                if media is None:
+                    self.send_error(404)
+                    return
+                content, content_type = media
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                view = memoryview(content)
+                for offset in range(0, len(view), server.chunk_bytes):
+                    chunk = view[offset:offset + server.chunk_bytes]
+                    if server.bytes_per_second:
+                        time.sleep(len(chunk) / server.bytes_per_second)
+                    if offset + server.chunk_bytes >= len(view):
+                        # Counted out before the client can see the end and send its next request
+                        self._done()
+                    self.wfile.write(chunk)
+
+            def _done(self):
+                if self.counted:
+                    self.counted = False
+                    with server._lock:
+                        server.active -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
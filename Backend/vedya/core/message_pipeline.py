@@ -0,0 +1,214 @@
+import atexit
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.db import close_old_connections
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.agents.patient_agent import PatientAgent
+from AI.models.llm_service import get_llm_service
+from AI.utils.metrics import registry
+
+from .conversation_store import create_memory_store
+from .dispatcher import ShardedDispatcher
+from .media import MediaResult, get_media_pipeline
+from .models import Conversation, Message, Patient
+from .streaming_delivery import deliver_stream
+from .twilio_service import TwilioService
+from .write_behind import create_message, flush_write_behind, get_write_behind, update_message
+
+logger = logging.getLogger(__name__)
+
+queue_depth = registry.gauge('pipeline.queue_depth')
+queue_wait = registry.histogram('pipeline.queue_wait_seconds')
+agent_latency = registry.histogram('pipeline.agent_seconds')
+end_to_end_latency = registry.histogram('pipeline.end_to_end_seconds')
+jobs_processed = registry.counter('pipeline.jobs_processed')
+jobs_failed = registry.counter('pipeline.jobs_failed')
+jobs_coalesced = registry.counter('pipeline.jobs_coalesced')
+
+
+class MessageJob:
+    """A recorded inbound WhatsApp message waiting for an agent reply"""
+    __slots__ = ('message', 'conversation_id', 'patient_id', 'sender', 'body', 'media_url', 'media_type',
+                 'media', 'enqueued_at')
+
+    def __init__(self, message, conversation_id, patient_id, sender, body, media_url=None, media_type=None):
+        self.message = message
+        self.conversation_id = conversation_id
+        self.patient_id = patient_id
+        self.sender = sender
+        self.body = body
+        self.media_url = media_url
+        self.media_type = media_type
+        self.media = None  # Future of the MediaResult, once ingestion has started
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def message_id(self):
+        return self.message.pk
+
+
+class MessagePipeline:
+    """Background workers that run the patient agent outside the webhook request.
+
+    Jobs are sharded by the sender's WhatsApp number, so one patient's
+    messages are answered in order against the same conversation while
+    other patients are served concurrently. A burst of messages from one
+    sender is answered in a single agent turn. Media is downloaded and
+    transcribed by the media pipeline from the moment a job is enqueued;
+    the turn waits for it and sees the transcript in place of the media.
+    """
+
+    def __init__(self, workers=None, agent_factory=None, twilio_factory=None, max_batch=None, media_pipeline=None):
+        if agent_factory is None:
+            # Workers share one memory store; a patient's turns always run on the same shard
+            memory_store = create_memory_store()
+            agent_factory = lambda: PatientAgent(get_llm_service(settings.LLAMA_MODEL_PATH), memory_store)
+        self.agent_factory = agent_factory
+        self.twilio_factory = twilio_factory or TwilioService
+        self.media_pipeline = media_pipeline
+        self.dispatcher = ShardedDispatcher(
+            self._handle,
+            workers=workers or settings.MESSAGE_PIPELINE_WORKERS,
+            max_batch=max_batch or settings.MESSAGE_PIPELINE_MAX_BATCH,
+            name='message-pipeline'
+        )
+        # Each shard thread builds its own agent and Twilio client on first use
+        self._local = threading.local()
+
+    def start(self):
+        self.dispatcher.start()
+
+    def stop(self, timeout=None):
+        """Answer everything still queued, stop the workers and write out buffered messages"""
+        self.dispatcher.stop(timeout)
+        flush_write_behind()
+
+    def enqueue(self, job):
+        """Hand a job to the worker owning its sender; never blocks the caller"""
+        queue_depth.inc()
+        if job.media_url and job.media is None:
+            job.media = (self.media_pipeline or get_media_pipeline()).submit(job.media_url, job.media_type)
+        try:
+            self.dispatcher.submit(job.sender, job)
+        except RuntimeError:
+            # Stopped; the caller has to answer the message some other way
+            queue_depth.dec()
+            raise
+
+    def _resources(self):
+        if not hasattr(self._local, 'resources'):
+            self._local.resources = (self.agent_factory(), self.twilio_factory())
+        return self._local.resources
+
+    def _handle(self, sender, jobs):
+        queue_depth.dec(len(jobs))
+        now = time.monotonic()
+        for job in jobs:
+            queue_wait.observe(now - job.enqueued_at)
+        if len(jobs) > 1:
+            jobs_coalesced.inc(len(jobs) - 1)
+
+        agent, twilio = self._resources()
+        close_old_connections()
+        try:
+            self._process(agent, twilio, jobs)
+            jobs_processed.inc(len(jobs))
+        except Exception:
+            jobs_failed.inc(len(jobs))
+            logger.exception('Failed to process WhatsApp messages %s', [job.message_id for job in jobs])
+        finally:
+            close_old_connections()
+            now = time.monotonic()
+            for job in jobs:
+                end_to_end_latency.observe(now - job.enqueued_at)
+
+    def _process(self, agent, twilio, jobs):
+        """Run one agent turn for a sender's pending messages and deliver the reply"""
+        last = jobs[-1]
+        parts = []
+        for job in jobs:
+            if job.media is not None:
+                parts.append(self._media_text(job))
+            if job.body:
+                parts.append(job.body)
+        text = '\n'.join(parts)
+
+        with agent_latency.time():
+            if settings.WHATSAPP_STREAMING_REPLIES:
+                # Flush each complete sentence to the patient while the rest is generated
+                reply = deliver_stream(
+                    twilio,
+                    last.sender,
+                    agent.stream_message(last.patient_id, text, conversation_id=last.conversation_id),
+                    min_chars=settings.WHATSAPP_STREAMING_MIN_CHARS
+                )
+            else:
+                reply = agent.process_message(last.patient_id, text, conversation_id=last.conversation_id)
+                twilio.send_whatsapp_message(last.sender, reply)
+
+        create_message(
+            conversation_id=last.conversation_id,
+            sender='system',
+            content=reply
+        )
+
+    def _media_text(self, job):
+        """Wait for a job's media and return what the agent should read for it"""
+        try:
+            result = job.media.result(timeout=settings.MEDIA_TIMEOUT_SECONDS)
+        except FutureTimeout:
+            logger.warning('Media for message %s not ready after %ss', job.message_id, settings.MEDIA_TIMEOUT_SECONDS)
+            return MediaResult(job.media_type).text
+        if result.transcript and not job.body:
+            # Keep the transcript with the voice note so the conversation history reads in full
+            update_message(job.message, only_if_blank='content', content=result.transcript)
+        return result.text
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Return the process-wide message pipeline"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = MessagePipeline()
+            # atexit runs hooks in reverse order, so create the write-behind buffer
+            # first: queued jobs are then answered before its final flush
+            get_write_behind()
+            atexit.register(_pipeline.stop)
+        return _pipeline
+
+
+def record_inbound_message(sender, body, media_url=None, media_type=None):
+    """Record an inbound WhatsApp message and return the job that will answer it"""
+    # Twilio prefixes WhatsApp numbers with the channel name
+    whatsapp_number = sender.split(':', 1)[1] if sender.startswith('whatsapp:') else sender
+
+    patient, _ = Patient.objects.get_or_create(
+        whatsapp_number=whatsapp_number,
+        defaults={'full_name': whatsapp_number}
+    )
+    conversation = Conversation.objects.filter(patient=patient, active=True).order_by('-started_at').first()
+    if conversation is None:
+        conversation = Conversation.objects.create(patient=patient)
+
+    # Written before the webhook acknowledges it, never through the write-behind buffer
+    message = Message.objects.create(
+        conversation=conversation,
+        sender='patient',
+        content=body,
+        media_url=media_url
+    )
+    return MessageJob(message, conversation.id, patient.id, whatsapp_number, body, media_url, media_type)
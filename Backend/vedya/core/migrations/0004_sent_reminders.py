@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_reminder_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lead_minutes', models.PositiveIntegerField()),
+                ('scheduled_time', models.DateTimeField()),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sent_reminders', to='core.appointment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scheduled_time'], name='sent_reminder_time_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sentreminder',
+            constraint=models.UniqueConstraint(fields=('appointment', 'lead_minutes', 'scheduled_time'), name='sent_reminder_once'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+def move_memory_out_of_context(apps, schema_editor):
+    Conversation = apps.get_model('core', 'Conversation')
+    moved = []
+    for conversation in Conversation.objects.filter(context__has_key='memory').iterator(chunk_size=1000):
+        conversation.memory = conversation.context.pop('memory')
+        moved.append(conversation)
+    Conversation.objects.bulk_update(moved, ['memory', 'context'], batch_size=1000)
+
+
+def move_memory_into_context(apps, schema_editor):
+    Conversation = apps.get_model('core', 'Conversation')
+    moved = []
+    for conversation in Conversation.objects.filter(memory__isnull=False).iterator(chunk_size=1000):
+        conversation.context = {**conversation.context, 'memory': conversation.memory}
+        moved.append(conversation)
+    Conversation.objects.bulk_update(moved, ['context'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_sent_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='memory',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(move_memory_out_of_context, move_memory_into_context),
+    ]
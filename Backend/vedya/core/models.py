@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Doctor(models.Model):
     """Doctor model represents healthcare providers in the system"""
@@ -9,6 +10,8 @@ class Doctor(models.Model):
     experience_years = models.PositiveIntegerField(default=0)
     phone_number = models.CharField(max_length=20)
     location = models.CharField(max_length=255)
+    latitude = models.FloatField(null=True, blank=True)  # Practice coordinates for nearest-doctor search
+    longitude = models.FloatField(null=True, blank=True)
     availability = models.JSONField(default=dict)  # Store availability schedule as JSON
     whatsapp_enabled = models.BooleanField(default=False)  # Whether doctor uses WhatsApp interface
     
@@ -23,6 +26,8 @@ class Patient(models.Model):
     age = models.PositiveIntegerField(null=True, blank=True)
     gender = models.CharField(max_length=20, null=True, blank=True)
     location = models.CharField(max_length=255, null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     medical_history = models.JSONField(default=dict, blank=True)  # Store medical history as JSON
     
     def __str__(self):
@@ -47,15 +52,52 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # A doctor's schedule and the booking overlap check
+            models.Index(fields=['doctor', 'scheduled_time'], name='appointment_doctor_time_idx'),
+            # A patient's upcoming or past appointments by status
+            models.Index(fields=['patient', 'status'], name='appointment_patient_status_idx'),
+            # Reminder window loads and polling for changed appointments
+            models.Index(fields=['scheduled_time', 'status'], name='appointment_time_status_idx'),
+            models.Index(fields=['updated_at'], name='appointment_updated_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.patient} - {self.doctor} - {self.scheduled_time.strftime('%Y-%m-%d %H:%M')}"
 
+class SentReminder(models.Model):
+    """SentReminder records a reminder as sent, so restarts and overlapping schedulers never repeat it"""
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='sent_reminders')
+    lead_minutes = models.PositiveIntegerField()
+    scheduled_time = models.DateTimeField()  # The appointment time it was for; a rescheduled appointment is reminded again
+    sent_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['appointment', 'lead_minutes', 'scheduled_time'], name='sent_reminder_once'),
+        ]
+        indexes = [
+            # Reminders already sent in the window a restarted scheduler reloads
+            models.Index(fields=['scheduled_time'], name='sent_reminder_time_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Reminder {self.lead_minutes} min before appointment {self.appointment_id}"
+
 class Conversation(models.Model):
     """Conversation model stores message history for WhatsApp interactions"""
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='conversations')
     started_at = models.DateTimeField(auto_now_add=True)
     active = models.BooleanField(default=True)  # Whether conversation is ongoing
     context = models.JSONField(default=dict, blank=True)  # Store conversation context/state
+    memory = models.JSONField(null=True, blank=True)  # Agent memory; its own column, so saving it leaves context alone
+    
+    class Meta:
+        indexes = [
+            # The patient's latest active conversation, looked up on every message
+            models.Index(fields=['patient', 'active', '-started_at'], name='conversation_patient_idx'),
+        ]
     
     def __str__(self):
         return f"Conversation with {self.patient} started at {self.started_at.strftime('%Y-%m-%d %H:%M')}"
@@ -71,7 +113,14 @@ class Message(models.Model):
     sender = models.CharField(max_length=20, choices=SENDER_CHOICES)
     content = models.TextField()
     media_url = models.URLField(blank=True, null=True)  # For voice messages or images
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the message is received or queued, not when a batched insert writes it
+    timestamp = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            # A conversation's messages in order
+            models.Index(fields=['conversation', 'timestamp'], name='message_conversation_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sender} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
@@ -0,0 +1,249 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import ConnectTimeout
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+from urllib3.exceptions import ConnectTimeoutError
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+messages_sent = registry.counter('outbound.sent')
+messages_failed = registry.counter('outbound.failed')
+send_retries = registry.counter('outbound.retries')
+send_latency = registry.histogram('outbound.send_seconds')
+rate_limit_wait = registry.histogram('outbound.rate_limit_wait_seconds')
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available; returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def is_retryable(exc):
+    """Throttling, server errors and failures to connect are worth another attempt.
+
+    Sending is a non-idempotent POST: once the request may have reached
+    Twilio, a read timeout or a dropped connection can mean the message
+    was sent, so only errors raised before anything was sent are retried.
+    """
+    if isinstance(exc, TwilioRestException):
+        return exc.status == 429 or exc.status >= 500
+    if isinstance(exc, ConnectTimeout):
+        return True
+    if isinstance(exc, RequestsConnectionError):
+        # requests wraps urllib3's MaxRetryError; refused connections and DNS failures are NewConnectionError,
+        # a subclass of ConnectTimeoutError
+        reason = exc.args[0] if exc.args else None
+        return isinstance(getattr(reason, 'reason', reason), ConnectTimeoutError)
+    return isinstance(exc, ConnectionRefusedError)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class OutboundSender:
+    """Rate-limited, retrying front for a WhatsApp sending backend.
+
+    The backend is anything with send_whatsapp_message(to, body, media_url)
+    returning a message SID: the Twilio REST backend or TwilioMock. Every
+    attempt, retries included, takes a token from one shared bucket so the
+    process stays under the provider's messages-per-second limit. 429 and
+    5xx responses and connection failures are retried with exponential
+    backoff and full jitter, or after the Retry-After the backend reported
+    on the exception; a Retry-After beyond max_delay fails the send instead.
+    """
+
+    def __init__(self, backend, rate_per_second=None, burst=None, max_retries=4,
+                 base_delay=0.5, max_delay=30.0, workers=8):
+        self.backend = backend
+        self.bucket = TokenBucket(rate_per_second, burst) if rate_per_second else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.workers = workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def send(self, to_number, body, media_url=None):
+        """Send one message, retrying transient failures; returns its SID"""
+        attempt = 0
+        with send_latency.time():
+            while True:
+                if self.bucket is not None:
+                    rate_limit_wait.observe(self.bucket.acquire())
+                try:
+                    sid = self.backend.send_whatsapp_message(to_number, body, media_url)
+                except Exception as exc:
+                    retry_after = getattr(exc, 'retry_after', None)
+                    if (attempt >= self.max_retries or not is_retryable(exc)
+                            or (retry_after is not None and retry_after > self.max_delay)):
+                        messages_failed.inc()
+                        raise
+                    if retry_after is not None:
+                        delay = retry_after
+                    else:
+                        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                    logger.info('Retrying message to %s in %.2fs after %s', to_number, delay, exc)
+                    send_retries.inc()
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+                messages_sent.inc()
+                return sid
+
+    def send_many(self, messages):
+        """Send (to_number, body[, media_url]) tuples concurrently.
+
+        Returns one entry per message, in order: its SID, or the exception
+        that made it fail after retries.
+        """
+        def send_one(message):
+            try:
+                return self.send(*message)
+            except Exception as exc:
+                return exc
+
+        return list(self._pool().map(send_one, messages))
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='outbound')
+            return self._executor
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+class _ResponseHttpClient(TwilioHttpClient):
+    """TwilioHttpClient that keeps each thread's last response, whose headers the error lacks"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._local = threading.local()
+
+    def request(self, *args, **kwargs):
+        self._local.response = None
+        self._local.response = super().request(*args, **kwargs)
+        return self._local.response
+
+    def last_response(self):
+        return getattr(self._local, 'response', None)
+
+
+class TwilioRestBackend:
+    """Sends through the Twilio REST API over one pooled HTTP session"""
+
+    def __init__(self, account_sid, auth_token, from_number, timeout=10):
+        from twilio.rest import Client
+
+        # Retries are handled by OutboundSender, so the HTTP client makes a single attempt
+        self.http_client = _ResponseHttpClient(pool_connections=True, timeout=timeout)
+        self.client = Client(account_sid, auth_token, http_client=self.http_client)
+        self.from_number = f'whatsapp:{from_number}'
+
+    def send_whatsapp_message(self, to_number, message, media_url=None):
+        if not to_number.startswith('whatsapp:'):
+            to_number = f'whatsapp:{to_number}'
+        params = {'body': message, 'from_': self.from_number, 'to': to_number}
+        if media_url:
+            params['media_url'] = [media_url]
+        try:
+            return self.client.messages.create(**params).sid
+        except TwilioRestException as exc:
+            response = self.http_client.last_response()
+            if response is not None:
+                exc.retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            raise
+
+
+def create_backend():
+    """The sending backend selected by TWILIO_BACKEND"""
+    if settings.TWILIO_BACKEND == 'mock':
+        from .twilio_mock import TwilioMock
+
+        return TwilioMock(
+            latency=settings.TWILIO_MOCK_LATENCY_MS / 1000,
+            jitter=settings.TWILIO_MOCK_JITTER_MS / 1000,
+            failure_rate=settings.TWILIO_MOCK_FAILURE_RATE
+        )
+    return TwilioRestBackend(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER)
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_outbound_sender():
+    """Return the process-wide sender, so every caller shares its pool and rate limit"""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = OutboundSender(
+                create_backend(),
+                rate_per_second=settings.TWILIO_RATE_LIMIT_PER_SECOND,
+                burst=settings.TWILIO_RATE_LIMIT_BURST,
+                max_retries=settings.TWILIO_MAX_RETRIES,
+                workers=settings.TWILIO_SEND_WORKERS
+            )
+        return _sender
+
+
+def _reset_after_fork():
+    # The executor's threads and the HTTP session's sockets are not safe to share with a forked child
+    global _sender, _sender_lock
+    _sender = None
+    _sender_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,55 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(settings.PROVIDER_THREADS, thread_name_prefix='provider')
+        return _pool
+
+
+def _call(method, *args, **kwargs):
+    try:
+        return method(*args, **kwargs)
+    finally:
+        # Pool threads outlive requests, so apply the request-end connection policy here
+        close_old_connections()
+
+
+def in_worker_thread(method):
+    """Async twin of a blocking provider method for the tools' _arun.
+
+    The call runs on a shared pool whose threads each hold their own
+    database connection, so concurrent tool calls from one agent turn
+    query in parallel. Django's async ORM would not help here: it runs
+    every query on one shared thread, so independent lookups would still
+    wait for each other. The pool outlives event loops, which matters
+    because agents in sync workers run each turn under asyncio.run().
+    """
+    @functools.wraps(method)
+    async def run(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), functools.partial(_call, method, self, *args, **kwargs))
+    return run
+
+
+def _reset_after_fork():
+    # Pool threads do not survive fork(); the child starts its own on first use
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
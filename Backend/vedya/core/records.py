@@ -0,0 +1,270 @@
+import os
+import sys
+import threading
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.utils.lru import ReadThroughCache
+
+from .availability import ACTIVE_STATUSES, format_slot
+from .models import Appointment, Doctor, Patient
+from .provider_threads import in_worker_thread
+
+# Days shown by a doctor's schedule when no date is given
+SCHEDULE_DAYS = 7
+RECENT_APPOINTMENTS = 10
+UPCOMING_APPOINTMENTS = 20
+PROFILE_FIELDS = {'name': 'full_name', 'full_name': 'full_name', 'age': 'age', 'gender': 'gender',
+                  'location': 'location', 'medical_history': 'medical_history'}
+
+# Invalidation tags. An entry is tagged with every row it was built from:
+#   ('patient', id)               a patient's profile fields
+#   ('patient_number', number)    the patient with a WhatsApp number
+#   ('patient_appointments', id)  the set of a patient's appointments
+#   ('patient_upcoming', id)      a patient's upcoming appointments list, dropped once it runs short
+#   ('doctor', id)                a doctor's profile and availability
+#   ('doctor_day', id, date)      the set of a doctor's appointments on a day
+#   ('appointment', id)           one appointment's fields
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_record_cache():
+    """Return the process-wide record cache, or None when RECORD_CACHE_MAX_ENTRIES is 0"""
+    global _cache
+    if settings.RECORD_CACHE_MAX_ENTRIES <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReadThroughCache(
+                settings.RECORD_CACHE_MAX_ENTRIES,
+                ttl=settings.RECORD_CACHE_TTL_SECONDS,
+                name='records.cache'
+            )
+        return _cache
+
+
+def loaded_record_cache():
+    """Return the cache if this process has created it, for invalidation"""
+    return _cache
+
+
+def _cached(key, loader):
+    cache = get_record_cache()
+    if cache is None:
+        return loader()[0]
+    return cache.get_or_load(key, loader)
+
+
+def invalidate(*tags):
+    cache = loaded_record_cache()
+    if cache is not None:
+        cache.invalidate(*tags)
+        if connection.in_atomic_block:
+            # Another thread may have re-cached the old rows before the commit; drop them again after it
+            transaction.on_commit(lambda: cache.invalidate(*tags))
+
+
+def invalidate_appointment(appointment):
+    """Drop entries showing the appointment, or that it now belongs in"""
+    day = timezone.localtime(appointment.scheduled_time).date()
+    invalidate(
+        ('appointment', appointment.id),
+        ('doctor_day', appointment.doctor_id, day),
+        ('patient_appointments', appointment.patient_id)
+    )
+
+
+def _profile(patient):
+    return {
+        "id": str(patient.id),
+        "name": patient.full_name,
+        "whatsapp_number": patient.whatsapp_number,
+        "age": patient.age,
+        "gender": patient.gender,
+        "location": patient.location,
+        "medical_history": patient.medical_history
+    }
+
+
+class PatientRecordsProvider:
+    """Serves the patient profile and history tools, through the record cache"""
+
+    def profile(self, patient_id=None, whatsapp_number=None):
+        if patient_id:
+            key = ('profile', int(patient_id))
+            lookup = {'id': int(patient_id)}
+        else:
+            key = ('profile_number', whatsapp_number)
+            lookup = {'whatsapp_number': whatsapp_number}
+
+        def load():
+            patient = Patient.objects.filter(**lookup).first()
+            if patient is None:
+                # Creating the patient invalidates the miss
+                return {"error": "Patient not found"}, [('patient', lookup.get('id')), ('patient_number', whatsapp_number)]
+            return _profile(patient), [('patient', patient.id), ('patient_number', patient.whatsapp_number)]
+        return _cached(key, load)
+
+    def history(self, patient_id):
+        patient_id = int(patient_id)
+
+        def load():
+            patient = Patient.objects.filter(id=patient_id).first()
+            if patient is None:
+                return {"error": f"Patient {patient_id} not found"}, [('patient', patient_id)]
+            appointments = list(
+                Appointment.objects.filter(patient_id=patient_id)
+                .select_related('doctor__user').order_by('-scheduled_time')[:RECENT_APPOINTMENTS]
+            )
+            tags = [('patient', patient_id), ('patient_appointments', patient_id)]
+            tags += [('appointment', appointment.id) for appointment in appointments]
+            tags += [('doctor', appointment.doctor_id) for appointment in appointments]
+            return {
+                "patient_id": str(patient_id),
+                "name": patient.full_name,
+                "age": patient.age,
+                "gender": patient.gender,
+                "medical_history": patient.medical_history,
+                "recent_appointments": [
+                    {
+                        "appointment_id": str(appointment.id),
+                        "date": format_slot(appointment.scheduled_time),
+                        "doctor": f"Dr. {appointment.doctor.user.get_full_name()}",
+                        "reason": appointment.symptoms,
+                        "notes": appointment.notes,
+                        "status": appointment.status
+                    }
+                    for appointment in appointments
+                ]
+            }, tags
+        return _cached(('history', patient_id), load)
+
+    def appointments(self, patient_id):
+        """The patient's upcoming scheduled appointments"""
+        patient_id = int(patient_id)
+
+        def load():
+            appointments = list(
+                Appointment.objects.filter(
+                    patient_id=patient_id,
+                    status__in=ACTIVE_STATUSES,
+                    scheduled_time__gte=timezone.now()
+                ).select_related('doctor__user').order_by('scheduled_time')[:UPCOMING_APPOINTMENTS]
+            )
+            tags = [('patient_appointments', patient_id), ('patient_upcoming', patient_id)]
+            tags += [('appointment', appointment.id) for appointment in appointments]
+            tags += [('doctor', appointment.doctor_id) for appointment in appointments]
+            return [
+                (appointment.scheduled_time, {
+                    "id": str(appointment.id),
+                    "doctor": f"Dr. {appointment.doctor.user.get_full_name()}",
+                    "doctor_id": str(appointment.doctor_id),
+                    "time": format_slot(appointment.scheduled_time),
+                    "status": appointment.status
+                })
+                for appointment in appointments
+            ], tags
+
+        # Appointments that have started since the list was cached are left out here
+        now = timezone.now()
+        loaded = _cached(('appointments', patient_id), load)
+        upcoming = [row for start, row in loaded if start >= now]
+        if len(loaded) == UPCOMING_APPOINTMENTS and len(upcoming) < len(loaded):
+            # The list was cut off at the limit, so the appointments after it have to be read
+            invalidate(('patient_upcoming', patient_id))
+            upcoming = [row for start, row in _cached(('appointments', patient_id), load) if start >= now]
+        return upcoming
+
+    def update_profile(self, patient_id, updates):
+        fields = {PROFILE_FIELDS[name]: value for name, value in updates.items() if name in PROFILE_FIELDS}
+        ignored = sorted(name for name in updates if name not in PROFILE_FIELDS)
+        patient = Patient.objects.filter(id=int(patient_id)).first()
+        if patient is None:
+            return {"error": f"Patient {patient_id} not found"}
+        for field, value in fields.items():
+            setattr(patient, field, value)
+        if fields:
+            # post_save invalidates the cached profile and history
+            patient.save(update_fields=list(fields))
+        return {
+            "success": True,
+            "patient_id": str(patient_id),
+            "updated_fields": [name for name in updates if name in PROFILE_FIELDS],
+            "ignored_fields": ignored
+        }
+
+    aprofile = in_worker_thread(profile)
+    ahistory = in_worker_thread(history)
+    aappointments = in_worker_thread(appointments)
+    aupdate_profile = in_worker_thread(update_profile)
+
+
+class ScheduleProvider:
+    """Serves the doctor schedule and appointment notes tools, through the record cache"""
+
+    def schedule(self, doctor_id, day=None):
+        doctor_id = int(doctor_id)
+        if day:
+            first = date.fromisoformat(str(day)[:10])
+            days = 1
+        else:
+            first = timezone.localdate()
+            days = SCHEDULE_DAYS
+
+        def load():
+            doctor = Doctor.objects.filter(id=doctor_id).select_related('user').first()
+            if doctor is None:
+                return {"error": f"Doctor {doctor_id} not found"}, [('doctor', doctor_id)]
+            start = timezone.make_aware(datetime.combine(first, time.min))
+            appointments = list(
+                Appointment.objects.filter(
+                    doctor_id=doctor_id,
+                    scheduled_time__gte=start,
+                    scheduled_time__lt=start + timedelta(days=days)
+                ).select_related('patient').order_by('scheduled_time')
+            )
+            tags = [('doctor', doctor_id)]
+            tags += [('doctor_day', doctor_id, first + timedelta(days=offset)) for offset in range(days)]
+            tags += [('appointment', appointment.id) for appointment in appointments]
+            tags += [('patient', appointment.patient_id) for appointment in appointments]
+            return {
+                "doctor_id": str(doctor_id),
+                "doctor": f"Dr. {doctor.user.get_full_name()}",
+                "from": first.isoformat(),
+                "days": days,
+                "availability": doctor.availability,
+                "appointments": [
+                    {
+                        "appointment_id": str(appointment.id),
+                        "time": format_slot(appointment.scheduled_time),
+                        "patient": appointment.patient.full_name,
+                        "patient_id": str(appointment.patient_id),
+                        "reason": appointment.symptoms,
+                        "status": appointment.status
+                    }
+                    for appointment in appointments
+                ]
+            }, tags
+        return _cached(('schedule', doctor_id, first, days), load)
+
+    def add_notes(self, appointment_id, notes):
+        with transaction.atomic():
+            appointment = Appointment.objects.select_for_update().filter(id=int(appointment_id)).first()
+            if appointment is None:
+                return {"error": f"Appointment {appointment_id} not found"}
+            appointment.notes = f"{appointment.notes}\n{notes}" if appointment.notes else notes
+            # post_save invalidates the schedules and history showing this appointment
+            appointment.save(update_fields=['notes', 'updated_at'])
+        return {"success": True, "appointment_id": str(appointment.id), "notes": appointment.notes}
+
+    aschedule = in_worker_thread(schedule)
+    aadd_notes = in_worker_thread(add_notes)
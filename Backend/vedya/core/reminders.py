@@ -0,0 +1,332 @@
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.utils.metrics import registry
+
+from .availability import ACTIVE_STATUSES, format_slot
+from .models import Appointment, SentReminder
+from .timer_wheel import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+# Keys pack (appointment_id, lead index); this many lead times at most
+MAX_LEADS = 8
+# Rows committed after a poll but stamped before it are still seen by the next one
+POLL_OVERLAP = timedelta(minutes=1)
+
+reminders_scheduled = registry.gauge('reminders.scheduled')
+reminders_sent = registry.counter('reminders.sent')
+reminders_failed = registry.counter('reminders.failed')
+reminders_retried = registry.counter('reminders.retried')
+reminders_stale = registry.counter('reminders.stale')
+reminder_lag = registry.histogram('reminders.lag_seconds')
+
+
+def _timestamp(moment):
+    return moment.timestamp()
+
+
+class ReminderScheduler:
+    """Sends WhatsApp reminders a fixed lead time before each appointment.
+
+    Only reminders due within a bounded window are held, in a timer wheel
+    keyed by (appointment, lead); the window is topped up from an indexed
+    scheduled_time range query as time passes. Bookings and reschedules
+    are added incrementally, from model signals in this process and by
+    polling updated_at for writes made by other processes. Wheel entries
+    are never updated in place: when a reminder fires, its appointment is
+    re-read and the reminder dropped if it was cancelled or moved.
+    Each reminder is recorded in SentReminder in the transaction that
+    claims it for sending, so a restart, which reloads the last grace
+    minutes, never sends it twice. A reminder whose send fails goes back
+    in the wheel after retry_seconds, doubling each time, for as long as
+    it is within the grace period.
+    """
+
+    def __init__(self, twilio=None, lead_minutes=None, window_hours=None, grace_minutes=None,
+                 poll_seconds=None, batch_size=None, tick_seconds=1.0, retry_seconds=None):
+        lead_minutes = lead_minutes if lead_minutes is not None else settings.REMINDER_LEAD_MINUTES
+        if len(lead_minutes) > MAX_LEADS:
+            raise ValueError(f'At most {MAX_LEADS} reminder lead times are supported')
+        self.twilio = twilio
+        self.lead_minutes = list(lead_minutes)
+        self.leads = [timedelta(minutes=minutes) for minutes in lead_minutes]
+        self.window = timedelta(hours=window_hours or settings.REMINDER_WINDOW_HOURS)
+        self.grace = timedelta(minutes=grace_minutes if grace_minutes is not None else settings.REMINDER_GRACE_MINUTES)
+        self.poll_seconds = poll_seconds or settings.REMINDER_POLL_SECONDS
+        self.batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+        self.tick_seconds = tick_seconds
+        self.retry_seconds = retry_seconds or settings.REMINDER_RETRY_SECONDS
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.wheel = None
+        self.overdue = set()
+        self.loaded_until = None  # Reminders due before this are in the wheel
+        self.polled_at = None
+        self._polled = {}  # appointment id -> updated_at seen by the last poll, within the overlap
+        self._retries = {}  # key -> failed sends so far, for reminders waiting to be retried
+
+    # Loading
+
+    def rebuild(self):
+        """Reload the wheel from the database, e.g. after a restart"""
+        now = timezone.now()
+        with self._lock:
+            self.wheel = TimerWheel(_timestamp(now), self.tick_seconds)
+            self.overdue = set()
+            self.loaded_until = now - self.grace
+            self.polled_at = now
+            self._polled = {}
+            self._retries = {}
+        self._load_until(now + self.window)
+
+    def _load_until(self, until):
+        """Add reminders due in [loaded_until, until) with one indexed range query"""
+        start = self.loaded_until
+        scheduled = {'scheduled_time__gte': start + min(self.leads), 'scheduled_time__lt': until + max(self.leads)}
+        rows = Appointment.objects.filter(status__in=ACTIVE_STATUSES, **scheduled).values_list('id', 'scheduled_time')
+        # Reminders a previous run already sent, within the grace period reloaded on restart
+        sent = set(SentReminder.objects.filter(**scheduled).values_list('appointment_id', 'lead_minutes', 'scheduled_time'))
+        added = 0
+        for appointment_id, scheduled_time in rows.iterator(chunk_size=5000):
+            added += self._add(appointment_id, scheduled_time, start, until, sent)
+        with self._lock:
+            self.loaded_until = until
+        reminders_scheduled.set(len(self.wheel))
+        return added
+
+    def _add(self, appointment_id, scheduled_time, start, until, sent=()):
+        added = 0
+        with self._lock:
+            # Anything before the next tick cannot go in the wheel
+            next_tick = self.wheel.tick_time(self.wheel.current + 1)
+            for index, lead in enumerate(self.leads):
+                fire_at = scheduled_time - lead
+                if start <= fire_at < until and (appointment_id, self.lead_minutes[index], scheduled_time) not in sent:
+                    key = appointment_id * MAX_LEADS + index
+                    if _timestamp(fire_at) < next_tick:
+                        self.overdue.add(key)  # Missed while down, or booked late; sent on the next tick
+                    else:
+                        self.wheel.add(key, _timestamp(fire_at))
+                    added += 1
+        return added
+
+    def schedule_appointment(self, appointment):
+        """Add an appointment's reminders if they fall in the loaded window"""
+        if self.wheel is None or appointment.status not in ACTIVE_STATUSES:
+            return  # Cancelled reminders are dropped when they come due
+        self._add(appointment.id, appointment.scheduled_time, timezone.now() - self.grace, self.loaded_until)
+
+    def poll_changes(self):
+        """Pick up appointments booked or moved by other processes since the last poll.
+
+        updated_at is stamped before its transaction commits, so each poll
+        reaches POLL_OVERLAP back; rows already seen at the same updated_at
+        are skipped, and a duplicate that does get through is sent once.
+        """
+        now = timezone.now()
+        changed = Appointment.objects.filter(
+            updated_at__gte=self.polled_at - POLL_OVERLAP,
+            status__in=ACTIVE_STATUSES
+        ).values_list('id', 'scheduled_time', 'updated_at')
+        start = now - self.grace
+        polled = {}
+        for appointment_id, scheduled_time, updated_at in changed.iterator(chunk_size=5000):
+            polled[appointment_id] = updated_at
+            if self._polled.get(appointment_id) != updated_at:
+                self._add(appointment_id, scheduled_time, start, self.loaded_until)
+        self._polled = polled
+        self.polled_at = now
+
+    # Firing
+
+    def run_once(self, now=None):
+        """Send every reminder that has come due; returns how many were sent"""
+        now = now or timezone.now()
+        with self._lock:
+            due = self.wheel.advance(_timestamp(now))
+            # Overdue reminders have no wheel tick to check against
+            due.extend((key, None) for key in self.overdue)
+            self.overdue = set()
+        sent = 0
+        for start in range(0, len(due), self.batch_size):
+            sent += self._send(due[start:start + self.batch_size], now)
+        reminders_scheduled.set(len(self.wheel))
+        return sent
+
+    def _send(self, due, now):
+        # A moved appointment can have several entries come due together; at most one is current
+        wanted = {}
+        for key, tick in due:
+            wanted.setdefault((key // MAX_LEADS, key % MAX_LEADS), set()).add(tick)
+        appointments = Appointment.objects.filter(
+            id__in={appointment_id for appointment_id, _ in wanted},
+            status__in=ACTIVE_STATUSES
+        ).select_related('patient', 'doctor__user').only(
+            'id', 'scheduled_time', 'status', 'patient__whatsapp_number',
+            'doctor__user__first_name', 'doctor__user__last_name'
+        ).in_bulk()
+
+        candidates = []
+        keys = {}
+        for (appointment_id, index), ticks in wanted.items():
+            key = appointment_id * MAX_LEADS + index
+            with self._lock:
+                retrying = key in self._retries
+            appointment = appointments.get(appointment_id)
+            if appointment is None or index >= len(self.leads):
+                reminders_stale.inc(len(ticks))
+                self._forget_retry(key)
+                continue
+            fire_at = appointment.scheduled_time - self.leads[index]
+            expected = int(_timestamp(fire_at) // self.tick_seconds)
+            # Overdue and retried reminders have no tick of their own to check against
+            current = expected in ticks or ((None in ticks or retrying) and now - self.grace <= fire_at <= now)
+            # Entries left behind by a reschedule
+            reminders_stale.inc(len(ticks) - current)
+            if not current:
+                self._forget_retry(key)
+                continue
+            reminder_lag.observe(max(0.0, (now - fire_at).total_seconds()))
+            candidates.append(SentReminder(
+                appointment=appointment, lead_minutes=self.lead_minutes[index],
+                scheduled_time=appointment.scheduled_time
+            ))
+            keys[appointment_id, self.lead_minutes[index]] = (key, fire_at)
+
+        claimed = self._claim(candidates)
+        claimed_ids = {id(reminder) for reminder in claimed}
+        for reminder in candidates:
+            if id(reminder) not in claimed_ids:
+                self._forget_retry(keys[reminder.appointment_id, reminder.lead_minutes][0])  # Already sent
+        if not claimed:
+            return 0
+        twilio = self.twilio or self._default_twilio()
+        results = twilio.send_many([
+            (reminder.appointment.patient.whatsapp_number, self._message(reminder.appointment))
+            for reminder in claimed
+        ])
+        failed = []
+        for reminder, result in zip(claimed, results):
+            if isinstance(result, Exception):
+                failed.append(reminder)
+            else:
+                self._forget_retry(keys[reminder.appointment_id, reminder.lead_minutes][0])
+        if failed:
+            # Unmark them, so a retry or a restart within the grace period tries again
+            unsent = Q()
+            for reminder in failed:
+                unsent |= Q(appointment_id=reminder.appointment_id, lead_minutes=reminder.lead_minutes,
+                            scheduled_time=reminder.scheduled_time)
+            SentReminder.objects.filter(unsent).delete()
+            for reminder in failed:
+                self._retry(*keys[reminder.appointment_id, reminder.lead_minutes], now)
+        reminders_sent.inc(len(results) - len(failed))
+        reminders_failed.inc(len(failed))
+        return len(results) - len(failed)
+
+    def _retry(self, key, fire_at, now):
+        """Put a reminder whose send failed back in the wheel, backing off while it is within the grace period"""
+        with self._lock:
+            attempts = self._retries.get(key, 0) + 1
+            retry_at = now + timedelta(seconds=self.retry_seconds * 2 ** (attempts - 1))
+            if retry_at > fire_at + self.grace:
+                self._retries.pop(key, None)
+                logger.warning('Giving up on reminder for appointment %s after %s failed sends',
+                               key // MAX_LEADS, attempts)
+                return
+            self._retries[key] = attempts
+            self.wheel.add(key, _timestamp(retry_at))
+        reminders_retried.inc()
+
+    def _forget_retry(self, key):
+        with self._lock:
+            self._retries.pop(key, None)
+
+    def _claim(self, candidates):
+        """Record reminders as sent, returning those no earlier run had already sent"""
+        if not candidates:
+            return []
+        with transaction.atomic():
+            sent = set(SentReminder.objects.filter(
+                appointment_id__in={reminder.appointment_id for reminder in candidates}
+            ).values_list('appointment_id', 'lead_minutes', 'scheduled_time'))
+            claimed = [
+                reminder for reminder in candidates
+                if (reminder.appointment_id, reminder.lead_minutes, reminder.scheduled_time) not in sent
+            ]
+            reminders_stale.inc(len(candidates) - len(claimed))
+            SentReminder.objects.bulk_create(claimed)
+        return claimed
+
+    def _message(self, appointment):
+        doctor = appointment.doctor.user.get_full_name()
+        return (
+            f"Reminder: you have an appointment with Dr. {doctor} at "
+            f"{format_slot(appointment.scheduled_time)}. Reply here if you need to reschedule or cancel."
+        )
+
+    def _default_twilio(self):
+        from .twilio_service import TwilioService
+
+        self.twilio = TwilioService()
+        return self.twilio
+
+    # Background loop
+
+    def start(self):
+        """Rebuild and run the scheduler on a background thread"""
+        self.rebuild()
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        last_poll = time.monotonic()
+        while not self._stop.wait(self.tick_seconds):
+            try:
+                self.run_once()
+                if time.monotonic() - last_poll >= self.poll_seconds:
+                    last_poll = time.monotonic()
+                    self.poll_changes()
+                    # Top the window back up once half of it has elapsed
+                    if self.loaded_until - timezone.now() < self.window / 2:
+                        self._load_until(timezone.now() + self.window)
+            except Exception:
+                logger.exception('Reminder scheduler iteration failed')
+            finally:
+                close_old_connections()
+
+
+_scheduler = None
+
+
+def start_reminder_scheduler(**kwargs):
+    """Start the process-wide scheduler; run it in exactly one process"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ReminderScheduler(**kwargs)
+        _scheduler.start()
+    return _scheduler
+
+
+def loaded_reminder_scheduler():
+    """Return the running scheduler, if this process has one, for incremental updates"""
+    return _scheduler
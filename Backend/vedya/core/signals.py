@@ -0,0 +1,58 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .availability import loaded_availability_engine
+from .doctor_index import loaded_doctor_index
+from .models import Appointment, Doctor, Patient
+from .records import invalidate, invalidate_appointment
+from .reminders import loaded_reminder_scheduler
+
+
+@receiver(post_save, sender=Doctor)
+def index_doctor(sender, instance, **kwargs):
+    """Keep the in-memory doctor index in sync with saved doctors"""
+    index = loaded_doctor_index()
+    if index is not None:
+        index.upsert_doctor(instance)
+    engine = loaded_availability_engine()
+    if engine is not None:
+        engine.set_availability(instance.id, instance.availability)
+    invalidate(('doctor', instance.id))
+
+
+@receiver(post_delete, sender=Doctor)
+def unindex_doctor(sender, instance, **kwargs):
+    index = loaded_doctor_index()
+    if index is not None:
+        index.remove(instance.id)
+    engine = loaded_availability_engine()
+    if engine is not None:
+        engine.remove_doctor(instance.id)
+    invalidate(('doctor', instance.id))
+
+
+@receiver(post_save, sender=Appointment)
+def sync_appointment_availability(sender, instance, **kwargs):
+    """Book, move or release the appointment's slots and schedule its reminders"""
+    engine = loaded_availability_engine()
+    if engine is not None:
+        engine.sync_appointment(instance)
+    scheduler = loaded_reminder_scheduler()
+    if scheduler is not None:
+        scheduler.schedule_appointment(instance)
+    invalidate_appointment(instance)
+
+
+@receiver(post_delete, sender=Appointment)
+def release_appointment_availability(sender, instance, **kwargs):
+    engine = loaded_availability_engine()
+    if engine is not None:
+        engine.release(instance.id)
+    invalidate_appointment(instance)
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def invalidate_patient_records(sender, instance, **kwargs):
+    """Drop cached profiles, histories and schedules showing the patient"""
+    invalidate(('patient', instance.id), ('patient_number', instance.whatsapp_number))
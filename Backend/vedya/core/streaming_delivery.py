@@ -0,0 +1,65 @@
+import re
+import time
+
+from AI.utils.metrics import registry
+
+first_chunk_latency = registry.histogram('delivery.first_chunk_seconds')
+chunks_sent = registry.counter('delivery.chunks_sent')
+
+# A sentence ends with terminal punctuation (including the Devanagari danda) followed by whitespace
+SENTENCE_END = re.compile(r'[.!?।]+["\')\]]*\s+|\n{2,}')
+
+
+class SentenceChunker:
+    """Groups streamed tokens into complete sentences or paragraphs.
+    
+    Chunks shorter than min_chars are held back and merged with the next
+    sentence so a reply is not split into many tiny WhatsApp messages.
+    """
+    
+    def __init__(self, min_chars=80):
+        self.min_chars = min_chars
+        self.buffer = ''
+    
+    def feed(self, token):
+        """Add a token and return any chunks that are now complete"""
+        self.buffer += token
+        chunks = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            if match.end() - start >= self.min_chars:
+                chunks.append(self.buffer[start:match.end()].strip())
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        return chunks
+    
+    def flush(self):
+        """Return whatever text is left once the stream has ended"""
+        chunk, self.buffer = self.buffer.strip(), ''
+        return [chunk] if chunk else []
+
+
+def deliver_stream(twilio, to_number, tokens, min_chars=80):
+    """Send a token stream to a WhatsApp number sentence by sentence.
+    
+    Returns the full reply text, with its original line breaks, so the
+    caller can persist it.
+    """
+    chunker = SentenceChunker(min_chars)
+    started = time.monotonic()
+    parts = []
+    reply = []
+    
+    def send(chunks):
+        for chunk in chunks:
+            if not parts:
+                first_chunk_latency.observe(time.monotonic() - started)
+            twilio.send_whatsapp_message(to_number, chunk)
+            chunks_sent.inc()
+            parts.append(chunk)
+    
+    for token in tokens:
+        reply.append(token)
+        send(chunker.feed(token))
+    send(chunker.flush())
+    return ''.join(reply).strip()
@@ -0,0 +1,80 @@
+import json
+from datetime import datetime, time, timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from AI.tools.appointment_tools import BookAppointmentTool
+from AI.tools.providers import get_provider, register_provider
+from vedya.core.availability import AvailabilityEngine, AvailabilityProvider
+
+# Next week's Monday, so the engine never evicts the test's bookings as past
+_today = timezone.localdate()
+MONDAY = timezone.make_aware(datetime.combine(_today + timedelta(days=7 - _today.weekday()), time.min))
+
+
+def _engine():
+    engine = AvailabilityEngine()
+    engine.set_availability(1, {'monday': [['09:00', '17:00']]})
+    return engine
+
+
+class FirstFreeSlotsTests(SimpleTestCase):
+    def test_slots_start_at_or_after_the_window_start(self):
+        start = MONDAY.replace(hour=10, minute=7)
+        slots = _engine().first_free_slots([1], start, start + timedelta(hours=2), limit=1)
+
+        self.assertEqual(slots, [(MONDAY.replace(hour=10, minute=15), 1)])
+
+    def test_slots_end_by_the_window_end(self):
+        start = MONDAY.replace(hour=10, minute=15)
+        slots = _engine().first_free_slots([1], start, MONDAY.replace(hour=11, minute=40))
+
+        self.assertEqual([moment.strftime('%H:%M') for moment, _ in slots], ['10:15', '10:45'])
+
+    def test_booked_slots_are_skipped(self):
+        engine = _engine()
+        engine.book(7, 1, MONDAY.replace(hour=9), MONDAY.replace(hour=9, minute=30))
+        slots = engine.first_free_slots([1], MONDAY.replace(hour=9), MONDAY.replace(hour=10), limit=1)
+
+        self.assertEqual(slots, [(MONDAY.replace(hour=9, minute=30), 1)])
+
+
+class EngineSizeTests(SimpleTestCase):
+    def test_removing_a_doctor_drops_their_bookings(self):
+        engine = _engine()
+        engine.book(7, 1, MONDAY.replace(hour=9), MONDAY.replace(hour=9, minute=30))
+        engine.remove_doctor(1)
+
+        self.assertEqual((engine.doctors, engine.appointment_days), ({}, {}))
+
+    def test_past_days_are_evicted(self):
+        engine = _engine()
+        engine.book(7, 1, MONDAY.replace(hour=9), MONDAY.replace(hour=9, minute=30))
+        # Runs past midnight into Tuesday
+        engine.book(8, 1, MONDAY.replace(hour=23, minute=30), MONDAY + timedelta(days=1, minutes=30))
+
+        with mock.patch('django.utils.timezone.now', return_value=MONDAY + timedelta(days=1, hours=8)):
+            engine.is_free(1, MONDAY + timedelta(days=1, hours=9), MONDAY + timedelta(days=1, hours=10))
+        tuesday = (MONDAY + timedelta(days=1)).date()
+        self.assertEqual(list(engine.doctors[1].appointments), [tuesday])
+        self.assertEqual(list(engine.doctors[1].booked), [tuesday])
+        self.assertEqual(engine.appointment_days, {8: (1, [tuesday])})
+
+
+class BookAppointmentToolTests(SimpleTestCase):
+    def setUp(self):
+        # Put back the provider CoreConfig.ready() registered, for the tests that follow
+        self.addCleanup(register_provider, 'availability', get_provider('availability'))
+        register_provider('availability', AvailabilityProvider())
+
+    def test_unparseable_slot_is_reported_to_the_agent(self):
+        result = json.loads(BookAppointmentTool()._run('1', '2', 'tomorrow at 10am'))
+
+        self.assertIn('YYYY-MM-DD HH:MM', result['error'])
+
+    def test_unparseable_doctor_id_is_reported_to_the_agent(self):
+        result = json.loads(BookAppointmentTool()._run('Dr. Rao', '2', '2026-10-19 10:00'))
+
+        self.assertIn('error', result)
@@ -0,0 +1,34 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from vedya.core.models import Appointment, Conversation, Doctor, Message, Patient
+
+
+class BackfillSymptomsTests(TestCase):
+    def test_only_messages_shortly_before_the_booking_are_read(self):
+        user = User.objects.create(username='doctor')
+        doctor = Doctor.objects.create(user=user, specialization='General', license_number='L1')
+        patient = Patient.objects.create(whatsapp_number='+911', full_name='Patient')
+        conversation = Conversation.objects.create(patient=patient)
+        now = timezone.now()
+        appointment = Appointment.objects.create(
+            patient=patient, doctor=doctor, scheduled_time=now + timedelta(days=1),
+            end_time=now + timedelta(days=1, minutes=30)
+        )
+        sent = {
+            'I had a fever last month': appointment.created_at - timedelta(days=30),
+            'I have a headache': appointment.created_at - timedelta(hours=2),
+            'My knee hurts too': appointment.created_at + timedelta(hours=1),
+        }
+        for content, timestamp in sent.items():
+            message = Message.objects.create(conversation=conversation, sender='patient', content=content)
+            Message.objects.filter(pk=message.pk).update(timestamp=timestamp)
+
+        call_command('backfill_symptoms', stdout=StringIO())
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.symptoms, 'headache')
@@ -0,0 +1,58 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from AI.models.batch_scheduler import BatchScheduler
+
+
+class BatchSchedulerTests(SimpleTestCase):
+    def _scheduler(self, run_batch, **kwargs):
+        scheduler = BatchScheduler(run_batch, **kwargs)
+        self.addCleanup(scheduler.close)
+        return scheduler
+
+    def test_concurrent_requests_share_a_batch(self):
+        batches = []
+
+        def run_batch(prompts, max_tokens, temperature):
+            batches.append(list(prompts))
+            return [prompt.upper() for prompt in prompts]
+
+        # A long window, so the batch closes because it is full
+        scheduler = self._scheduler(run_batch, window_ms=5000, max_batch_size=3)
+        futures = [scheduler.submit(prompt) for prompt in ('a', 'b', 'c')]
+
+        self.assertEqual([future.result(timeout=5) for future in futures], ['A', 'B', 'C'])
+        self.assertEqual(batches, [['a', 'b', 'c']])
+
+    def test_requests_with_different_parameters_are_batched_apart(self):
+        batches, release = [], threading.Event()
+
+        def run_batch(prompts, max_tokens, temperature):
+            release.wait(5)
+            batches.append((list(prompts), max_tokens))
+            return prompts
+
+        scheduler = self._scheduler(run_batch, window_ms=50)
+        futures = [scheduler.submit('a', max_tokens=10), scheduler.submit('b', max_tokens=20),
+                   scheduler.submit('c', max_tokens=10)]
+        release.set()
+
+        self.assertEqual([future.result(timeout=5) for future in futures], ['a', 'b', 'c'])
+        self.assertEqual(batches, [(['a', 'c'], 10), (['b'], 20)])
+
+    def test_wrong_number_of_results_fails_the_whole_batch(self):
+        scheduler = self._scheduler(lambda prompts, max_tokens, temperature: prompts[:-1], window_ms=5000,
+                                    max_batch_size=2)
+        futures = [scheduler.submit('a'), scheduler.submit('b')]
+
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, '1 results for a batch of 2'):
+                future.result(timeout=5)
+
+    def test_closed_scheduler_refuses_requests(self):
+        scheduler = BatchScheduler(lambda prompts, max_tokens, temperature: prompts)
+        scheduler.close()
+
+        with self.assertRaises(RuntimeError):
+            scheduler.submit('a')
@@ -0,0 +1,116 @@
+import json
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from AI.tools.appointment_tools import RescheduleAppointmentTool
+from vedya.core import availability
+from vedya.core.availability import format_slot
+from vedya.core.booking import SlotUnavailable, book, book_many, cancel, reschedule
+from vedya.core.management.commands.stress_booking import Command as StressBookingCommand
+from vedya.core.models import Appointment, Doctor, Patient
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='doctor')
+        self.doctor = Doctor.objects.create(user=user, specialization='General', license_number='L1')
+        self.patient = Patient.objects.create(whatsapp_number='+911', full_name='Patient')
+        self.base = timezone.now().replace(second=0, microsecond=0) + timedelta(days=7)
+
+    def _at(self, minutes):
+        return self.base + timedelta(minutes=minutes)
+
+    def test_overlapping_booking_is_refused_and_adjacent_one_is_not(self):
+        book(self.patient.id, self.doctor.id, self._at(0))
+
+        with self.assertRaises(SlotUnavailable):
+            book(self.patient.id, self.doctor.id, self._at(15))
+        book(self.patient.id, self.doctor.id, self._at(30))
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 2)
+
+    def test_cancelling_frees_the_slot(self):
+        appointment = book(self.patient.id, self.doctor.id, self._at(0))
+        cancel(appointment.id)
+
+        book(self.patient.id, self.doctor.id, self._at(0))
+
+    def test_reschedule_onto_a_taken_slot_is_refused(self):
+        first = book(self.patient.id, self.doctor.id, self._at(0))
+        second = book(self.patient.id, self.doctor.id, self._at(60))
+
+        with self.assertRaises(SlotUnavailable):
+            reschedule(second.id, self._at(10))
+        moved = reschedule(second.id, self._at(30))
+        self.assertEqual((moved.scheduled_time, moved.status), (self._at(30), 'rescheduled'))
+        first.refresh_from_db()
+        self.assertEqual(first.scheduled_time, self._at(0))
+
+    def test_book_many_rejects_existing_and_in_batch_overlaps(self):
+        book(self.patient.id, self.doctor.id, self._at(0))
+        requests = [
+            {'patient_id': self.patient.id, 'doctor_id': self.doctor.id, 'start': self._at(start)}
+            for start in (15, 30, 45, 60)
+        ]
+
+        booked, rejected = book_many(requests)
+        self.assertEqual(sorted(appointment.scheduled_time for appointment in booked), [self._at(30), self._at(60)])
+        self.assertEqual([request['start'] for request, _ in rejected], [self._at(15), self._at(45)])
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 3)
+
+
+class RescheduleAppointmentToolTests(TestCase):
+    def setUp(self):
+        # Build the availability engine from this test's rows
+        availability._engine = None
+        self.addCleanup(setattr, availability, '_engine', None)
+        user = User.objects.create(username='doctor')
+        doctor = Doctor.objects.create(
+            user=user, specialization='General', license_number='L1', availability={'monday': [['09:00', '17:00']]}
+        )
+        patient = Patient.objects.create(whatsapp_number='+911', full_name='Patient')
+        today = timezone.localdate()
+        monday = today + timedelta(days=7 - today.weekday())
+        self.monday = timezone.make_aware(datetime.combine(monday, time.min))
+        self.appointment = book(patient.id, doctor.id, self._at(hours=10))
+
+    def _at(self, hours, minutes=0):
+        return self.monday + timedelta(hours=hours, minutes=minutes)
+
+    def _reschedule(self, moment):
+        return json.loads(RescheduleAppointmentTool()._run(str(self.appointment.id), format_slot(moment)))
+
+    def test_moving_outside_working_hours_is_refused(self):
+        for moment in (self._at(hours=3), self._at(hours=16, minutes=45), self._at(hours=24 + 10)):
+            with self.subTest(moment=moment):
+                result = self._reschedule(moment)
+                self.assertEqual(result['error'], 'Time slot is not available')
+                self.assertTrue(result['available_slots'])
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.scheduled_time, self._at(hours=10))
+
+    def test_moving_over_its_own_slot_is_allowed(self):
+        result = self._reschedule(self._at(hours=10, minutes=15))
+
+        self.assertEqual((result['new_time'], result['status']), (format_slot(self._at(hours=10, minutes=15)), 'rescheduled'))
+
+
+class StressBookingCommandTests(TestCase):
+    def test_overlaps_fail_the_command(self):
+        user = User.objects.create(username='doctor')
+        doctor = Doctor.objects.create(user=user, specialization='General', license_number='L1')
+        patient = Patient.objects.create(whatsapp_number='+911', full_name='Patient')
+        start = timezone.now() + timedelta(days=7)
+        for minutes in (0, 15):
+            Appointment.objects.create(
+                patient=patient, doctor=doctor, scheduled_time=start + timedelta(minutes=minutes),
+                end_time=start + timedelta(minutes=minutes + 30)
+            )
+
+        command = StressBookingCommand(stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'Overlapping appointments: 1'):
+            command._verify([doctor.id])
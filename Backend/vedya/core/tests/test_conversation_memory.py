@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+
+from AI.utils.conversation_memory import ConversationMemory, ConversationMemoryStore, count_tokens
+
+
+class ConversationMemoryTests(SimpleTestCase):
+    def test_window_keeps_the_latest_turns_and_summarizes_the_rest(self):
+        memory = ConversationMemory(token_budget=1000, window_turns=2)
+        for text in ('I have a fever. Since Monday.', 'Noted.', 'Book a doctor.'):
+            memory.add_turn('Patient', text)
+
+        self.assertEqual(memory.turns, [('Patient', 'Noted.'), ('Patient', 'Book a doctor.')])
+        self.assertEqual(memory.summary, 'Patient: I have a fever.')
+        self.assertEqual(memory.total_turns, 3)
+
+    def test_turns_are_trimmed_to_the_token_budget(self):
+        memory = ConversationMemory(token_budget=80, window_turns=100)
+        for turn in range(10):
+            memory.add_turn('Patient', f'Message number {turn} about my symptoms.')
+
+        self.assertLessEqual(count_tokens(memory.summary) + sum(count_tokens(text) for _, text in memory.turns), 80)
+        self.assertEqual(memory.turns[-1], ('Patient', 'Message number 9 about my symptoms.'))
+        # The summary gets a quarter of the budget and keeps the most recent facts
+        self.assertLessEqual(count_tokens(memory.summary), 20)
+        self.assertIn('Message number', memory.summary.splitlines()[-1])
+
+    def test_latest_turn_is_kept_even_when_it_alone_is_over_budget(self):
+        memory = ConversationMemory(token_budget=10, window_turns=12)
+        memory.add_turn('Patient', 'x' * 200)
+
+        self.assertEqual(len(memory.turns), 1)
+
+    def test_round_trip_through_a_dict(self):
+        memory = ConversationMemory(token_budget=1000, window_turns=1)
+        memory.add_turn('Patient', 'Hello.')
+        memory.add_turn('Assistant', 'Hi!')
+
+        restored = ConversationMemory.from_dict(memory.to_dict())
+        self.assertEqual((restored.summary, restored.turns, restored.total_turns),
+                         (memory.summary, memory.turns, memory.total_turns))
+        self.assertEqual(restored.prompt_context(), 'Summary of earlier conversation:\nPatient: Hello.\nAssistant: Hi!')
+
+
+class ConversationMemoryStoreTests(SimpleTestCase):
+    def test_memories_are_loaded_once_and_saved_through_the_callbacks(self):
+        saved, loads = {}, []
+
+        def loader(key):
+            loads.append(key)
+            return saved.get(key)
+
+        store = ConversationMemoryStore(loader=loader, saver=saved.__setitem__, token_budget=1000, window_turns=4)
+        memory = store.get(7)
+        memory.add_turn('Patient', 'Hello')
+        store.save(7, memory)
+
+        self.assertIs(store.get(7), memory)
+        self.assertEqual(loads, [7])
+        store.forget(7)
+        self.assertEqual(store.get(7).turns, [('Patient', 'Hello')])
+        self.assertEqual(loads, [7, 7])
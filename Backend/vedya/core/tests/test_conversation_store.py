@@ -0,0 +1,26 @@
+from django.test import TestCase, override_settings
+
+from AI.agents.patient_agent import PatientAgent
+from vedya.core.conversation_store import create_memory_store
+from vedya.core.models import Conversation, Patient
+
+
+# Memory is written straight to the test database
+@override_settings(WRITE_BEHIND_MAX_ITEMS=0)
+class ConversationMemoryStoreTests(TestCase):
+    def test_each_conversation_of_a_patient_keeps_its_own_memory(self):
+        patient = Patient.objects.create(whatsapp_number='+911', full_name='Patient')
+        old = Conversation.objects.create(patient=patient, active=False)
+        current = Conversation.objects.create(patient=patient)
+        agent = PatientAgent(llm=None, memory_store=create_memory_store())
+
+        agent.process_message(patient.id, 'I have a headache', conversation_id=old.id)
+        agent.process_message(patient.id, 'Book me a doctor', conversation_id=current.id)
+
+        old.refresh_from_db()
+        current.refresh_from_db()
+        self.assertEqual([turn[1] for turn in old.memory['turns']][::2], ['I have a headache'])
+        self.assertEqual([turn[1] for turn in current.memory['turns']][::2], ['Book me a doctor'])
+        # A fresh store reads each conversation's memory back from its own row
+        reloaded = create_memory_store().get(old.id)
+        self.assertEqual(reloaded.turns[0], ('Patient', 'I have a headache'))
@@ -0,0 +1,42 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from vedya.core.dispatcher import ShardedDispatcher
+
+
+class ShardedDispatcherTests(SimpleTestCase):
+    def test_items_for_a_key_are_handled_in_order(self):
+        handled, release = [], threading.Event()
+
+        def handler(key, items):
+            release.wait(5)
+            handled.append((key, items))
+
+        dispatcher = ShardedDispatcher(handler, workers=1, max_batch=3)
+        self.addCleanup(dispatcher.stop)
+        for item in range(5):
+            dispatcher.submit('+911', item)
+        release.set()
+        dispatcher.stop()
+
+        self.assertEqual([item for _, items in handled for item in items], [0, 1, 2, 3, 4])
+        self.assertTrue(all(len(items) <= 3 for _, items in handled))
+
+    def test_stop_drains_and_later_submits_raise(self):
+        handled = []
+        dispatcher = ShardedDispatcher(lambda key, items: handled.extend(items), workers=2)
+        dispatcher.submit('+911', 'first')
+        dispatcher.stop()
+
+        self.assertEqual(handled, ['first'])
+        with self.assertRaises(RuntimeError):
+            dispatcher.submit('+911', 'lost')
+        self.assertEqual(dispatcher.pending(), 0)
+
+    def test_stopped_before_it_started_refuses_work(self):
+        dispatcher = ShardedDispatcher(lambda key, items: None)
+        dispatcher.stop()
+
+        with self.assertRaises(RuntimeError):
+            dispatcher.submit('+911', 'lost')
@@ -0,0 +1,90 @@
+import random
+
+from django.test import SimpleTestCase
+
+from vedya.core.doctor_index import BRUTE_FORCE_LIMIT, DoctorIndex, haversine_km
+
+SPECIALTIES = ('Cardiology', 'Pediatrics', 'Dermatology')
+
+
+def build_index(count):
+    """Index of doctors scattered around Bangalore, cycling through SPECIALTIES"""
+    rng = random.Random(42)
+    index = DoctorIndex()
+    for doctor_id in range(count):
+        index.upsert(doctor_id, f'Dr {doctor_id}', SPECIALTIES[doctor_id % len(SPECIALTIES)], 'Bangalore',
+                     12.97 + rng.uniform(-1, 1), 77.59 + rng.uniform(-1, 1))
+    return index
+
+
+def brute_force(index, latitude, longitude, k, specialty=None, max_km=None):
+    results = []
+    for doctor_id, (_, doctor_specialty, _, doctor_latitude, doctor_longitude) in index.doctors.items():
+        if specialty and doctor_specialty != specialty:
+            continue
+        distance = haversine_km(latitude, longitude, doctor_latitude, doctor_longitude)
+        if max_km is None or distance <= max_km:
+            results.append((distance, doctor_id))
+    return [doctor_id for _, doctor_id in sorted(results)[:k]]
+
+
+class NearestTests(SimpleTestCase):
+    def setUp(self):
+        # Enough located doctors per specialty that queries use the grid, not a scan
+        self.index = build_index(BRUTE_FORCE_LIMIT * 4)
+
+    def nearest_ids(self, *args, **kwargs):
+        return [doctor_id for doctor_id, _ in self.index.nearest(*args, **kwargs)]
+
+    def test_nearest_matches_a_full_scan(self):
+        results = self.index.nearest(12.97, 77.59, k=5)
+
+        self.assertEqual([doctor_id for doctor_id, _ in results], brute_force(self.index, 12.97, 77.59, 5))
+        distances = [distance for _, distance in results]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_nearest_with_a_specialty_only_returns_that_specialty(self):
+        self.assertEqual(self.nearest_ids(13.2, 77.3, k=5, specialty='cardiologist'),
+                         brute_force(self.index, 13.2, 77.3, 5, specialty='Cardiology'))
+
+    def test_nearest_with_a_rare_specialty_scans_its_doctors(self):
+        self.index.upsert('rare', 'Dr Rare', 'Neurology', 'Mysore', 12.30, 76.64)
+        self.index.upsert('unlocated', 'Dr Far', 'Neurology', 'Mysore')
+
+        self.assertEqual(self.nearest_ids(12.97, 77.59, specialty='neurologist'), ['rare'])
+        self.assertEqual(self.index.nearest(12.97, 77.59, specialty='Oncology'), [])
+
+    def test_max_km_limits_the_results(self):
+        results = self.index.nearest(12.97, 77.59, k=50, max_km=10)
+
+        self.assertTrue(results)
+        self.assertTrue(all(distance <= 10 for _, distance in results))
+        self.assertEqual([doctor_id for doctor_id, _ in results], brute_force(self.index, 12.97, 77.59, 50, max_km=10))
+
+    def test_removed_doctors_are_not_returned(self):
+        closest = self.nearest_ids(12.97, 77.59, k=1, specialty='Pediatrics')[0]
+        self.index.remove(closest)
+
+        self.assertNotIn(closest, self.nearest_ids(12.97, 77.59, k=10, specialty='Pediatrics'))
+        self.assertNotIn(closest, self.nearest_ids(12.97, 77.59, k=10))
+
+
+class SearchTests(SimpleTestCase):
+    def setUp(self):
+        self.index = DoctorIndex()
+        self.index.upsert(1, 'Dr A', 'Cardiology', 'Bangalore')
+        self.index.upsert(2, 'Dr B', 'Cardiology', 'Mumbai')
+        self.index.upsert(3, 'Dr C', 'Pediatrics', 'Bangalore')
+
+    def test_specialty_words_are_stemmed(self):
+        self.assertCountEqual(self.index.search('cardiologist'), [1, 2])
+
+    def test_specialty_and_location_must_both_match(self):
+        self.assertEqual(self.index.search('Cardiology', 'bangalore'), [1])
+        self.assertEqual(self.index.search('Pediatrics', 'Mumbai'), [])
+
+    def test_upsert_replaces_the_previous_entry(self):
+        self.index.upsert(3, 'Dr C', 'Cardiology', 'Bangalore')
+
+        self.assertCountEqual(self.index.search('Cardiology', 'Bangalore'), [1, 3])
+        self.assertEqual(self.index.search('Pediatrics'), [])
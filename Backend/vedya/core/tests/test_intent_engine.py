@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from AI.utils.intent_engine import IntentEngine, get_intent_engine
+
+
+class IntentEngineTests(SimpleTestCase):
+    def test_highest_score_wins_and_ties_go_to_the_first_listed_intent(self):
+        engine = IntentEngine({
+            'FIRST': ['alpha', 'beta'],
+            'SECOND': {'alpha': 1.0, 'gamma': 0.5},
+        })
+
+        self.assertEqual(engine.top_intent('alpha'), 'FIRST')
+        self.assertEqual(engine.top_intent('alpha gamma'), 'SECOND')
+        self.assertEqual([(match.intent, match.score) for match in engine.classify('alpha gamma beta')],
+                         [('FIRST', 2.0), ('SECOND', 1.5)])
+
+    def test_a_phrase_counts_once_and_the_longest_phrase_matches(self):
+        engine = IntentEngine({'PAIN': ['pain'], 'CHEST': {'chest pain': 3.0}})
+
+        self.assertEqual([(match.intent, match.score) for match in engine.classify('pain, pain and chest pain')],
+                         [('CHEST', 3.0), ('PAIN', 1.0)])
+
+    def test_nothing_matched_gives_the_default_intent(self):
+        self.assertEqual(IntentEngine({'GREETING': ['hello']}).top_intent('Thanks!'), 'GENERAL_INQUIRY')
+
+
+class PatientIntentTests(SimpleTestCase):
+    def test_bundled_tables(self):
+        engine = get_intent_engine('patient')
+        cases = {
+            'I want to book an appointment': 'NEW_APPOINTMENT',
+            'Can I reschedule my appointment to another time?': 'RESCHEDULE',
+            'Please cancel my booking': 'CANCEL_APPOINTMENT',
+            'Mujhe appointment cancel karna hai': 'CANCEL_APPOINTMENT',
+            'I have had a fever and headache since Monday': 'DESCRIBE_SYMPTOMS',
+            'मुझे बुखार है': 'DESCRIBE_SYMPTOMS',
+            'What are your opening hours?': 'GENERAL_INQUIRY',
+        }
+        for text, intent in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(engine.top_intent(text), intent)
@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+import requests
+from django.test import SimpleTestCase
+
+from vedya.core.media import FAILED_TEXT, IMAGE_TEXT, MediaPipeline, MediaTooLarge, download_media
+from vedya.core.media_mock import MediaServer
+
+
+class MediaTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = MediaServer(chunk_bytes=1024).start()
+        self.addCleanup(self.server.stop)
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.dest_dir = work_dir.name
+
+
+class DownloadMediaTests(MediaTestCase):
+    def test_download_is_streamed_to_a_file_the_caller_removes(self):
+        content = os.urandom(10000)
+        url = self.server.add(content, 'image/jpeg')
+
+        with download_media(url, dest_dir=self.dest_dir, chunk_bytes=1024, max_bytes=20000) as media:
+            self.assertEqual((media.content_type, media.size), ('image/jpeg', len(content)))
+            with open(media.path, 'rb') as handle:
+                self.assertEqual(handle.read(), content)
+        self.assertEqual(os.listdir(self.dest_dir), [])
+        media.close()  # Closing again is harmless
+
+    def test_oversize_media_raises_and_leaves_no_file(self):
+        url = self.server.add(os.urandom(5000), 'audio/ogg')
+
+        with self.assertRaises(MediaTooLarge):
+            download_media(url, dest_dir=self.dest_dir, max_bytes=4096)
+        self.assertEqual(os.listdir(self.dest_dir), [])
+
+    def test_missing_media_raises(self):
+        with self.assertRaises(requests.HTTPError):
+            download_media(f'{self.server.base_url}/Media/ME404', dest_dir=self.dest_dir)
+
+
+class MediaPipelineTests(MediaTestCase):
+    def _pipeline(self, **kwargs):
+        pipeline = MediaPipeline(download_workers=2, dest_dir=self.dest_dir, **kwargs)
+        self.addCleanup(pipeline.close)
+        return pipeline
+
+    def test_voice_note_is_transcribed_and_its_file_removed(self):
+        pipeline = self._pipeline(transcriber='vedya.core.transcribers.scripted_transcriber', processes=1)
+        url = self.server.add_voice_note('I have a fever', size=64 * 1024)
+
+        result = pipeline.submit(url).result(timeout=60)
+        self.assertEqual(result.text, 'I have a fever')
+        self.assertEqual(os.listdir(self.dest_dir), [])
+
+    def test_images_and_failed_downloads_become_placeholders(self):
+        pipeline = self._pipeline(transcriber='')
+        image = pipeline.submit(self.server.add(os.urandom(2048), 'image/png'))
+        self.assertEqual(image.result(timeout=10).text, IMAGE_TEXT)
+
+        with self.assertLogs('vedya.core.media', 'WARNING'):
+            missing = pipeline.submit(f'{self.server.base_url}/Media/ME404')
+            self.assertEqual(missing.result(timeout=10).text, FAILED_TEXT)
+        self.assertEqual(os.listdir(self.dest_dir), [])
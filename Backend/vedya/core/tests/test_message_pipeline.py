@@ -0,0 +1,22 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from vedya.core import message_pipeline, write_behind
+from vedya.core.message_pipeline import get_pipeline
+
+
+class GetPipelineTests(SimpleTestCase):
+    def setUp(self):
+        for module, name in ((message_pipeline, '_pipeline'), (write_behind, '_buffer')):
+            setattr(module, name, None)
+            self.addCleanup(setattr, module, name, None)
+
+    def test_pipeline_drains_at_exit_before_the_final_write_behind_flush(self):
+        with mock.patch('atexit.register') as register:
+            pipeline = get_pipeline()
+            self.addCleanup(write_behind._buffer.stop)
+            self.assertIs(get_pipeline(), pipeline)
+
+        # atexit calls the hooks last-registered first
+        self.assertEqual([call.args[0] for call in register.call_args_list], [write_behind._buffer.stop, pipeline.stop])
@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import ConnectTimeout, ReadTimeout
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+from twilio.http.response import Response
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from vedya.core.outbound import OutboundSender, TwilioRestBackend, is_retryable, parse_retry_after
+
+
+def _throttled(retry_after=None):
+    exc = TwilioRestException(429, '/Messages.json', 'Too many requests', method='POST')
+    exc.retry_after = retry_after
+    return exc
+
+
+class FlakyBackend:
+    """Raises the given exceptions in turn, then sends"""
+
+    def __init__(self, *failures):
+        self.failures = list(failures)
+        self.attempts = 0
+
+    def send_whatsapp_message(self, to_number, body, media_url=None):
+        self.attempts += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return 'SM1'
+
+
+class IsRetryableTests(SimpleTestCase):
+    def test_throttling_and_server_errors_are_retried(self):
+        self.assertTrue(is_retryable(_throttled()))
+        self.assertTrue(is_retryable(TwilioRestException(503, '/Messages.json')))
+        self.assertFalse(is_retryable(TwilioRestException(400, '/Messages.json')))
+
+    def test_only_failures_before_the_request_was_sent_are_retried(self):
+        refused = MaxRetryError(None, '/Messages.json', reason=NewConnectionError(None, 'Connection refused'))
+        self.assertTrue(is_retryable(ConnectTimeout()))
+        self.assertTrue(is_retryable(RequestsConnectionError(refused)))
+        self.assertTrue(is_retryable(ConnectionRefusedError()))
+        # The POST may have reached Twilio
+        self.assertFalse(is_retryable(ReadTimeout()))
+        self.assertFalse(is_retryable(RequestsConnectionError(ProtocolError('Connection aborted.'))))
+        self.assertFalse(is_retryable(ConnectionResetError()))
+
+    def test_retry_after_in_seconds_or_as_a_date(self):
+        self.assertEqual(parse_retry_after('3'), 3.0)
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+
+@mock.patch('vedya.core.outbound.time.sleep')
+class OutboundSenderTests(SimpleTestCase):
+    def test_retry_after_is_waited_for(self, sleep):
+        backend = FlakyBackend(_throttled(2.0))
+
+        self.assertEqual(OutboundSender(backend).send('+911', 'hello'), 'SM1')
+        self.assertEqual(backend.attempts, 2)
+        sleep.assert_called_once_with(2.0)
+
+    def test_retry_after_beyond_max_delay_fails_the_send(self, sleep):
+        backend = FlakyBackend(_throttled(120.0))
+
+        with self.assertRaises(TwilioRestException):
+            OutboundSender(backend, max_delay=30.0).send('+911', 'hello')
+        self.assertEqual(backend.attempts, 1)
+        sleep.assert_not_called()
+
+    def test_read_timeout_is_not_retried(self, sleep):
+        backend = FlakyBackend(ReadTimeout())
+
+        with self.assertRaises(ReadTimeout):
+            OutboundSender(backend).send('+911', 'hello')
+        self.assertEqual(backend.attempts, 1)
+
+
+class TwilioRestBackendTests(SimpleTestCase):
+    def test_throttled_send_carries_retry_after(self):
+        backend = TwilioRestBackend('AC' + '0' * 32, 'token', '+10000000000')
+        throttled = Response(429, '{"message": "Too many requests", "code": 20429}', {'Retry-After': '4'})
+
+        with mock.patch.object(TwilioHttpClient, 'request', return_value=throttled):
+            with self.assertRaises(TwilioRestException) as raised:
+                backend.send_whatsapp_message('+911', 'hello')
+        self.assertEqual(raised.exception.status, 429)
+        self.assertEqual(raised.exception.retry_after, 4.0)
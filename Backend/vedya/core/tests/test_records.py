@@ -0,0 +1,51 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from vedya.core import records
+from vedya.core.models import Appointment, Doctor, Patient
+from vedya.core.records import UPCOMING_APPOINTMENTS, PatientRecordsProvider
+
+
+class UpcomingAppointmentsTests(TestCase):
+    def setUp(self):
+        records._cache = None
+        self.addCleanup(setattr, records, '_cache', None)
+        user = User.objects.create(username='doctor', first_name='Asha', last_name='Rao')
+        self.doctor = Doctor.objects.create(user=user, specialization='General', license_number='L1')
+        self.patient = Patient.objects.create(whatsapp_number='+911', full_name='Patient')
+        self.now = timezone.now()
+
+    def _book(self, minutes):
+        start = self.now + timedelta(minutes=minutes)
+        return Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, scheduled_time=start, end_time=start + timedelta(minutes=30)
+        )
+
+    def _appointments(self, minutes_later):
+        with mock.patch('django.utils.timezone.now', return_value=self.now + timedelta(minutes=minutes_later)):
+            return [row['id'] for row in PatientRecordsProvider().appointments(self.patient.id)]
+
+    def test_cached_list_is_reused_and_drops_started_appointments(self):
+        soon, later = self._book(10), self._book(120)
+
+        self.assertEqual(self._appointments(0), [str(soon.id), str(later.id)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._appointments(1), [str(soon.id), str(later.id)])
+            self.assertEqual(self._appointments(15), [str(later.id)])
+
+    def test_list_cut_off_at_the_limit_is_reloaded_once_it_runs_short(self):
+        booked = [self._book(10 + 60 * index) for index in range(UPCOMING_APPOINTMENTS + 1)]
+
+        self.assertEqual(len(self._appointments(0)), UPCOMING_APPOINTMENTS)
+        self.assertEqual(self._appointments(15), [str(appointment.id) for appointment in booked[1:]])
+
+    def test_booking_invalidates_the_list(self):
+        first = self._book(60)
+        self.assertEqual(self._appointments(0), [str(first.id)])
+
+        second = self._book(30)
+        self.assertEqual(self._appointments(0), [str(second.id), str(first.id)])
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from vedya.core.models import Appointment, Doctor, Patient, SentReminder
+from vedya.core.reminders import POLL_OVERLAP, ReminderScheduler
+from vedya.core.timer_wheel import SLOTS, TimerWheel
+
+
+class RecordingTwilio:
+    """Stands in for TwilioService.send_many, failing the numbers it is told to"""
+
+    def __init__(self, failing=()):
+        self.sent = []
+        self.failing = set(failing)
+
+    def send_many(self, messages):
+        results = []
+        for number, body in messages:
+            if number in self.failing:
+                results.append(RuntimeError('send failed'))
+            else:
+                self.sent.append((number, body))
+                results.append('SM0')
+        return results
+
+
+def _appointment(scheduled_time, number='+911'):
+    user = User.objects.create(username=f'doctor{number}', first_name='Asha', last_name='Rao')
+    doctor = Doctor.objects.create(user=user, specialization='General', license_number=number)
+    patient = Patient.objects.create(whatsapp_number=number, full_name=number)
+    return Appointment.objects.create(
+        patient=patient, doctor=doctor, scheduled_time=scheduled_time, end_time=scheduled_time + timedelta(minutes=30)
+    )
+
+
+def _scheduler(twilio):
+    return ReminderScheduler(twilio=twilio, lead_minutes=[60], window_hours=48, grace_minutes=10)
+
+
+class TimerWheelTests(TestCase):
+    def test_timers_fire_on_their_tick_across_levels(self):
+        wheel = TimerWheel(1000)
+        wheel.add(1, 1005)
+        wheel.add(2, 1000 + SLOTS * SLOTS + 7)  # Starts two levels up and cascades down
+        wheel.add(3, 900)  # Already past: fires on the next tick
+
+        self.assertEqual(wheel.advance(1004), [(3, 1001)])
+        self.assertEqual(wheel.advance(1005), [(1, 1005)])
+        self.assertEqual(wheel.advance(1000 + SLOTS * SLOTS + 6), [])
+        self.assertEqual(wheel.advance(1000 + SLOTS * SLOTS + 7), [(2, 1000 + SLOTS * SLOTS + 7)])
+        self.assertEqual(len(wheel), 0)
+
+
+class ReminderSchedulerTests(TestCase):
+    def test_reminder_is_sent_when_it_comes_due(self):
+        now = timezone.now()
+        _appointment(now + timedelta(minutes=60, seconds=30))
+        twilio = RecordingTwilio()
+        scheduler = _scheduler(twilio)
+        scheduler.rebuild()
+
+        self.assertEqual(scheduler.run_once(now + timedelta(seconds=20)), 0)
+        self.assertEqual(scheduler.run_once(now + timedelta(seconds=40)), 1)
+        self.assertEqual(twilio.sent[0][0], '+911')
+        self.assertIn('Dr. Asha Rao', twilio.sent[0][1])
+
+    def test_restart_does_not_resend_within_the_grace_period(self):
+        # Due two minutes ago: a rebuild treats it as missed and sends it at once
+        _appointment(timezone.now() + timedelta(minutes=58))
+        twilio = RecordingTwilio()
+        first = _scheduler(twilio)
+        first.rebuild()
+        self.assertEqual(first.run_once(), 1)
+
+        restarted = _scheduler(twilio)
+        restarted.rebuild()
+        self.assertEqual(restarted.run_once(), 0)
+        self.assertEqual(len(twilio.sent), 1)
+        self.assertEqual(SentReminder.objects.count(), 1)
+
+    def test_failed_send_is_retried_after_a_restart(self):
+        _appointment(timezone.now() + timedelta(minutes=58))
+        first = _scheduler(RecordingTwilio(failing={'+911'}))
+        first.rebuild()
+        self.assertEqual(first.run_once(), 0)
+        self.assertFalse(SentReminder.objects.exists())
+
+        twilio = RecordingTwilio()
+        restarted = _scheduler(twilio)
+        restarted.rebuild()
+        self.assertEqual(restarted.run_once(), 1)
+        self.assertEqual(len(twilio.sent), 1)
+
+    def test_failed_send_is_retried_with_backoff_within_the_grace_period(self):
+        now = timezone.now()
+        _appointment(now + timedelta(minutes=60, seconds=30))
+        twilio = RecordingTwilio(failing={'+911'})
+        scheduler = ReminderScheduler(twilio=twilio, lead_minutes=[60], window_hours=48, grace_minutes=2,
+                                      retry_seconds=30)
+        scheduler.rebuild()
+
+        self.assertEqual(scheduler.run_once(now + timedelta(seconds=31)), 0)
+        self.assertEqual(scheduler.run_once(now + timedelta(seconds=60)), 0)
+        # The first retry is due 30 seconds after the failed send, and fails too
+        self.assertEqual(scheduler.run_once(now + timedelta(seconds=62)), 0)
+        twilio.failing.clear()
+        self.assertEqual(scheduler.run_once(now + timedelta(seconds=121)), 0)
+        # The second waits 60 seconds
+        self.assertEqual(scheduler.run_once(now + timedelta(seconds=123)), 1)
+        self.assertEqual(len(twilio.sent), 1)
+        self.assertEqual(SentReminder.objects.count(), 1)
+        self.assertEqual(len(scheduler.wheel), 0)
+
+    def test_failed_send_is_given_up_after_the_grace_period(self):
+        now = timezone.now()
+        _appointment(now + timedelta(minutes=60, seconds=30))
+        scheduler = ReminderScheduler(twilio=RecordingTwilio(failing={'+911'}), lead_minutes=[60], window_hours=48,
+                                      grace_minutes=1, retry_seconds=30)
+        scheduler.rebuild()
+
+        with self.assertLogs('vedya.core.reminders', 'WARNING'):
+            for seconds in range(31, 200, 2):
+                scheduler.run_once(now + timedelta(seconds=seconds))
+        self.assertEqual((len(scheduler.wheel), scheduler._retries), (0, {}))
+
+    def test_poll_sees_a_row_committed_after_its_updated_at(self):
+        scheduler = _scheduler(RecordingTwilio())
+        scheduler.rebuild()
+        appointment = _appointment(timezone.now() + timedelta(minutes=65))
+        # Stamped before the last poll, as a slow transaction in another process would be
+        Appointment.objects.filter(pk=appointment.pk).update(
+            updated_at=scheduler.polled_at - POLL_OVERLAP / 2
+        )
+
+        scheduler.poll_changes()
+        self.assertEqual(len(scheduler.wheel), 1)
+        scheduler.poll_changes()
+        self.assertEqual(len(scheduler.wheel), 1)
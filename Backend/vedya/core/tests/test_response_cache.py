@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase
+
+from AI.models.llm_service import LLMService
+from AI.models.mock_backend import MockLLMBackend
+from AI.models.response_cache import ResponseCache, make_key, normalize_prompt
+
+
+class CountingBackend(MockLLMBackend):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate_batch(self, prompts, max_tokens=100, temperature=0.7, prefix_states=None):
+        self.prompts.extend(prompts)
+        return [f'reply {len(self.prompts) - len(prompts) + index}' for index in range(len(prompts))]
+
+    def stream(self, prompt, max_tokens=100, temperature=0.7, prefix_state=None):
+        self.prompts.append(prompt)
+        yield from ('streamed', ' reply')
+
+
+class CacheKeyTests(SimpleTestCase):
+    def test_case_punctuation_and_whitespace_are_folded(self):
+        self.assertEqual(normalize_prompt('  Book an APPOINTMENT,  please!\n'), 'book an appointment please')
+        self.assertEqual(normalize_prompt('मुझे बुखार है।'), 'मुझे बुखार है')
+        self.assertEqual(make_key('Book an appointment?', max_tokens=100), make_key('book  an appointment', max_tokens=100))
+
+    def test_generation_parameters_are_part_of_the_key(self):
+        self.assertNotEqual(make_key('Hello', max_tokens=100), make_key('Hello', max_tokens=50))
+        self.assertNotEqual(make_key('Hello', temperature=0.7), make_key('Hello', temperature=0.0))
+
+
+class LLMServiceCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = CountingBackend()
+        self.llm = LLMService(backend=self.backend, batch_window_ms=0, prefix_cache_max_bytes=0,
+                              cache=ResponseCache(skip_intents={'CANCEL_APPOINTMENT'}))
+        self.llm.initialized = True  # The counting backend has no weights to load
+
+    def test_near_identical_prompts_are_served_from_the_cache(self):
+        first = self.llm.generate('Book an appointment, please.')
+
+        self.assertEqual(self.llm.generate('book an appointment please'), first)
+        self.assertEqual(len(self.backend.prompts), 1)
+
+    def test_skipped_intents_always_reach_the_backend(self):
+        self.llm.generate('Cancel my appointment', intent='CANCEL_APPOINTMENT')
+        self.llm.generate('Cancel my appointment', intent='CANCEL_APPOINTMENT')
+        self.assertEqual(len(self.backend.prompts), 2)
+
+        self.llm.generate('Cancel my appointment', intent='GENERAL_INQUIRY')
+        self.assertEqual(self.llm.generate('Cancel my appointment'), 'reply 2')
+        self.assertEqual(len(self.backend.prompts), 3)
+
+    def test_batches_send_only_misses_and_respect_the_intents(self):
+        self.llm.generate('Hello')
+
+        results = self.llm.generate_batch(['hello!', 'Cancel it', 'Cancel it'],
+                                          intents=[None, 'CANCEL_APPOINTMENT', 'GENERAL_INQUIRY'])
+        self.assertEqual(results, ['reply 0', 'reply 1', 'reply 2'])
+        self.assertEqual(self.backend.prompts, ['Hello', 'Cancel it', 'Cancel it'])
+
+    def test_streamed_replies_are_cached_unless_skipped(self):
+        self.assertEqual(''.join(self.llm.stream('Hi there', intent='GENERAL_INQUIRY')), 'streamed reply')
+        self.assertEqual(list(self.llm.stream('hi there')), ['streamed reply'])
+        self.assertEqual(''.join(self.llm.stream('Cancel it', intent='CANCEL_APPOINTMENT')), 'streamed reply')
+        self.assertEqual(''.join(self.llm.stream('Cancel it', intent='CANCEL_APPOINTMENT')), 'streamed reply')
+        self.assertEqual(self.backend.prompts, ['Hi there', 'Cancel it', 'Cancel it'])
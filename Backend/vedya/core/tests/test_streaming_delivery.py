@@ -0,0 +1,19 @@
+import re
+
+from django.test import SimpleTestCase
+
+from vedya.core.streaming_delivery import deliver_stream
+from vedya.core.twilio_mock import TwilioMock
+
+
+class DeliverStreamTests(SimpleTestCase):
+    def test_reply_is_sent_in_sentences_and_returned_with_its_line_breaks(self):
+        reply = 'Please rest today.\n\nDrink plenty of water! If the fever stays,\nbook a visit.'
+        twilio = TwilioMock()
+
+        # Streamed as words with their leading whitespace, as the LLM produces them
+        text = deliver_stream(twilio, '+911', re.findall(r'\s*\S+', reply), min_chars=1)
+
+        self.assertEqual(text, reply)
+        self.assertEqual([message['body'] for message in twilio.sent_messages],
+                         ['Please rest today.', 'Drink plenty of water!', 'If the fever stays,\nbook a visit.'])
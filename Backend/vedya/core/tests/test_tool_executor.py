@@ -0,0 +1,82 @@
+import asyncio
+import json
+import time
+
+from django.test import SimpleTestCase
+
+from AI.agents.tool_executor import ToolCall, ToolExecutor, results_as_json
+
+
+class SleepyTool:
+    """Tool stand-in whose _arun sleeps before answering"""
+
+    def __init__(self, name, seconds=0.0, error=None):
+        self.name = name
+        self.seconds = seconds
+        self.error = error
+        self.completed = False
+
+    async def _arun(self, **kwargs):
+        await asyncio.sleep(self.seconds)
+        if self.error:
+            raise self.error
+        self.completed = True
+        return json.dumps({"tool": self.name, **kwargs})
+
+
+class ToolExecutorTests(SimpleTestCase):
+    def test_results_come_back_in_call_order_and_calls_run_concurrently(self):
+        executor = ToolExecutor([SleepyTool('find_doctors', 0.2), SleepyTool('get_patient_profile', 0.2)], timeout=5)
+
+        start = time.perf_counter()
+        results = executor.run([('get_patient_profile', {'patient_id': 1}), ('find_doctors', {'specialty': 'ENT'})])
+
+        self.assertLess(time.perf_counter() - start, 0.35)
+        self.assertEqual([result.name for result in results], ['get_patient_profile', 'find_doctors'])
+        self.assertEqual(json.loads(results[1].output), {'tool': 'find_doctors', 'specialty': 'ENT'})
+
+    def test_slow_read_tool_times_out_without_failing_the_others(self):
+        executor = ToolExecutor([SleepyTool('find_doctors', 1), SleepyTool('get_patient_profile')], timeout=0.05)
+
+        slow, fast = executor.run([ToolCall('find_doctors'), ToolCall('get_patient_profile')])
+
+        self.assertTrue(slow.timed_out)
+        self.assertEqual(slow.error, 'Timed out after 0.05s')
+        self.assertIsNone(fast.error)
+
+    def test_write_tools_are_never_timed_out(self):
+        booking = SleepyTool('book_appointment', 0.2)
+        executor = ToolExecutor([booking], timeout=0.05)
+
+        result, = executor.run([ToolCall('book_appointment', {'doctor_id': 3}, timeout=0.01)])
+
+        self.assertTrue(booking.completed)
+        self.assertFalse(result.timed_out)
+        self.assertIsNone(result.error)
+
+    def test_per_call_timeout_overrides_the_default(self):
+        executor = ToolExecutor([SleepyTool('find_doctors', 0.2)], timeout=0.01, timeouts={'find_doctors': 0.02})
+
+        result, = executor.run([ToolCall('find_doctors', timeout=1)])
+
+        self.assertIsNone(result.error)
+
+    def test_unknown_tools_and_exceptions_become_error_results(self):
+        executor = ToolExecutor([SleepyTool('get_patient_history', error=ValueError('Patient not found'))], timeout=1)
+
+        results = executor.run([ToolCall('get_patient_history'), ToolCall('launch_rocket')])
+
+        self.assertEqual([result.error for result in results], ['Patient not found', 'Unknown tool: launch_rocket'])
+        self.assertEqual(results_as_json(results), [
+            {'tool': 'get_patient_history', 'error': 'Patient not found'},
+            {'tool': 'launch_rocket', 'error': 'Unknown tool: launch_rocket'},
+        ])
+
+    def test_run_refuses_to_block_a_running_event_loop(self):
+        executor = ToolExecutor([], timeout=1)
+
+        async def call_run():
+            executor.run([])
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(call_run())
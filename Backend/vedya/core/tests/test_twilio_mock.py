@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from vedya.core.twilio_mock import TwilioMock
+
+
+class TwilioMockTests(SimpleTestCase):
+    def test_message_lists_can_be_sliced(self):
+        mock = TwilioMock(history_limit=3)
+        for number in range(5):
+            mock.send_message(f'whatsapp:+91{number}', f'reply {number}')
+            mock.simulate_incoming_message(f'whatsapp:+91{number}', f'message {number}')
+
+        self.assertEqual([message['body'] for message in mock.sent_messages[-1:]], ['reply 4'])
+        self.assertEqual([message['Body'] for message in mock.received_messages[:2]], ['message 2', 'message 3'])
+        self.assertEqual(mock.sent_count, 5)
+
+    def test_history_is_per_number_and_in_order(self):
+        mock = TwilioMock()
+        mock.simulate_incoming_message('whatsapp:+911', 'Hello')
+        mock.send_message('whatsapp:+912', 'Not yours')
+        mock.send_message('+911', 'Hi, how can I help?')
+
+        history = mock.get_conversation_history('whatsapp:+911')
+        self.assertEqual([(entry['direction'], entry['body']) for entry in history],
+                         [('inbound', 'Hello'), ('outbound', 'Hi, how can I help?')])
+        self.assertEqual(mock.get_conversation_history('+911', limit=1)[0]['body'], 'Hi, how can I help?')
@@ -0,0 +1,172 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError, connections
+from django.test import TestCase, TransactionTestCase
+
+from vedya.core import write_behind
+from vedya.core.conversation_store import load_memory, save_memory
+from vedya.core.message_pipeline import record_inbound_message
+from vedya.core.models import Conversation, Message, Patient
+from vedya.core.write_behind import WriteBehindBuffer
+
+
+def _buffer(test):
+    # Nothing is flushed in the background while a test runs
+    buffer = WriteBehindBuffer(max_items=10000, max_delay=3600)
+    test.addCleanup(buffer.stop)
+    return buffer
+
+
+def _conversation(number):
+    patient = Patient.objects.create(whatsapp_number=number, full_name=number)
+    return Conversation.objects.create(patient=patient)
+
+
+class WriteBehindOrderTests(TestCase):
+    def test_messages_keep_their_order_per_conversation(self):
+        buffer = _buffer(self)
+        first, second = _conversation('+911'), _conversation('+912')
+        for turn in range(5):
+            for conversation in (first, second):
+                buffer.add_message(conversation=conversation, sender='patient', content=f'{turn}')
+                buffer.add_message(conversation=conversation, sender='system', content=f'{turn} reply')
+        self.assertEqual(Message.objects.count(), 0)
+
+        self.assertEqual(buffer.flush(), 20)
+        for conversation in (first, second):
+            contents = list(conversation.messages.order_by('id').values_list('content', flat=True))
+            self.assertEqual(contents, [text for turn in range(5) for text in (f'{turn}', f'{turn} reply')])
+
+    def test_pending_memory_is_read_back_before_the_flush(self):
+        buffer = _buffer(self)
+        conversation = _conversation('+911')
+        buffer.update_memory(conversation.id, {'turn': 1})
+        buffer.update_memory(conversation.id, {'turn': 2})
+
+        self.assertEqual(buffer.pending_memory(conversation.id), {'turn': 2})
+        buffer.flush()
+        self.assertIsNone(buffer.pending_memory(conversation.id))
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.memory, {'turn': 2})
+
+    def test_saving_memory_leaves_the_rest_of_the_conversation_alone(self):
+        buffer = _buffer(self)
+        write_behind._buffer = buffer
+        self.addCleanup(setattr, write_behind, '_buffer', None)
+        conversation = _conversation('+911')
+        save_memory(conversation.id, {'turn': 1})
+        # Written elsewhere while the memory is still buffered
+        Conversation.objects.filter(id=conversation.id).update(context={'language': 'hi'})
+
+        self.assertEqual(load_memory(conversation.id), {'turn': 1})
+        buffer.flush()
+        conversation.refresh_from_db()
+        self.assertEqual((conversation.memory, conversation.context), ({'turn': 1}, {'language': 'hi'}))
+
+    def test_unflushed_message_is_amended_in_place(self):
+        buffer = _buffer(self)
+        message = buffer.add_message(conversation=_conversation('+911'), sender='patient', content='')
+
+        self.assertTrue(buffer.update_message(message, content='transcript'))
+        buffer.flush()
+        self.assertEqual(Message.objects.get(pk=message.pk).content, 'transcript')
+        self.assertFalse(buffer.update_message(message, content='again'))
+
+
+class WriteBehindFailureTests(TransactionTestCase):
+    # SQLite checks foreign keys when the flush's transaction commits, so it must be the outermost one
+
+    def test_a_bad_row_is_quarantined_and_the_rest_written(self):
+        buffer = _buffer(self)
+        first, second = _conversation('+911'), _conversation('+912')
+        deleted = _conversation('+913')
+        for turn in range(3):
+            buffer.add_message(conversation=first, sender='patient', content=f'{turn}')
+            if turn == 1:
+                buffer.add_message(conversation_id=deleted.id, sender='patient', content='orphan')
+            buffer.add_message(conversation=second, sender='system', content=f'{turn}')
+        buffer.update_memory(first.id, {'turn': 3})
+        deleted.delete()
+
+        with self.assertLogs('vedya.core.write_behind', 'WARNING') as logs:
+            self.assertEqual(buffer.flush(), 7)
+        self.assertIn('cannot be written', logs.output[-1])
+        self.assertEqual(list(first.messages.order_by('id').values_list('content', flat=True)), ['0', '1', '2'])
+        self.assertEqual(list(second.messages.order_by('id').values_list('content', flat=True)), ['0', '1', '2'])
+        first.refresh_from_db()
+        self.assertEqual(first.memory, {'turn': 3})
+        self.assertEqual(len(buffer.quarantined), 1)
+        self.assertEqual(buffer.quarantined[0][0].content, 'orphan')
+        self.assertEqual(buffer._pending(), 0)
+
+    def test_transient_failure_requeues_everything_in_order(self):
+        buffer = _buffer(self)
+        conversation = _conversation('+911')
+        buffer.add_message(conversation=conversation, sender='patient', content='0')
+        with mock.patch.object(Message.objects, 'bulk_create', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                buffer.flush()
+        buffer.add_message(conversation=conversation, sender='patient', content='1')
+
+        self.assertEqual(buffer._pending(), 2)
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(list(conversation.messages.order_by('id').values_list('content', flat=True)), ['0', '1'])
+
+    def test_message_amended_while_its_flush_fails_keeps_the_change(self):
+        buffer = _buffer(self)
+        write_behind._buffer = buffer
+        self.addCleanup(setattr, write_behind, '_buffer', None)
+        message = buffer.add_message(conversation=_conversation('+911'), sender='patient', content='')
+        writing, release = threading.Event(), threading.Event()
+
+        def locked(*args, **kwargs):
+            writing.set()
+            release.wait(5)
+            raise OperationalError('database is locked')
+
+        def flush():
+            with mock.patch.object(Message.objects, 'bulk_create', side_effect=locked):
+                try:
+                    buffer.flush()
+                except OperationalError:
+                    pass
+                finally:
+                    connections.close_all()
+
+        flusher = threading.Thread(target=flush)
+        flusher.start()
+        self.assertTrue(writing.wait(5))
+        # The update waits for the failing flush, then finds the message back in the queue
+        threading.Timer(0.1, release.set).start()
+        write_behind.update_message(message, only_if_blank='content', content='transcript')
+        flusher.join(5)
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(Message.objects.get(pk=message.pk).content, 'transcript')
+
+
+class InboundMessageTests(TestCase):
+    def setUp(self):
+        write_behind._buffer = _buffer(self)
+        self.addCleanup(setattr, write_behind, '_buffer', None)
+
+    def test_inbound_message_is_written_before_the_webhook_returns(self):
+        job = record_inbound_message('whatsapp:+911', 'I have a fever')
+
+        self.assertIsNotNone(job.message_id)
+        self.assertEqual(Message.objects.get(pk=job.message_id).content, 'I have a fever')
+
+    def test_buffered_reply_keeps_the_time_it_was_queued(self):
+        job = record_inbound_message('whatsapp:+911', 'I have a fever')
+        reply = write_behind.create_message(conversation_id=job.conversation_id, sender='system', content='Rest')
+        queued_at = reply.timestamp
+        later = record_inbound_message('whatsapp:+911', 'Thanks')
+
+        with mock.patch('django.utils.timezone.now', return_value=queued_at + timedelta(minutes=5)):
+            write_behind._buffer.flush()
+        self.assertEqual(Message.objects.get(pk=reply.pk).timestamp, queued_at)
+        contents = Message.objects.filter(conversation_id=job.conversation_id).order_by('timestamp', 'id')
+        self.assertEqual(list(contents.values_list('content', flat=True)), ['I have a fever', 'Rest', 'Thanks'])
+        self.assertLess(later.message_id, reply.pk)
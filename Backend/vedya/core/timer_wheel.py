@@ -0,0 +1,88 @@
+from array import array
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+SLOT_MASK = SLOTS - 1
+
+
+class TimerWheel:
+    """Hierarchical timing wheel of integer keys.
+
+    Level 0 has one slot per tick and each higher level covers SLOTS times
+    the span of the one below; with four levels of 64 one-second slots it
+    reaches ~194 days. Adding a timer is O(1) and advancing one tick only
+    touches the slots that come due, instead of re-sorting everything.
+    Entries are (key, tick) pairs packed into array('q') buffers, 16 bytes
+    each, so millions of timers stay compact. Timers are never cancelled
+    in place; callers drop stale keys when they fire.
+    """
+
+    def __init__(self, now, tick_seconds=1.0, levels=4):
+        self.tick_seconds = tick_seconds
+        self.levels = levels
+        self.current = int(now // tick_seconds)
+        self.wheels = [[array('q') for _ in range(SLOTS)] for _ in range(levels)]
+        self.overflow = array('q')  # Beyond the top level's reach
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, key, when):
+        """Schedule key to fire at `when` (seconds, same clock as `now`); past times fire next tick"""
+        self._place(key, max(int(when // self.tick_seconds), self.current + 1))
+        self.size += 1
+
+    def _place(self, key, expires):
+        delta = expires - self.current
+        for level in range(self.levels):
+            if delta < SLOTS ** (level + 1):
+                slot = (expires >> (SLOT_BITS * level)) & SLOT_MASK
+                self.wheels[level][slot].extend((key, expires))
+                return
+        self.overflow.extend((key, expires))
+
+    def _cascade(self, level, slot):
+        # Re-file a higher level's slot one level down now that it is close enough
+        entries = self.wheels[level][slot]
+        self.wheels[level][slot] = array('q')
+        for index in range(0, len(entries), 2):
+            self._place(entries[index], entries[index + 1])
+
+    def advance(self, now):
+        """Move the wheel to `now`, returning the (key, tick) pairs that came due"""
+        target = int(now // self.tick_seconds)
+        due = []
+        while self.current < target:
+            if not self.size:
+                self.current = target  # Nothing scheduled, no need to walk the ticks
+                break
+            self.current += 1
+            tick = self.current
+            for level in range(1, self.levels):
+                if tick & ((1 << (SLOT_BITS * level)) - 1):
+                    break
+                self._cascade(level, (tick >> (SLOT_BITS * level)) & SLOT_MASK)
+            else:
+                if not tick & ((1 << (SLOT_BITS * self.levels)) - 1) and self.overflow:
+                    entries, self.overflow = self.overflow, array('q')
+                    for index in range(0, len(entries), 2):
+                        self._place(entries[index], entries[index + 1])
+            slot = tick & SLOT_MASK
+            entries = self.wheels[0][slot]
+            if entries:
+                self.wheels[0][slot] = array('q')
+                self.size -= len(entries) // 2
+                due.extend(zip(entries[::2], entries[1::2]))
+        return due
+
+    def tick_time(self, tick):
+        """Wall-clock seconds at which a tick starts"""
+        return tick * self.tick_seconds
+
+    def memory_bytes(self):
+        """Bytes held by the entry buffers"""
+        total = self.overflow.buffer_info()[1] * self.overflow.itemsize
+        for wheel in self.wheels:
+            total += sum(entries.buffer_info()[1] * entries.itemsize for entries in wheel)
+        return total
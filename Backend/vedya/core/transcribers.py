@@ -0,0 +1,50 @@
+import os
+import time
+from importlib import import_module
+
+# Voice notes served by the media stand-in start with this marker and their script
+SCRIPT_MARKER = b'VEDYA-TRANSCRIPT:'
+
+_loaded = {}
+
+
+def run_transcriber(transcriber, path, content_type):
+    """Call the transcriber at a dotted path; runs in a media pool process.
+
+    Returns the text and the seconds taken, since the serving process
+    cannot see metrics recorded in the pool process.
+    """
+    function = _loaded.get(transcriber)
+    if function is None:
+        module, name = transcriber.rsplit('.', 1)
+        function = _loaded[transcriber] = getattr(import_module(module), name)
+    started = time.perf_counter()
+    text = function(path, content_type)
+    return text, time.perf_counter() - started
+
+
+def scripted_transcriber(path, content_type):
+    """Read back the script the media stand-in embedded in a synthetic voice note"""
+    with open(path, 'rb') as handle:
+        head = handle.readline(4096)
+    if not head.startswith(SCRIPT_MARKER):
+        raise ValueError('Not a scripted voice note')
+    return head[len(SCRIPT_MARKER):].decode('utf-8').strip()
+
+
+_whisper_model = None
+
+
+def whisper_transcriber(path, content_type):
+    """Transcribe locally with openai-whisper (pip install openai-whisper; needs ffmpeg).
+
+    The model named by MEDIA_WHISPER_MODEL (default "base") is loaded once
+    per pool process. Hindi and Hinglish voice notes are detected
+    automatically.
+    """
+    global _whisper_model
+    if _whisper_model is None:
+        import whisper
+
+        _whisper_model = whisper.load_model(os.getenv('MEDIA_WHISPER_MODEL', 'base'))
+    return _whisper_model.transcribe(path)['text']
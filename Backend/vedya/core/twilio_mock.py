@@ -1,70 +1,163 @@
-class TwilioMock:
-    """Mock implementation of Twilio's WhatsApp API for testing purposes"""
+import itertools
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+from twilio.base.exceptions import TwilioRestException
+
+# Ring buffer sizes; old messages are dropped so long soak tests run in constant memory
+DEFAULT_HISTORY_LIMIT = 10000
+DEFAULT_PER_NUMBER_LIMIT = 200
+DEFAULT_MAX_NUMBERS = 100000
+
+
+def _normalize_number(number):
+    return number.split(':', 1)[1] if number.startswith('whatsapp:') else number
+
+
+class _Clock:
+    """Wall-clock timestamps that never go backwards, derived from the monotonic clock"""
     
     def __init__(self):
-        self.sent_messages = []
-        self.received_messages = []
+        self.wall = time.time()
+        self.monotonic = time.monotonic()
+    
+    def now(self):
+        return self.wall + (time.monotonic() - self.monotonic)
+
+
+class TwilioMock:
+    """Mock implementation of Twilio's WhatsApp API for testing purposes
+    
+    Messages are kept in bounded ring buffers, globally and per number, and
+    each gets a monotonic timestamp and sequence number at the moment it is
+    recorded, so a number's history comes back in true send/receive order
+    without scanning other numbers' messages. All methods are thread-safe.
+    
+    latency and jitter (seconds) delay every send, and failure_rate makes
+    that fraction of sends raise a TwilioRestException with failure_status,
+    so retry and throughput behaviour can be measured offline.
+    """
+    
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, failure_status=503,
+                 history_limit=DEFAULT_HISTORY_LIMIT, per_number_limit=DEFAULT_PER_NUMBER_LIMIT,
+                 max_numbers=DEFAULT_MAX_NUMBERS):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.history_limit = history_limit
+        self.per_number_limit = per_number_limit
+        self.max_numbers = max_numbers
         self.callbacks = {}
+        self._lock = threading.Lock()
+        self._clock = _Clock()
+        self.clear_history()
+    
+    @property
+    def sent_messages(self):
+        """The most recent sent messages, oldest first, as a list"""
+        with self._lock:
+            return list(self._sent)
+    
+    @property
+    def received_messages(self):
+        """The most recent received messages, oldest first, as a list"""
+        with self._lock:
+            return list(self._received)
+    
+    def _record(self, number, direction, message):
+        # Caller holds the lock, so the sequence and the per-number order agree
+        message['sequence'] = next(self._sequence)
+        message['timestamp'] = self._clock.now()
+        history = self._by_number.get(number)
+        if history is None:
+            history = self._by_number[number] = deque(maxlen=self.per_number_limit)
+            if len(self._by_number) > self.max_numbers:
+                self._by_number.popitem(last=False)  # Forget the least recently active number
+        else:
+            self._by_number.move_to_end(number)
+        history.append((direction, message))
+    
+    def _inject_faults(self):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise TwilioRestException(self.failure_status, '/Messages.json', 'Injected failure', method='POST')
     
     def send_message(self, to, body, media_url=None):
         """Mock sending a message to a WhatsApp number"""
-        message = {
-            'to': to,
-            'body': body,
-            'media_url': media_url,
-            'sid': f'mock_message_{len(self.sent_messages) + 1}'
-        }
-        self.sent_messages.append(message)
+        self._inject_faults()
+        with self._lock:
+            self.sent_count += 1
+            message = {
+                'to': to,
+                'body': body,
+                'media_url': media_url,
+                'sid': f'mock_message_{self.sent_count}'
+            }
+            self._sent.append(message)
+            self._record(_normalize_number(to), 'outbound', message)
         return message
     
+    def send_whatsapp_message(self, to_number, message, media_url=None):
+        """Same interface as TwilioService.send_whatsapp_message; returns the message SID"""
+        return self.send_message(to_number, message, media_url)['sid']
+    
     def simulate_incoming_message(self, from_number, body, media_url=None):
         """Simulate receiving a message from a WhatsApp number"""
-        message = {
-            'From': from_number,
-            'Body': body,
-            'MediaUrl': media_url,
-            'SmsMessageSid': f'mock_incoming_{len(self.received_messages) + 1}'
-        }
-        self.received_messages.append(message)
+        with self._lock:
+            self.received_count += 1
+            message = {
+                'From': from_number,
+                'Body': body,
+                'MediaUrl': media_url,
+                'SmsMessageSid': f'mock_incoming_{self.received_count}'
+            }
+            self._received.append(message)
+            self._record(_normalize_number(from_number), 'inbound', message)
+            callback = self.callbacks.get(from_number)
         
         # If there's a callback registered for this number, call it
-        if from_number in self.callbacks:
-            self.callbacks[from_number](message)
+        if callback is not None:
+            callback(message)
         
         return message
     
     def register_callback(self, phone_number, callback_function):
         """Register a callback function to be called when a message is received from a specific number"""
-        self.callbacks[phone_number] = callback_function
+        with self._lock:
+            self.callbacks[phone_number] = callback_function
     
     def clear_history(self):
         """Clear the message history"""
-        self.sent_messages = []
-        self.received_messages = []
+        with self._lock:
+            self._sent = deque(maxlen=self.history_limit)
+            self._received = deque(maxlen=self.history_limit)
+            self._by_number = OrderedDict()
+            self._sequence = itertools.count()
+            self.sent_count = 0
+            self.received_count = 0
     
-    def get_conversation_history(self, phone_number):
-        """Get the conversation history with a specific phone number"""
-        conversation = []
+    def get_conversation_history(self, phone_number, limit=None):
+        """Get the conversation history with a specific phone number, oldest first"""
+        with self._lock:
+            history = list(self._by_number.get(_normalize_number(phone_number), ()))
+        if limit is not None:
+            history = history[-limit:] if limit else []
         
-        # Add sent messages to this number
-        for msg in self.sent_messages:
-            if msg['to'] == phone_number:
-                conversation.append({
-                    'direction': 'outbound',
-                    'body': msg['body'],
-                    'media_url': msg['media_url'],
-                    'timestamp': 'mock_timestamp'
-                })
-        
-        # Add received messages from this number
-        for msg in self.received_messages:
-            if msg['From'] == phone_number:
-                conversation.append({
-                    'direction': 'inbound',
-                    'body': msg['Body'],
-                    'media_url': msg['MediaUrl'],
-                    'timestamp': 'mock_timestamp'
-                })
-        
-        # Sort by mock timestamp (in a real implementation, we would sort by actual timestamp)
+        conversation = []
+        for direction, msg in history:
+            outbound = direction == 'outbound'
+            conversation.append({
+                'direction': direction,
+                'body': msg['body'] if outbound else msg['Body'],
+                'media_url': msg['media_url'] if outbound else msg['MediaUrl'],
+                'sid': msg['sid'] if outbound else msg['SmsMessageSid'],
+                'timestamp': datetime.fromtimestamp(msg['timestamp'], timezone.utc).isoformat(),
+                'sequence': msg['sequence']
+            })
         return conversation
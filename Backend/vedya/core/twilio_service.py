@@ -2,43 +2,52 @@ import os
 from twilio.rest import Client
 from django.conf import settings
 
+from .media import get_media_pipeline
+from .outbound import get_outbound_sender
+
 class TwilioService:
     """Service for interacting with Twilio's WhatsApp API"""
     
-    def __init__(self):
-        # Initialize Twilio client with credentials from settings
+    def __init__(self, sender=None):
+        # Credentials from settings
         self.account_sid = settings.TWILIO_ACCOUNT_SID
         self.auth_token = settings.TWILIO_AUTH_TOKEN
         self.whatsapp_number = settings.TWILIO_PHONE_NUMBER
         
-        # Initialize client
-        self.client = Client(self.account_sid, self.auth_token)
+        # Messages go through the process-wide sender, which shares one pooled
+        # HTTP session, rate limit and retry policy between all instances
+        self.sender = sender or get_outbound_sender()
+        self._client = None
+    
+    @property
+    def client(self):
+        """REST client for non-messaging calls, created on first use"""
+        if self._client is None:
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client
     
     def send_whatsapp_message(self, to_number, message, media_url=None):
-        """Send a WhatsApp message via Twilio"""
-        # Format the 'to' number for WhatsApp
-        if not to_number.startswith('whatsapp:'):
-            to_number = f'whatsapp:{to_number}'
-        
-        # Format the 'from' number for WhatsApp
-        from_number = f'whatsapp:{self.whatsapp_number}'
-        
-        # Send the message
-        message_params = {
-            'body': message,
-            'from_': from_number,
-            'to': to_number
-        }
-        
-        # Add media URL if provided
-        if media_url:
-            message_params['media_url'] = [media_url]
+        """Send a WhatsApp message via Twilio and return its SID"""
+        return self.sender.send(to_number, message, media_url)
+    
+    def send_many(self, messages):
+        """Send (to_number, message[, media_url]) tuples concurrently.
         
-        # Send the message and return the SID
-        sent_message = self.client.messages.create(**message_params)
-        return sent_message.sid
+        Returns a SID or the raised exception for each message, in order.
+        """
+        return self.sender.send_many(messages)
     
-    def get_media_content(self, media_sid):
-        """Retrieve media content from a message"""
-        media = self.client.messages(media_sid).media.list()[0]
-        return media.uri
+    def get_media_content(self, message_sid):
+        """Stream a message's first media item to disk and return it as a MediaFile, or None.
+        
+        The caller owns the file and must delete it, by closing the
+        MediaFile or using it in a with block.
+        """
+        media = self.client.messages(message_sid).media.list(limit=1)
+        if not media:
+            return None
+        # The resource URI ends in .json; without it Twilio serves the media itself
+        uri = media[0].uri
+        if uri.endswith('.json'):
+            uri = uri[:-len('.json')]
+        return get_media_pipeline().download(f'https://api.twilio.com{uri}')
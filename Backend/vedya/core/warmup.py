@@ -0,0 +1,53 @@
+import logging
+import os
+import sys
+
+from django.conf import settings
+from django.db import DatabaseError
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.models.llm_service import get_llm_service
+
+from .availability import get_availability_engine
+from .doctor_index import get_doctor_index
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Prepare process-wide resources before the server accepts requests.
+    
+    Called from the WSGI/ASGI entry points. When the server preloads the
+    application (e.g. gunicorn --preload) this runs once in the parent and
+    forked workers share the memory-mapped model weights.
+    """
+    if settings.SEARCH_WARMUP_ON_STARTUP:
+        warm_up_search()
+    
+    if not settings.LLM_WARMUP_ON_STARTUP:
+        return None
+    
+    stats = get_llm_service(settings.LLAMA_MODEL_PATH).warm_up()
+    logger.info(
+        'LLM warm-up finished in %.3fs (load %.3fs), rss=%s pss=%s',
+        stats['cold_start_seconds'], stats['load_seconds'], stats['rss_bytes'], stats['pss_bytes']
+    )
+    return stats
+
+
+def warm_up_search():
+    """Build the in-memory search indexes before the first booking flow needs them.
+    
+    A database that is unreachable or not migrated yet (e.g. while running
+    migrate or collectstatic) must not stop the process from starting, so
+    the indexes are then left to build on first use.
+    """
+    try:
+        index = get_doctor_index()
+        logger.info('Doctor index built with %d doctors', len(index))
+        engine = get_availability_engine()
+        logger.info('Availability engine compiled for %d doctors', len(engine.doctors))
+    except DatabaseError as exc:
+        logger.warning('Search indexes not built at startup, building them on first use: %s', exc)
@@ -0,0 +1,335 @@
+import atexit
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections, transaction
+
+# Add the project root to the Python path so the AI package is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from AI.utils.metrics import registry
+
+from .models import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+pending_gauge = registry.gauge('write_behind.pending')
+flushes = registry.counter('write_behind.flushes')
+rows_written = registry.counter('write_behind.rows')
+flush_failures = registry.counter('write_behind.failures')
+rows_dropped = registry.counter('write_behind.dropped')
+flush_seconds = registry.histogram('write_behind.flush_seconds')
+batch_rows = registry.histogram('write_behind.batch_rows', buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000))
+
+# A caller adding to a buffer this many times over max_items flushes it itself
+BACKPRESSURE_FACTOR = 4
+# Rows that could not be written, kept for inspection
+QUARANTINE_SIZE = 1000
+# The database could not be reached or was busy: retry the same rows later
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+class WriteBehindBuffer:
+    """Collects Message inserts and Conversation.memory updates and writes them in batches.
+
+    Pending writes are flushed in one transaction, messages with
+    bulk_create in the order they were added and memories with bulk_update,
+    once max_items are pending or the oldest has waited max_delay seconds,
+    and on flush()/stop(). A background thread does the timed flushes.
+    A message's timestamp is the time it was queued, so it sorts among
+    messages written directly. Until a write is flushed, pending_memory() and
+    update_message() let this process read and amend it; other processes
+    see it after the flush. A crash loses at most the unflushed rows.
+    """
+
+    def __init__(self, max_items=500, max_delay=0.2):
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self._messages = []
+        self._memories = {}  # conversation id -> memory, latest wins
+        self._flushing = {}  # Memories being written, still visible to pending_memory() until committed
+        self._oldest = None
+        self.quarantined = deque(maxlen=QUARANTINE_SIZE)  # (row, exception) pairs that were dropped
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # Flushes commit one after another, keeping order
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def add_message(self, **fields):
+        """Queue a Message insert and return the unsaved instance; its pk is set by the flush"""
+        message = Message(**fields)
+        self._add(lambda: self._messages.append(message))
+        return message
+
+    def update_memory(self, conversation_id, memory):
+        """Queue a write of a conversation's agent memory"""
+        self._add(lambda: self._memories.__setitem__(conversation_id, memory))
+
+    def pending_memory(self, conversation_id):
+        """The memory queued for a conversation, or None when nothing is pending"""
+        with self._condition:
+            memory = self._memories.get(conversation_id)
+            return self._flushing.get(conversation_id) if memory is None else memory
+
+    def update_message(self, message, **fields):
+        """Amend a message that has not been flushed yet; returns False once it has been.
+
+        A message being flushed is waited for: afterwards it is either
+        written, with its pk set, or back in the queue after a failed flush
+        and amended there.
+        """
+        if self._amend(message, fields):
+            return True
+        with self._flush_lock:
+            return self._amend(message, fields)
+
+    def _amend(self, message, fields):
+        with self._condition:
+            if message.pk is None and any(pending is message for pending in self._messages):
+                for name, value in fields.items():
+                    setattr(message, name, value)
+                return True
+            return False
+
+    def _add(self, append):
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError('WriteBehindBuffer is stopped')
+            append()
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._condition.notify()
+            pending = self._pending()
+            pending_gauge.set(pending)
+            if pending >= self.max_items:
+                self._condition.notify()
+        if pending >= self.max_items * BACKPRESSURE_FACTOR:
+            # The flusher is falling behind; write from this thread rather than grow without bound
+            self.flush()
+
+    def _pending(self):
+        return len(self._messages) + len(self._memories)
+
+    def flush(self):
+        """Write everything pending; returns the number of rows written.
+
+        Normally one transaction. A batch that fails on its data is split
+        in halves, in order, down to single rows, so only the rows that
+        fail on their own are quarantined and every other row, from this
+        conversation or others, is still written. A database that is
+        unreachable or locked requeues the unwritten rows ahead of newer
+        ones and the error is raised; nothing is dropped for it.
+        """
+        with self._flush_lock:
+            with self._condition:
+                messages, memories = self._messages, self._memories
+                self._messages, self._memories, self._oldest = [], {}, None
+                self._flushing = memories
+                pending_gauge.set(0)
+            if not messages and not memories:
+                return 0
+            started = time.perf_counter()
+            try:
+                try:
+                    self._write(messages, memories)
+                    rows = len(messages) + len(memories)
+                except TRANSIENT_ERRORS:
+                    self._requeue(messages, memories)
+                    raise
+                except Exception:
+                    flush_failures.inc()
+                    logger.warning('Write-behind batch of %s rows failed; writing it in parts',
+                                   len(messages) + len(memories), exc_info=True)
+                    rows = self._write_in_parts(messages, memories)
+            finally:
+                with self._condition:
+                    self._flushing = {}
+            flushes.inc()
+            rows_written.inc(rows)
+            batch_rows.observe(rows)
+            flush_seconds.observe(time.perf_counter() - started)
+            return rows
+
+    def _write(self, messages, memories):
+        try:
+            with transaction.atomic():
+                if messages:
+                    Message.objects.bulk_create(messages, batch_size=self.max_items)
+                if memories:
+                    # Only the memory column, so writes to the rest of the conversation are never undone
+                    Conversation.objects.bulk_update(
+                        [Conversation(id=id, memory=memory) for id, memory in memories.items()],
+                        ['memory'], batch_size=self.max_items
+                    )
+        except Exception:
+            # bulk_create may have assigned ids inside the rolled-back transaction
+            for message in messages:
+                message.pk = None
+                message._state.adding = True
+            raise
+
+    def _write_in_parts(self, messages, memories):
+        """Bisect a failed batch, quarantining the single rows that still fail"""
+        rows = [(message, None) for message in messages] + [(None, item) for item in memories.items()]
+        parts = [rows]  # A stack; the earliest rows are always on top, so order is kept
+        written = 0
+        while parts:
+            part = parts.pop()
+            part_messages = [message for message, _ in part if message is not None]
+            part_memories = dict(item for _, item in part if item is not None)
+            try:
+                self._write(part_messages, part_memories)
+            except TRANSIENT_ERRORS:
+                # Whatever is not written yet goes back to the queue, in order
+                remaining = [row for waiting in reversed(parts) for row in waiting]
+                remaining = part + remaining
+                self._requeue([message for message, _ in remaining if message is not None],
+                              dict(item for _, item in remaining if item is not None))
+                raise
+            except Exception as exc:
+                if len(part) == 1:
+                    self._quarantine(part[0], exc)
+                else:
+                    middle = len(part) // 2
+                    parts.extend((part[middle:], part[:middle]))
+                continue
+            written += len(part)
+        return written
+
+    def _quarantine(self, row, exc):
+        message, item = row
+        rows_dropped.inc()
+        self.quarantined.append((message or item, exc))
+        if message is not None:
+            logger.error('Dropping message for conversation %s that cannot be written: %s',
+                         message.conversation_id, exc)
+        else:
+            logger.error('Dropping memory update for conversation %s that cannot be written: %s', item[0], exc)
+
+    def _requeue(self, messages, memories):
+        flush_failures.inc()
+        with self._condition:
+            # Ahead of anything added since, so order is kept on the next attempt
+            self._messages[:0] = messages
+            memories.update(self._memories)
+            self._memories = memories
+            self._oldest = self._oldest or time.monotonic()
+            pending_gauge.set(self._pending())
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    pending = self._pending()
+                    if pending >= self.max_items:
+                        break
+                    if self._oldest is None:
+                        self._condition.wait()
+                        continue
+                    remaining = self._oldest + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                stopped = self._stopped
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Write-behind flush failed')
+                # Back off before retrying the requeued rows
+                time.sleep(self.max_delay)
+            finally:
+                # This thread outlives requests, so apply the request-end connection policy here
+                close_old_connections()
+            if stopped:
+                return
+
+    def stop(self):
+        """Flush what is pending and stop the background thread"""
+        with self._condition:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_write_behind():
+    """Return the process-wide buffer, or None when WRITE_BEHIND_MAX_ITEMS is 0"""
+    global _buffer
+    if settings.WRITE_BEHIND_MAX_ITEMS <= 0:
+        return None
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = WriteBehindBuffer(settings.WRITE_BEHIND_MAX_ITEMS, settings.WRITE_BEHIND_MAX_DELAY_MS / 1000)
+            atexit.register(_buffer.stop)
+        return _buffer
+
+
+def flush_write_behind():
+    """Write out anything buffered in this process, e.g. before shutdown or reading from elsewhere"""
+    if _buffer is not None:
+        _buffer.flush()
+
+
+def create_message(**fields):
+    """Insert a Message, through the buffer when write-behind is enabled"""
+    buffer = get_write_behind()
+    if buffer is None:
+        return Message.objects.create(**fields)
+    return buffer.add_message(**fields)
+
+
+def update_message(message, only_if_blank=None, **fields):
+    """Change fields of a message returned by create_message, flushed or not.
+
+    only_if_blank names a field that must still be empty for the change
+    to apply, so a concurrent edit is not overwritten.
+    """
+    if _buffer is not None and message.pk is None:
+        if only_if_blank and getattr(message, only_if_blank):
+            return
+        if _buffer.update_message(message, **fields):
+            return
+        if message.pk is None:
+            # Quarantined by a failed flush; there is no row to update
+            logger.warning('Not updating message for conversation %s: it was never written', message.conversation_id)
+            return
+    rows = Message.objects.filter(id=message.pk)
+    if only_if_blank:
+        rows = rows.filter(**{only_if_blank: ''})
+    rows.update(**fields)
+
+
+def store_memory(conversation_id, memory):
+    """Store a conversation's agent memory, through the buffer when write-behind is enabled"""
+    buffer = get_write_behind()
+    if buffer is None:
+        Conversation.objects.filter(id=conversation_id).update(memory=memory)
+    else:
+        buffer.update_memory(conversation_id, memory)
+
+
+def pending_memory(conversation_id):
+    """The memory this process has buffered for a conversation but not yet written, if any"""
+    return _buffer.pending_memory(conversation_id) if _buffer is not None else None
+
+
+def _reset_after_fork():
+    # The flusher thread does not survive fork(); the parent still owns and flushes its pending rows
+    global _buffer, _buffer_lock
+    _buffer = None
+    _buffer_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
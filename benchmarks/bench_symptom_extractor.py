@@ -0,0 +1,78 @@
+"""Compare the compiled symptom lexicon with the old substring scan.
+
+Usage: python benchmarks/bench_symptom_extractor.py [--terms 10000] [--messages 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from AI.utils.symptom_lexicon import SymptomLexicon, get_symptom_lexicon
+
+SYLLABLES = ["ka", "ra", "mi", "to", "shu", "ven", "dal", "po", "ri", "na", "gel", "tor", "ix", "bo", "lam"]
+FILLER = "i have been feeling this since yesterday and it is getting worse at night please help".split()
+
+
+def synthetic_entries(count, seed=7):
+    rng = random.Random(seed)
+    entries = list(get_symptom_lexicon().entries.values())
+    seen = {entry["name"] for entry in entries}
+    while len(seen) < count:
+        words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(rng.randint(1, 3))]
+        name = " ".join(words)
+        if name not in seen:
+            seen.add(name)
+            entries.append({"name": name, "description": f"Synthetic symptom {len(seen)}"})
+    return entries
+
+
+def synthetic_messages(entries, count, seed=11):
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        words = rng.sample(FILLER, 10)
+        for _ in range(rng.randint(1, 3)):
+            words.insert(rng.randrange(len(words)), rng.choice(entries)["name"])
+        messages.append(" ".join(words))
+    return messages
+
+
+def legacy_extract(keywords, message):
+    # The original ExtractSymptomsTool approach: substring test per keyword
+    message_lower = message.lower()
+    return [{"name": keyword, "description": description}
+            for keyword, description in keywords.items() if keyword in message_lower]
+
+
+def timed(label, function, messages):
+    start = time.perf_counter()
+    function(messages)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(messages) / elapsed:>12,.0f} msg/s  ({elapsed * 1000:.1f} ms)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--terms", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    entries = synthetic_entries(args.terms)
+    messages = synthetic_messages(entries, args.messages)
+    keywords = {entry["name"]: entry["description"] for entry in entries}
+
+    start = time.perf_counter()
+    lexicon = SymptomLexicon(entries)
+    print(f"lexicon: {len(lexicon):,} phrases, compiled in {time.perf_counter() - start:.2f}s")
+
+    legacy = timed("substring scan (legacy)", lambda batch: [legacy_extract(keywords, m) for m in batch], messages)
+    compiled = timed("compiled lexicon", lexicon.extract_batch, messages)
+    print(f"speed-up: {legacy / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
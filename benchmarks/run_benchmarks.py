@@ -0,0 +1,547 @@
+"""Micro-benchmarks for the agent, tool, LLM and database hot paths.
+
+Runs offline: the LLM uses the mock backend and the database is a
+throwaway in-memory SQLite test database seeded with synthetic doctors,
+patients and appointments. Results are compared with a saved baseline
+and the run fails when any benchmark is slower by more than --threshold.
+
+Usage: python benchmarks/run_benchmarks.py [--save] [--baseline benchmarks/baseline.json]
+                                           [--threshold 0.25] [--rounds 5] [-k tools.]
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'Backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vedya.config.settings')
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Seconds a calibrated round should take at least
+MIN_ROUND_SECONDS = 0.1
+
+BENCHMARKS = []
+
+
+def benchmark(name, number=None):
+    """Register a benchmark.
+
+    The decorated function takes the shared Environment and the total
+    number of calls it will have to serve, and returns the zero-argument
+    callable to time. Benchmarks that write use a fixed `number` of calls
+    per round so they can prepare enough distinct rows up front; the
+    others are calibrated to take at least MIN_ROUND_SECONDS per round.
+    """
+    def decorator(setup):
+        BENCHMARKS.append((name, number, setup))
+        return setup
+    return decorator
+
+
+class Environment:
+    """Seeded test database and shared fixtures"""
+
+    DOCTORS = 50
+    PATIENTS = 500
+    APPOINTMENTS_PER_PATIENT = 4
+
+    def __init__(self):
+        import django
+        from django.test.utils import setup_test_environment
+
+        django.setup()
+        from django.db import connection
+
+        setup_test_environment()
+        self.connection = connection
+        self.old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        self.model_dir = tempfile.mkdtemp(prefix='bench-model-')  # No weights: the mock backend needs none
+        self._slots = itertools.count()
+        self._seed()
+
+    def close(self):
+        from django.test.utils import teardown_test_environment
+        from vedya.core.write_behind import flush_write_behind
+
+        flush_write_behind()
+        self.connection.creation.destroy_test_db(self.old_name, verbosity=0)
+        teardown_test_environment()
+
+    def _seed(self):
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+
+        from vedya.core.models import Appointment, Conversation, Doctor, Message, Patient
+
+        always = {day: [['00:00', '24:00']] for day in ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')}
+        specializations = ['General Physician', 'Pediatrician', 'Cardiologist', 'Dermatologist', 'ENT']
+        users = User.objects.bulk_create(
+            User(username=f'doctor{index}', first_name='Doctor', last_name=str(index)) for index in range(self.DOCTORS)
+        )
+        self.doctors = Doctor.objects.bulk_create(
+            Doctor(
+                user=user, specialization=specializations[index % len(specializations)],
+                license_number=f'LIC{index}', phone_number='0', location='Pune',
+                latitude=18.5 + index / 1000, longitude=73.8 + index / 1000, availability=always
+            )
+            for index, user in enumerate(users)
+        )
+        self.patients = Patient.objects.bulk_create(
+            Patient(whatsapp_number=f'+9100000{index:05d}', full_name=f'Patient {index}', location='Pune')
+            for index in range(self.PATIENTS)
+        )
+        # Past appointments for history and listings; new bookings go after them
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=30)
+        appointments = []
+        for index, patient in enumerate(self.patients):
+            for visit in range(self.APPOINTMENTS_PER_PATIENT):
+                moment = start + timedelta(hours=index * self.APPOINTMENTS_PER_PATIENT + visit)
+                appointments.append(Appointment(
+                    patient=patient, doctor=self.doctors[(index + visit) % self.DOCTORS],
+                    scheduled_time=moment, end_time=moment + timedelta(minutes=30),
+                    status='completed', symptoms='fever, headache', notes='Rest and fluids'
+                ))
+        self.appointments = Appointment.objects.bulk_create(appointments)
+        conversations = Conversation.objects.bulk_create(Conversation(patient=patient) for patient in self.patients)
+        Message.objects.bulk_create(
+            Message(conversation=conversation, sender='patient', content='I have a fever')
+            for conversation in conversations for _ in range(5)
+        )
+        self.first_free = (timezone.localtime() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def next_slot(self):
+        """A (doctor id, 'YYYY-MM-DD HH:MM') pair never handed out before"""
+        index = next(self._slots)
+        doctor = self.doctors[index % self.DOCTORS]
+        moment = self.first_free + timedelta(minutes=30 * (index // self.DOCTORS))
+        return doctor.id, moment.strftime('%Y-%m-%d %H:%M')
+
+    def book(self, count):
+        """Book `count` future appointments and return their ids"""
+        from vedya.core.availability import parse_slot
+        from vedya.core.booking import book_many
+
+        requests = []
+        for index in range(count):
+            doctor_id, slot = self.next_slot()
+            requests.append({'patient_id': self.patients[index % self.PATIENTS].id,
+                             'doctor_id': doctor_id, 'start': parse_slot(slot)})
+        booked, _ = book_many(requests)
+        return [appointment.id for appointment in booked]
+
+    def llm(self, cache=None):
+        from AI.models.llm_service import LLMService
+
+        service = LLMService(self.model_dir, batch_window_ms=0, cache=cache)
+        service.initialize()
+        return service
+
+
+PATIENT_MESSAGES = [
+    'Hi, I would like to book an appointment',
+    'I have had a fever and headache since yesterday',
+    'I need to reschedule my appointment to another time',
+    'Please cancel my appointment',
+    'Mujhe bukhar aur sir dard hai',
+    'Appointment chahiye kal subah',
+]
+DOCTOR_REQUESTS = [
+    'Show me my schedule for today',
+    'Update my availability for next week',
+    'What is the history of my next patient?',
+    'Thanks',
+]
+
+
+def _cycle(values):
+    iterator = itertools.cycle(values)
+    return lambda: next(iterator)
+
+
+# Agents
+
+@benchmark('agents.patient.process_message')
+def _(env, total):
+    from AI.agents.patient_agent import PatientAgent
+
+    agent = PatientAgent(env.llm())
+    messages, patients = _cycle(PATIENT_MESSAGES), _cycle(range(1000))
+    return lambda: agent.process_message(patients(), messages())
+
+
+@benchmark('agents.patient.stream_message')
+def _(env, total):
+    from AI.agents.patient_agent import PatientAgent
+
+    agent = PatientAgent(env.llm())
+    messages, patients = _cycle(PATIENT_MESSAGES), _cycle(range(1000))
+    return lambda: ''.join(agent.stream_message(patients(), messages()))
+
+
+@benchmark('agents.doctor.process_request')
+def _(env, total):
+    from AI.agents.doctor_agent import DoctorAgent
+
+    agent = DoctorAgent(env.llm())
+    requests, doctors = _cycle(DOCTOR_REQUESTS), _cycle(range(100))
+    return lambda: agent.process_request(doctors(), requests())
+
+
+# LLM
+
+@benchmark('llm.generate')
+def _(env, total):
+    service = env.llm()
+    prompts = _cycle(PATIENT_MESSAGES)
+    return lambda: service.generate(f'Patient: {prompts()}\nAssistant:')
+
+
+@benchmark('llm.generate.cached')
+def _(env, total):
+    from AI.models.response_cache import ResponseCache
+
+    service = env.llm(cache=ResponseCache(max_bytes=1024 * 1024))
+    prompts = _cycle(PATIENT_MESSAGES)
+    return lambda: service.generate(f'Patient: {prompts()}\nAssistant:')
+
+
+# Tools
+
+def _read_tool(tool, rows, warm):
+    """Time a tool served through the record cache: always from the database, or always cached"""
+    from vedya.core.records import get_record_cache
+
+    cache = get_record_cache()
+    ids = [str(row.id) for row in rows]
+    if warm:
+        ids = ids[:20]
+        for row_id in ids:
+            tool._run(row_id)
+        next_id = _cycle(ids)
+        return lambda: tool._run(next_id())
+
+    next_id = _cycle(ids)
+
+    def run():
+        cache.clear()
+        return tool._run(next_id())
+    return run
+
+
+@benchmark('tools.find_doctors')
+def _(env, total):
+    from AI.tools.appointment_tools import FindDoctorsTool
+
+    tool = FindDoctorsTool()
+    specialties = _cycle(['General Physician', 'Pediatrician', 'Cardiologist'])
+    return lambda: tool._run(specialties(), 'Pune')
+
+
+@benchmark('tools.book_appointment', number=200)
+def _(env, total):
+    from AI.tools.appointment_tools import BookAppointmentTool
+
+    tool = BookAppointmentTool()
+    patients = _cycle(env.patients)
+
+    def run():
+        doctor_id, slot = env.next_slot()
+        return tool._run(str(doctor_id), str(patients().id), slot, 'fever')
+    return run
+
+
+@benchmark('tools.reschedule_appointment', number=200)
+def _(env, total):
+    from AI.tools.appointment_tools import RescheduleAppointmentTool
+
+    tool = RescheduleAppointmentTool()
+    appointment_id = env.book(1)[0]
+    doctor_id = env.next_slot()[0]
+    # Move back and forth between fresh slots of the booked doctor
+    slots = iter([env.next_slot() for _ in range(total * env.DOCTORS)])
+    free = (slot for owner, slot in slots if owner == doctor_id)
+    return lambda: tool._run(str(appointment_id), next(free))
+
+
+@benchmark('tools.cancel_appointment', number=200)
+def _(env, total):
+    from AI.tools.appointment_tools import CancelAppointmentTool
+
+    tool = CancelAppointmentTool()
+    ids = iter(env.book(total))
+    return lambda: tool._run(str(next(ids)))
+
+
+@benchmark('tools.get_patient_appointments')
+def _(env, total):
+    from AI.tools.appointment_tools import GetPatientAppointmentsTool
+
+    tool = GetPatientAppointmentsTool()
+    patients = _cycle(env.patients)
+    return lambda: tool._run(str(patients().id))
+
+
+@benchmark('tools.get_doctor_schedule')
+def _(env, total):
+    from AI.tools.doctor_tools import GetDoctorScheduleTool
+
+    return _read_tool(GetDoctorScheduleTool(), env.doctors, warm=False)
+
+
+@benchmark('tools.get_doctor_schedule.cached')
+def _(env, total):
+    from AI.tools.doctor_tools import GetDoctorScheduleTool
+
+    return _read_tool(GetDoctorScheduleTool(), env.doctors, warm=True)
+
+
+@benchmark('tools.update_availability', number=200)
+def _(env, total):
+    from AI.tools.doctor_tools import UpdateAvailabilityTool
+
+    tool = UpdateAvailabilityTool()
+    doctors = _cycle(env.doctors)
+    availability = json.dumps({day: [['00:00', '24:00']] for day in ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')})
+    return lambda: tool._run(str(doctors().id), availability)
+
+
+@benchmark('tools.get_patient_history')
+def _(env, total):
+    from AI.tools.doctor_tools import GetPatientHistoryTool
+
+    return _read_tool(GetPatientHistoryTool(), env.patients, warm=False)
+
+
+@benchmark('tools.get_patient_history.cached')
+def _(env, total):
+    from AI.tools.doctor_tools import GetPatientHistoryTool
+
+    return _read_tool(GetPatientHistoryTool(), env.patients, warm=True)
+
+
+@benchmark('tools.add_appointment_notes', number=200)
+def _(env, total):
+    from AI.tools.doctor_tools import AddAppointmentNotesTool
+
+    tool = AddAppointmentNotesTool()
+    appointments = _cycle(env.appointments)
+    return lambda: tool._run(str(appointments().id), 'Follow up in two weeks')
+
+
+@benchmark('tools.extract_symptoms')
+def _(env, total):
+    from AI.tools.patient_tools import ExtractSymptomsTool
+
+    tool = ExtractSymptomsTool()
+    messages = _cycle(PATIENT_MESSAGES)
+    return lambda: tool._run(messages())
+
+
+@benchmark('tools.get_patient_profile')
+def _(env, total):
+    from AI.tools.patient_tools import GetPatientProfileTool
+
+    return _read_tool(GetPatientProfileTool(), env.patients, warm=False)
+
+
+@benchmark('tools.get_patient_profile.cached')
+def _(env, total):
+    from AI.tools.patient_tools import GetPatientProfileTool
+
+    return _read_tool(GetPatientProfileTool(), env.patients, warm=True)
+
+
+@benchmark('tools.update_patient_profile', number=200)
+def _(env, total):
+    from AI.tools.patient_tools import UpdatePatientProfileTool
+
+    tool = UpdatePatientProfileTool()
+    patients = _cycle(env.patients)
+    return lambda: tool._run(str(patients().id), '{"location": "Pune", "age": 35}')
+
+
+# Queries behind the API views
+
+def _view(view, path, params):
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+
+    def run():
+        response = view(factory.get(path, params))
+        response.render()
+        return response
+    return run
+
+
+@benchmark('db.doctor_list')
+def _(env, total):
+    from vedya.api.views import doctor_list
+
+    return _view(doctor_list, '/api/doctors/', {'limit': 50, 'specialization': 'Pediatrician'})
+
+
+@benchmark('db.patient_list')
+def _(env, total):
+    from vedya.api.views import patient_list
+
+    return _view(patient_list, '/api/patients/', {'limit': 50})
+
+
+@benchmark('db.appointment_list.doctor')
+def _(env, total):
+    from vedya.api.views import appointment_list
+
+    return _view(appointment_list, '/api/appointments/', {'limit': 50, 'doctor': env.doctors[7].id})
+
+
+@benchmark('db.appointment_list.range')
+def _(env, total):
+    from vedya.api.views import appointment_list
+
+    day = env.appointments[len(env.appointments) // 2].scheduled_time.date()
+    return _view(appointment_list, '/api/appointments/', {
+        'limit': 50, 'status': 'completed', 'from': day.isoformat(), 'to': day.isoformat()
+    })
+
+
+@benchmark('db.record_inbound_message', number=500)
+def _(env, total):
+    from vedya.core.message_pipeline import record_inbound_message
+
+    patients = _cycle(env.patients)
+    return lambda: record_inbound_message(f'whatsapp:{patients().whatsapp_number}', 'I have a fever')
+
+
+# Running
+
+def measure(call, number, rounds):
+    """Best and median seconds per call over `rounds` rounds of `number` calls"""
+    samples = []
+    # Like timeit, keep collection pauses out of the samples
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(number):
+                call()
+            samples.append((time.perf_counter() - started) / number)
+    finally:
+        gc.enable()
+    return min(samples), statistics.median(samples)
+
+
+def calibrate(call):
+    """Calls per round so a round takes at least MIN_ROUND_SECONDS"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            call()
+        if time.perf_counter() - started >= MIN_ROUND_SECONDS:
+            return number
+        number *= 2
+
+
+def run_one(env, number, setup, rounds):
+    # One extra round's worth of calls covers the warm-up / calibration
+    call = setup(env, number * (rounds + 1) if number else None)
+    if number:
+        for _ in range(number):
+            call()
+    else:
+        number = calibrate(call)
+    best, median = measure(call, number, rounds)
+    return {'seconds': best, 'median_seconds': median, 'number': number}
+
+
+def run(selected, rounds, baseline=None, threshold=None, retries=1):
+    """Run the benchmarks; one that looks regressed is run again before it counts"""
+    env = Environment()
+    results = {}
+    try:
+        for name, number, setup in selected:
+            result = run_one(env, number, setup, rounds)
+            before = (baseline or {}).get(name)
+            for _ in range(retries):
+                if before is None or result['seconds'] <= before['seconds'] * (1 + threshold):
+                    break
+                retry = run_one(env, number, setup, rounds)
+                if retry['seconds'] < result['seconds']:
+                    result = retry
+            results[name] = result
+            print(f'{name:<36}{result["seconds"] * 1e6:>12.1f} us{1 / result["seconds"]:>14,.0f} ops/s')
+    finally:
+        env.close()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print each benchmark against the baseline; return the names that regressed"""
+    regressed = []
+    print(f'\n{"benchmark":<36}{"baseline us":>14}{"now us":>12}{"change":>10}')
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f'{name:<36}{"-":>14}{result["seconds"] * 1e6:>12.1f}{"new":>10}')
+            continue
+        change = result['seconds'] / before['seconds'] - 1
+        flag = ''
+        if change > threshold:
+            regressed.append(name)
+            flag = '  REGRESSED'
+        print(f'{name:<36}{before["seconds"] * 1e6:>14.1f}{result["seconds"] * 1e6:>12.1f}{change:>+10.1%}{flag}')
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--retries', type=int, default=1, help='Re-runs of a benchmark that looks regressed')
+    parser.add_argument('-k', '--filter', default='', help='Only run benchmarks whose name contains this')
+    args = parser.parse_args()
+
+    selected = [entry for entry in BENCHMARKS if args.filter in entry[0]]
+    if not selected:
+        parser.error(f'No benchmark matches {args.filter!r}')
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)['benchmarks']
+    results = run(selected, args.rounds, baseline, args.threshold, args.retries)
+
+    regressed = []
+    if baseline is not None:
+        regressed = compare(results, baseline, args.threshold)
+    elif not args.save:
+        print(f'\nNo baseline at {args.baseline}; run with --save to create one')
+
+    if args.save:
+        with open(args.baseline, 'w') as handle:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': platform.platform(),
+                'benchmarks': results,
+            }, handle, indent=2)
+        print(f'\nBaseline written to {args.baseline}')
+    if regressed:
+        print(f'\n{len(regressed)} benchmark(s) slower than baseline by more than {args.threshold:.0%}: {", ".join(regressed)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()